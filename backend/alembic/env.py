@@ -0,0 +1,68 @@
+from logging.config import fileConfig
+
+from alembic import context
+
+from app.database import Base, engine
+from app import models  # noqa: F401  注册全部模型
+
+config = context.config
+
+# 通过命令行运行时才加载 alembic.ini 中的日志配置，避免覆盖应用日志
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    """忽略未在模型中声明的全文索引对象（由迁移 0009_fulltext_search 以原生 SQL 创建）"""
+    if type_ == "table" and name.startswith("prompts_fts"):
+        return False
+    if name in ("search_vector", "ix_prompts_search_vector") or (name or "").endswith("_trgm"):
+        return False
+    return True
+
+
+def run_migrations_offline() -> None:
+    """生成 SQL 脚本而不连接数据库"""
+    context.configure(
+        url=str(engine.url),
+        target_metadata=target_metadata,
+        include_object=include_object,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=engine.dialect.name == "sqlite",
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """连接数据库执行迁移，应用启动时会通过 attributes 传入已有连接"""
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run_with_connection(connection)
+        return
+
+    with engine.connect() as connection:
+        _run_with_connection(connection)
+
+
+def _run_with_connection(connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_object=include_object,
+        # SQLite 不支持大部分 ALTER TABLE，使用批量模式重建表
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,42 @@
+"""composite indexes for list, feed and analytics queries
+
+Revision ID: 0002_query_indexes
+Revises: 0001_baseline
+Create Date: 2024-08-01 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_query_indexes'
+down_revision = '0001_baseline'
+branch_labels = None
+depends_on = None
+
+# (索引名, 表名, 列)
+INDEXES = [
+    ('ix_prompts_user_created_at', 'prompts', ['user_id', 'created_at', 'id']),
+    ('ix_prompts_user_updated_at', 'prompts', ['user_id', 'updated_at', 'id']),
+    ('ix_prompts_user_view_count', 'prompts', ['user_id', 'view_count', 'id']),
+    ('ix_prompts_user_title', 'prompts', ['user_id', 'title', 'id']),
+    ('ix_prompts_public_created_at', 'prompts', ['is_public', 'created_at', 'id']),
+    ('ix_prompts_public_updated_at', 'prompts', ['is_public', 'updated_at', 'id']),
+    ('ix_prompts_public_view_count', 'prompts', ['is_public', 'view_count', 'id']),
+    ('ix_prompts_public_title', 'prompts', ['is_public', 'title', 'id']),
+    ('ix_prompts_category_id', 'prompts', ['category_id']),
+    ('ix_prompt_tags_tag_id_prompt_id', 'prompt_tags', ['tag_id', 'prompt_id']),
+    ('ix_categories_user_id_name', 'categories', ['user_id', 'name']),
+]
+
+
+def upgrade() -> None:
+    # 使用 create_all 建立的新库中可能已存在这些索引
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
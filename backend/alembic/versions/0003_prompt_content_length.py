@@ -0,0 +1,37 @@
+"""store prompt content length
+
+Revision ID: 0003_prompt_content_length
+Revises: 0002_query_indexes
+Create Date: 2024-08-15 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_prompt_content_length'
+down_revision = '0002_query_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('prompts')}
+    if 'content_length' not in columns:
+        with op.batch_alter_table('prompts') as batch_op:
+            batch_op.add_column(
+                sa.Column('content_length', sa.Integer(), nullable=False, server_default='0')
+            )
+    # 回填已有数据（LENGTH 按字符计数，与 Python len 一致）
+    op.execute('UPDATE prompts SET content_length = LENGTH(content)')
+    op.create_index(
+        'ix_prompts_user_content_length', 'prompts', ['user_id', 'content_length', 'id'],
+        if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_prompts_user_content_length', table_name='prompts', if_exists=True)
+    with op.batch_alter_table('prompts') as batch_op:
+        batch_op.drop_column('content_length')
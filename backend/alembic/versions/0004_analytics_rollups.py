@@ -0,0 +1,76 @@
+"""analytics rollup tables
+
+Revision ID: 0004_analytics_rollups
+Revises: 0003_prompt_content_length
+Create Date: 2024-08-20 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_analytics_rollups'
+down_revision = '0003_prompt_content_length'
+branch_labels = None
+depends_on = None
+
+
+def _counter(name):
+    return sa.Column(name, sa.Integer(), nullable=False, server_default='0')
+
+
+def _user_fk():
+    return sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE')
+
+
+def _tables():
+    """(表名, 列及约束)"""
+    return [
+        ('user_stats', [
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            _counter('total_prompts'),
+            _counter('public_prompts'),
+            _counter('favorite_prompts'),
+            _counter('total_views'),
+            _user_fk(),
+            sa.PrimaryKeyConstraint('user_id'),
+        ]),
+        ('user_daily_stats', [
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('day', sa.Date(), nullable=False),
+            _counter('prompts_created'),
+            _counter('views'),
+            _user_fk(),
+            sa.PrimaryKeyConstraint('user_id', 'day'),
+        ]),
+        ('user_tag_stats', [
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('tag_id', sa.Integer(), nullable=False),
+            _counter('usage_count'),
+            _user_fk(),
+            sa.ForeignKeyConstraint(['tag_id'], ['tags.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('user_id', 'tag_id'),
+        ]),
+        ('user_category_stats', [
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('category_id', sa.Integer(), nullable=False),
+            _counter('prompt_count'),
+            _user_fk(),
+            sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('user_id', 'category_id'),
+        ]),
+    ]
+
+
+def upgrade() -> None:
+    # 使用 create_all 建立的新库中可能已存在这些表；数据在应用启动时由 init_rollups 首次填充
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+    for name, columns in _tables():
+        if name not in existing:
+            op.create_table(name, *columns)
+
+
+def downgrade() -> None:
+    for name, _ in reversed(_tables()):
+        op.drop_table(name)
@@ -0,0 +1,51 @@
+"""background jobs
+
+Revision ID: 0005_jobs
+Revises: 0004_analytics_rollups
+Create Date: 2024-08-28 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_jobs'
+down_revision = '0004_analytics_rollups'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if not sa.inspect(op.get_bind()).has_table('jobs'):
+        op.create_table(
+            'jobs',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('kind', sa.String(length=20), nullable=False),
+            sa.Column('status', sa.String(length=20), nullable=False, server_default='pending'),
+            sa.Column('params', sa.Text(), nullable=False, server_default='{}'),
+            sa.Column('result', sa.Text(), nullable=True),
+            sa.Column('error', sa.Text(), nullable=True),
+            sa.Column('checkpoint', sa.Text(), nullable=True),
+            sa.Column('total', sa.Integer(), nullable=True),
+            sa.Column('processed', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('bytes_done', sa.BigInteger(), nullable=False, server_default='0'),
+            sa.Column('bytes_total', sa.BigInteger(), nullable=True),
+            sa.Column('artifact_path', sa.String(length=500), nullable=True),
+            sa.Column('filename', sa.String(length=255), nullable=True),
+            sa.Column('media_type', sa.String(length=100), nullable=True),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+            sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+            sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('id'),
+        )
+    op.create_index('ix_jobs_id', 'jobs', ['id'], if_not_exists=True)
+    op.create_index('ix_jobs_user_status', 'jobs', ['user_id', 'status'], if_not_exists=True)
+    op.create_index('ix_jobs_status_heartbeat', 'jobs', ['status', 'heartbeat_at'], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_table('jobs')
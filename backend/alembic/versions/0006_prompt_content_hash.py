@@ -0,0 +1,65 @@
+"""store prompt content hash
+
+Revision ID: 0006_prompt_content_hash
+Revises: 0005_jobs
+Create Date: 2024-09-03 00:00:00
+
+"""
+import hashlib
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_prompt_content_hash'
+down_revision = '0005_jobs'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def _content_hash(content):
+    # 与 app.models.prompt.compute_content_hash 保持一致
+    normalized = " ".join(unicodedata.normalize("NFC", content or "").split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    columns = {column['name'] for column in sa.inspect(bind).get_columns('prompts')}
+    if 'content_hash' not in columns:
+        with op.batch_alter_table('prompts') as batch_op:
+            batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+
+    # 回填已有数据（哈希需在 Python 中计算，按 id 分批）
+    prompts = sa.table('prompts', sa.column('id', sa.Integer), sa.column('content', sa.Text),
+                       sa.column('content_hash', sa.String))
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(prompts.c.id, prompts.c.content)
+            .where(prompts.c.id > last_id, prompts.c.content_hash.is_(None))
+            .order_by(prompts.c.id).limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        bind.execute(
+            prompts.update().where(prompts.c.id == sa.bindparam('prompt_id'))
+            .values(content_hash=sa.bindparam('hash')),
+            [{'prompt_id': prompt_id, 'hash': _content_hash(content)} for prompt_id, content in rows]
+        )
+        last_id = rows[-1].id
+
+    op.create_index(
+        'ix_prompts_user_content_hash', 'prompts', ['user_id', 'content_hash'],
+        if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_prompts_user_content_hash', table_name='prompts', if_exists=True)
+    with op.batch_alter_table('prompts') as batch_op:
+        batch_op.drop_column('content_hash')
@@ -0,0 +1,49 @@
+"""near-duplicate index tables
+
+Revision ID: 0007_similarity_index
+Revises: 0006_prompt_content_hash
+Create Date: 2024-09-10 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007_similarity_index'
+down_revision = '0006_prompt_content_hash'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 数据在应用启动时由 init_similarity_index 首次填充
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+    if 'prompt_signatures' not in existing:
+        op.create_table(
+            'prompt_signatures',
+            sa.Column('prompt_id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('signature', sa.LargeBinary(), nullable=False),
+            sa.ForeignKeyConstraint(['prompt_id'], ['prompts.id'], ondelete='CASCADE'),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('prompt_id'),
+        )
+    if 'prompt_lsh_buckets' not in existing:
+        op.create_table(
+            'prompt_lsh_buckets',
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('band', sa.Integer(), nullable=False),
+            sa.Column('bucket', sa.BigInteger(), nullable=False),
+            sa.Column('prompt_id', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['prompt_id'], ['prompts.id'], ondelete='CASCADE'),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('user_id', 'band', 'bucket', 'prompt_id'),
+        )
+    op.create_index('ix_prompt_signatures_user_id', 'prompt_signatures', ['user_id'], if_not_exists=True)
+    op.create_index('ix_prompt_lsh_buckets_prompt_id', 'prompt_lsh_buckets', ['prompt_id'], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_table('prompt_lsh_buckets')
+    op.drop_table('prompt_signatures')
@@ -0,0 +1,36 @@
+"""revoked tokens table
+
+Revision ID: 0008_revoked_tokens
+Revises: 0007_similarity_index
+Create Date: 2024-09-17 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008_revoked_tokens'
+down_revision = '0007_similarity_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if not sa.inspect(op.get_bind()).has_table('revoked_tokens'):
+        op.create_table(
+            'revoked_tokens',
+            sa.Column('jti', sa.String(length=36), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('token_type', sa.String(length=20), nullable=False),
+            sa.Column('expires_at', sa.DateTime(), nullable=False),
+            sa.Column('revoked_at', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('jti'),
+        )
+    op.create_index('ix_revoked_tokens_expires_at', 'revoked_tokens', ['expires_at'], if_not_exists=True)
+    op.create_index('ix_revoked_tokens_revoked_at', 'revoked_tokens', ['revoked_at'], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_table('revoked_tokens')
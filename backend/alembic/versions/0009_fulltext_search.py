@@ -0,0 +1,121 @@
+"""full-text search index
+
+Revision ID: 0009_fulltext_search
+Revises: 0008_revoked_tokens
+Create Date: 2024-09-24 00:00:00
+
+"""
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009_fulltext_search'
+down_revision = '0008_revoked_tokens'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger(__name__)
+
+# 之前的版本在应用启动时创建这些对象，语句均可重复执行。
+# 注意：SQLite 上用 batch_alter_table 重建 prompts 表会删除下面的触发器，之后的迁移需重新创建
+
+# SQLite: FTS5 外部内容表（trigram 分词，可做中文子串匹配），触发器与 prompts 表保持同步
+SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS prompts_fts USING fts5(
+        title, description, content,
+        content='prompts', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS prompts_fts_ai AFTER INSERT ON prompts BEGIN
+        INSERT INTO prompts_fts(rowid, title, description, content)
+        VALUES (new.id, new.title, new.description, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS prompts_fts_ad AFTER DELETE ON prompts BEGIN
+        INSERT INTO prompts_fts(prompts_fts, rowid, title, description, content)
+        VALUES ('delete', old.id, old.title, old.description, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS prompts_fts_au AFTER UPDATE OF title, description, content ON prompts BEGIN
+        INSERT INTO prompts_fts(prompts_fts, rowid, title, description, content)
+        VALUES ('delete', old.id, old.title, old.description, old.content);
+        INSERT INTO prompts_fts(rowid, title, description, content)
+        VALUES (new.id, new.title, new.description, new.content);
+    END
+    """,
+]
+
+# PostgreSQL: tsvector 生成列 + GIN 索引（按词检索）
+POSTGRES_DDL = [
+    """
+    ALTER TABLE prompts ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(content, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_prompts_search_vector ON prompts USING GIN (search_vector)",
+]
+
+# PostgreSQL: pg_trgm 索引，加速中文等不按空格分词的关键词的 ILIKE 子串匹配
+TRGM_INDEXES = [
+    ('ix_prompts_title_trgm', 'title'),
+    ('ix_prompts_description_trgm', 'description'),
+    ('ix_prompts_content_trgm', 'content'),
+]
+
+
+def _sqlite_supports_fts5(bind) -> bool:
+    """FTS5 已编译且版本支持 trigram 分词（3.34+）"""
+    version = tuple(int(part) for part in bind.execute(sa.text('SELECT sqlite_version()')).scalar().split('.'))
+    enabled = bind.execute(sa.text("SELECT sqlite_compileoption_used('ENABLE_FTS5')")).scalar()
+    return bool(enabled) and version >= (3, 34, 0)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        if not _sqlite_supports_fts5(bind):
+            logger.warning('SQLite 不支持 FTS5 trigram 分词，搜索将使用 LIKE')
+            return
+        exists = bind.execute(sa.text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'prompts_fts'"
+        )).first()
+        for statement in SQLITE_DDL:
+            op.execute(statement)
+        if not exists:
+            # 为已有数据建立索引
+            op.execute("INSERT INTO prompts_fts(prompts_fts) VALUES ('rebuild')")
+    elif bind.dialect.name == 'postgresql':
+        for statement in POSTGRES_DDL:
+            op.execute(statement)
+        try:
+            # 需要建扩展的权限；失败时只影响中文关键词的搜索速度
+            with bind.begin_nested():
+                op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        except sa.exc.DBAPIError as e:
+            logger.warning('无法启用 pg_trgm 扩展，中文关键词搜索将不使用索引: %s', e)
+            return
+        for name, column in TRGM_INDEXES:
+            op.execute(f'CREATE INDEX IF NOT EXISTS {name} ON prompts USING GIN ({column} gin_trgm_ops)')
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        for name in ('prompts_fts_ai', 'prompts_fts_ad', 'prompts_fts_au'):
+            op.execute(f'DROP TRIGGER IF EXISTS {name}')
+        op.execute('DROP TABLE IF EXISTS prompts_fts')
+    elif bind.dialect.name == 'postgresql':
+        for name, _ in TRGM_INDEXES:
+            op.execute(f'DROP INDEX IF EXISTS {name}')
+        op.execute('DROP INDEX IF EXISTS ix_prompts_search_vector')
+        op.execute('ALTER TABLE prompts DROP COLUMN IF EXISTS search_vector')
@@ -1,5 +1,5 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
@@ -9,13 +9,25 @@ load_dotenv()
 # Database URL - 支持SQLite和PostgreSQL
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./prompt_manager.db")
 
-# 配置引擎参数
+# 路由处理函数为同步函数，由线程池执行，每个线程持有一个连接；
+# 连接池上限（pool_size + max_overflow）默认不小于线程数，另留出后台线程
+# （浏览次数写回、令牌同步、后台任务）所需的连接，避免请求等待连接超时
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "40"))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+_BACKGROUND_CONNECTIONS = 10
+DB_MAX_OVERFLOW = int(os.getenv(
+    "DB_MAX_OVERFLOW", str(max(20, THREADPOOL_SIZE + _BACKGROUND_CONNECTIONS - DB_POOL_SIZE))
+))
+
+# 配置引擎参数（连接池大小对 SQLite 与 PostgreSQL 都生效）
 if DATABASE_URL.startswith("sqlite"):
     # SQLite配置
     engine = create_engine(
         DATABASE_URL,
         connect_args={"check_same_thread": False},
         echo=False,  # 生产环境关闭SQL日志
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
         pool_pre_ping=True,
         pool_recycle=3600
     )
@@ -24,8 +36,8 @@ else:
     engine = create_engine(
         DATABASE_URL,
         echo=False,
-        pool_size=10,
-        max_overflow=20,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
         pool_pre_ping=True,
         pool_recycle=3600
     )
@@ -33,10 +45,32 @@ else:
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Alembic 迁移目录
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic")
+# create_all 时代（未使用迁移）的表结构对应的版本
+BASELINE_REVISION = "0001_baseline"
+
 def get_db():
     """数据库依赖注入"""
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def init_db(bind=None):
+    """执行数据库迁移到最新版本"""
+    from alembic import command
+    from alembic.config import Config
+
+    bind = bind or engine
+    config = Config()
+    config.set_main_option("script_location", MIGRATIONS_DIR)
+
+    with bind.begin() as connection:
+        config.attributes["connection"] = connection
+        inspector = inspect(connection)
+        if not inspector.has_table("alembic_version") and inspector.has_table("users"):
+            # 由 create_all 建立的旧数据库，先标记为基线版本再升级
+            command.stamp(config, BASELINE_REVISION)
+        command.upgrade(config, "head")
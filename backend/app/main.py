@@ -1,17 +1,34 @@
 import os
+from anyio import to_thread
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from dotenv import load_dotenv
 
-from .database import engine, Base
-from .routers import auth, prompts, categories, tags, search, export, analytics
+from .database import THREADPOOL_SIZE, engine, init_db
+from .routers import API_ROUTERS
+from .utils.rollups import init_rollups
+from .utils.search import init_search_backend
+from .utils.similarity import init_similarity_index
+from .utils.jobs import job_manager
+from .utils.passwords import password_hasher
+from .utils.revocation import token_denylist
+from .utils.view_counter import view_counter
 
 # Load environment variables
 load_dotenv()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Create or upgrade database tables (Alembic migrations)
+init_db()
+
+# Select the full-text search backend (index structures are created by migrations)
+init_search_backend(engine)
+
+# Populate analytics rollups on first upgrade
+init_rollups(engine)
+
+# Build near-duplicate index on first upgrade
+init_similarity_index(engine)
 
 app = FastAPI(
     title="Prompt Manager API",
@@ -33,13 +50,26 @@ app.add_middleware(
 )
 
 # Include routers
-app.include_router(auth.router, prefix="/api/auth", tags=["认证"])
-app.include_router(prompts.router, prefix="/api/prompts", tags=["提示词"])
-app.include_router(categories.router, prefix="/api/categories", tags=["分类"])
-app.include_router(tags.router, prefix="/api/tags", tags=["标签"])
-app.include_router(search.router, prefix="/api/search", tags=["搜索"])
-app.include_router(export.router, prefix="/api/export", tags=["导入导出"])
-app.include_router(analytics.router, prefix="/api/analytics", tags=["统计分析"])
+for router, prefix, tag in API_ROUTERS:
+    app.include_router(router, prefix=prefix, tags=[tag])
+
+@app.on_event("startup")
+def start_background_tasks():
+    # 同步路由处理函数和流式导出都在该线程池中执行
+    to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    view_counter.start()
+    # 加载已吊销的令牌并定期同步、清理
+    token_denylist.start()
+    # 后台导入导出任务（继续执行上次未完成的任务）
+    job_manager.start()
+
+@app.on_event("shutdown")
+def stop_background_tasks():
+    # 执行中的任务中止后重新排队
+    job_manager.stop()
+    token_denylist.stop()
+    # 写回缓冲中的浏览次数
+    view_counter.stop()
 
 @app.get("/")
 async def root():
@@ -49,6 +79,14 @@ async def root():
 async def health_check():
     return {"status": "healthy", "message": "API服务运行正常"}
 
+# 运行指标会暴露服务内部状态且不需要登录，默认关闭（未开启时返回 404）
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").strip().lower() in ("true", "1", "yes")
+
+if METRICS_ENABLED:
+    @app.get("/api/metrics")
+    async def metrics():
+        return {"password_hashing": password_hasher.metrics()}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
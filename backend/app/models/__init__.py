@@ -1,4 +1,13 @@
 from .user import User
 from .prompt import Prompt, Category, Tag, prompt_tags
+from .job import Job
+from .token import RevokedToken
+from .rollup import UserStats, UserDailyStats, UserTagStats, UserCategoryStats
+from .similarity import PromptSignature, PromptLshBucket
 
-__all__ = ["User", "Prompt", "Category", "Tag", "prompt_tags"]
\ No newline at end of file
+__all__ = [
+    "User", "Prompt", "Category", "Tag", "prompt_tags",
+    "Job", "RevokedToken",
+    "UserStats", "UserDailyStats", "UserTagStats", "UserCategoryStats",
+    "PromptSignature", "PromptLshBucket",
+]
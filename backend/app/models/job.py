@@ -0,0 +1,42 @@
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from ..database import Base
+
+class Job(Base):
+    """后台导入/导出任务，由 utils.jobs 的工作线程执行"""
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    # export / import
+    kind = Column(String(20), nullable=False)
+    # pending / running / completed / failed
+    status = Column(String(20), nullable=False, default="pending", server_default="pending")
+    # 任务参数与结果（JSON 文本）
+    params = Column(Text, nullable=False, default="{}", server_default="{}")
+    result = Column(Text)
+    # 断点（JSON 文本）：与业务数据一起提交，任务重新执行时从此处继续
+    checkpoint = Column(Text)
+    error = Column(Text)
+
+    # 进度：处理的提示词数量，以及输出（导出）或读取（导入）的字节数
+    total = Column(Integer)
+    processed = Column(Integer, nullable=False, default=0, server_default="0")
+    bytes_done = Column(BigInteger, nullable=False, default=0, server_default="0")
+    bytes_total = Column(BigInteger)
+
+    # 导出产物（导入任务为上传的原始文件）
+    artifact_path = Column(String(500))
+    filename = Column(String(255))
+    media_type = Column(String(100))
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+    # 执行中定期更新，超时未更新的任务视为工作进程已退出，重新排队
+    heartbeat_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        Index("ix_jobs_user_status", "user_id", "status"),
+        Index("ix_jobs_status_heartbeat", "status", "heartbeat_at"),
+    )
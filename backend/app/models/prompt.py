@@ -1,14 +1,26 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Table, Index
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
+import hashlib
+import unicodedata
 from ..database import Base
 
+def compute_content_hash(content: str) -> str:
+    """内容去重用的哈希：Unicode NFC 规范化并把连续空白合并为一个空格后取 SHA-256
+
+    导入 Markdown 时每行首尾空白会被去掉，合并空白后与原内容的哈希一致。
+    """
+    normalized = " ".join(unicodedata.normalize("NFC", content or "").split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
 # Association table for many-to-many relationship between prompts and tags
 prompt_tags = Table(
     'prompt_tags',
     Base.metadata,
     Column('prompt_id', Integer, ForeignKey('prompts.id', ondelete='CASCADE'), primary_key=True),
-    Column('tag_id', Integer, ForeignKey('tags.id', ondelete='CASCADE'), primary_key=True)
+    Column('tag_id', Integer, ForeignKey('tags.id', ondelete='CASCADE'), primary_key=True),
+    # 主键为 (prompt_id, tag_id)，按标签反查提示词需要反向索引
+    Index('ix_prompt_tags_tag_id_prompt_id', 'tag_id', 'prompt_id')
 )
 
 class Prompt(Base):
@@ -21,6 +33,10 @@ class Prompt(Base):
     is_public = Column(Boolean, default=False)
     is_favorite = Column(Boolean, default=False)
     view_count = Column(Integer, default=0)
+    # 内容字符数，随 content 自动更新，供统计查询使用
+    content_length = Column(Integer, nullable=False, default=0, server_default="0")
+    # 规范化内容的哈希，随 content 自动更新，用于导入/创建时去重
+    content_hash = Column(String(64))
     
     # Foreign keys
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -35,6 +51,27 @@ class Prompt(Base):
     category = relationship("Category", back_populates="prompts")
     tags = relationship("Tag", secondary=prompt_tags, back_populates="prompts")
 
+    # 列表排序/游标分页使用的复合索引：(过滤列, 排序列, id)
+    __table_args__ = (
+        Index("ix_prompts_user_created_at", "user_id", "created_at", "id"),
+        Index("ix_prompts_user_updated_at", "user_id", "updated_at", "id"),
+        Index("ix_prompts_user_view_count", "user_id", "view_count", "id"),
+        Index("ix_prompts_user_title", "user_id", "title", "id"),
+        Index("ix_prompts_public_created_at", "is_public", "created_at", "id"),
+        Index("ix_prompts_public_updated_at", "is_public", "updated_at", "id"),
+        Index("ix_prompts_public_view_count", "is_public", "view_count", "id"),
+        Index("ix_prompts_public_title", "is_public", "title", "id"),
+        Index("ix_prompts_category_id", "category_id"),
+        Index("ix_prompts_user_content_length", "user_id", "content_length", "id"),
+        Index("ix_prompts_user_content_hash", "user_id", "content_hash"),
+    )
+
+    @validates("content")
+    def _sync_content_length(self, key, value):
+        self.content_length = len(value) if value is not None else 0
+        self.content_hash = compute_content_hash(value)
+        return value
+
 class Category(Base):
     __tablename__ = "categories"
 
@@ -53,6 +90,10 @@ class Category(Base):
     owner = relationship("User", back_populates="categories")
     prompts = relationship("Prompt", back_populates="category")
 
+    __table_args__ = (
+        Index("ix_categories_user_id_name", "user_id", "name"),
+    )
+
 class Tag(Base):
     __tablename__ = "tags"
 
@@ -0,0 +1,39 @@
+from sqlalchemy import Column, Integer, Date, ForeignKey
+from ..database import Base
+
+# 统计汇总表：由 utils.rollups 在写操作时增量维护，可用 rebuild_rollups.py 重建
+
+class UserStats(Base):
+    """每个用户的总体统计"""
+    __tablename__ = "user_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    total_prompts = Column(Integer, nullable=False, default=0, server_default="0")
+    public_prompts = Column(Integer, nullable=False, default=0, server_default="0")
+    favorite_prompts = Column(Integer, nullable=False, default=0, server_default="0")
+    total_views = Column(Integer, nullable=False, default=0, server_default="0")
+
+class UserDailyStats(Base):
+    """每个用户每天的创建数量与浏览次数"""
+    __tablename__ = "user_daily_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    prompts_created = Column(Integer, nullable=False, default=0, server_default="0")
+    views = Column(Integer, nullable=False, default=0, server_default="0")
+
+class UserTagStats(Base):
+    """每个用户各标签的使用次数"""
+    __tablename__ = "user_tag_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    tag_id = Column(Integer, ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True)
+    usage_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+class UserCategoryStats(Base):
+    """每个用户各分类下的提示词数量"""
+    __tablename__ = "user_category_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    category_id = Column(Integer, ForeignKey("categories.id", ondelete="CASCADE"), primary_key=True)
+    prompt_count = Column(Integer, nullable=False, default=0, server_default="0")
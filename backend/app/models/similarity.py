@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, BigInteger, LargeBinary, ForeignKey, Index
+from ..database import Base
+
+# 近似重复检测索引：由 utils.similarity 在写操作时增量维护，可用 rebuild_similarity.py 重建
+
+class PromptSignature(Base):
+    """每个提示词内容的 MinHash 签名"""
+    __tablename__ = "prompt_signatures"
+
+    prompt_id = Column(Integer, ForeignKey("prompts.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    signature = Column(LargeBinary, nullable=False)
+
+class PromptLshBucket(Base):
+    """LSH 分桶：签名的每个 band 哈希到一个桶，同桶的提示词为相似候选"""
+    __tablename__ = "prompt_lsh_buckets"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    band = Column(Integer, primary_key=True)
+    bucket = Column(BigInteger, primary_key=True)
+    prompt_id = Column(Integer, ForeignKey("prompts.id", ondelete="CASCADE"), primary_key=True)
+
+    __table_args__ = (
+        # 删除/更新提示词时按 prompt_id 清理
+        Index("ix_prompt_lsh_buckets_prompt_id", "prompt_id"),
+    )
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from ..database import Base
+
+class RevokedToken(Base):
+    """已吊销的令牌（按 jti），由 utils.revocation 加载到内存并在过期后清理"""
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(36), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    # access / refresh
+    token_type = Column(String(20), nullable=False)
+    # 令牌本身的过期时间，之后无需再拦截
+    expires_at = Column(DateTime, nullable=False, index=True)
+    # 其他进程按该时间增量同步
+    revoked_at = Column(DateTime, nullable=False, index=True)
@@ -1 +1,13 @@
-# Router modules for FastAPI application
\ No newline at end of file
+# Router modules for FastAPI application
+from . import auth, prompts, categories, tags, search, export, analytics
+
+# (路由, 前缀, 文档标签)，main.py 与 check_query_plans.py 共用
+API_ROUTERS = [
+    (auth.router, "/api/auth", "认证"),
+    (prompts.router, "/api/prompts", "提示词"),
+    (categories.router, "/api/categories", "分类"),
+    (tags.router, "/api/tags", "标签"),
+    (search.router, "/api/search", "搜索"),
+    (export.router, "/api/export", "导入导出"),
+    (analytics.router, "/api/analytics", "统计分析"),
+]
@@ -1,80 +1,98 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from datetime import datetime, timedelta
+from sqlalchemy import and_, case, func, desc
+from datetime import date, datetime, timedelta
 from typing import Dict, Any
 
 from ..database import get_db
 from ..models.prompt import Prompt, Category, Tag
-from ..models.user import User
-from ..utils.auth import get_current_active_user
+from ..models.rollup import UserStats, UserDailyStats, UserTagStats, UserCategoryStats
+from ..utils.auth import Principal, get_current_active_user
+from ..utils.cache import dashboard_cache
+from ..utils.similarity import find_duplicate_clusters
+from ..utils.view_counter import view_counter
 
 router = APIRouter()
 
 @router.get("/dashboard")
-async def get_dashboard_stats(
+def get_dashboard_stats(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ) -> Dict[str, Any]:
     """获取仪表板统计数据"""
     
+    # 快照在提示词/分类变更及浏览次数写回时失效
+    snapshot = dashboard_cache.get(current_user.id, "dashboard")
+    if snapshot is None:
+        snapshot = _build_dashboard_snapshot(db, current_user.id)
+        dashboard_cache.set(current_user.id, "dashboard", snapshot)
+    
+    # 叠加尚未写回数据库的浏览次数（不修改缓存中的快照）
+    return {
+        **snapshot,
+        "overview": {
+            **snapshot["overview"],
+            "total_views": snapshot["overview"]["total_views"] + view_counter.pending_for_user(current_user.id)
+        },
+        "popular_prompts": [
+            {**prompt, "view_count": prompt["view_count"] + view_counter.pending_for(prompt["id"])}
+            for prompt in snapshot["popular_prompts"]
+        ]
+    }
+
+def _build_dashboard_snapshot(db: Session, user_id: int) -> Dict[str, Any]:
+    """查询仪表板数据：读取统计汇总表 + 两个 Top5（均走索引，与数据量无关）"""
+    
     # 基础统计
-    total_prompts = db.query(Prompt).filter(Prompt.user_id == current_user.id).count()
-    public_prompts = db.query(Prompt).filter(
-        Prompt.user_id == current_user.id,
-        Prompt.is_public == True
-    ).count()
-    favorite_prompts = db.query(Prompt).filter(
-        Prompt.user_id == current_user.id,
-        Prompt.is_favorite == True
-    ).count()
-    total_categories = db.query(Category).filter(Category.user_id == current_user.id).count()
-    
-    # 总查看次数
-    total_views = db.query(func.sum(Prompt.view_count)).filter(
-        Prompt.user_id == current_user.id
-    ).scalar() or 0
+    overview = db.query(UserStats).filter(UserStats.user_id == user_id).first()
     
     # 最近7天创建的提示词数量
-    seven_days_ago = datetime.now() - timedelta(days=7)
-    recent_prompts = db.query(Prompt).filter(
-        Prompt.user_id == current_user.id,
-        Prompt.created_at >= seven_days_ago
-    ).count()
-    
-    # 最受欢迎的提示词（按查看次数）
-    popular_prompts = db.query(Prompt).filter(
-        Prompt.user_id == current_user.id
-    ).order_by(desc(Prompt.view_count)).limit(5).all()
+    seven_days_ago = (datetime.utcnow() - timedelta(days=7)).date()
+    recent_prompts = db.query(func.sum(UserDailyStats.prompts_created)).filter(
+        UserDailyStats.user_id == user_id,
+        UserDailyStats.day >= seven_days_ago
+    ).scalar() or 0
     
-    # 分类分布统计
+    # 分类分布统计（同时得到分类总数）
     category_stats = db.query(
         Category.name,
         Category.color,
-        func.count(Prompt.id).label('count')
-    ).outerjoin(Prompt).filter(
-        Category.user_id == current_user.id
-    ).group_by(Category.id, Category.name, Category.color).all()
+        func.coalesce(UserCategoryStats.prompt_count, 0).label('count')
+    ).outerjoin(UserCategoryStats, and_(
+        UserCategoryStats.category_id == Category.id,
+        UserCategoryStats.user_id == user_id
+    )).filter(
+        Category.user_id == user_id
+    ).all()
+    
+    # 最受欢迎的提示词（按查看次数），只取需要的列
+    popular_prompts = db.query(
+        Prompt.id, Prompt.title, Prompt.view_count, Prompt.is_public, Prompt.is_favorite
+    ).filter(
+        Prompt.user_id == user_id
+    ).order_by(desc(Prompt.view_count)).limit(5).all()
     
     # 最近活动（最近编辑的提示词）
-    recent_activity = db.query(Prompt).filter(
-        Prompt.user_id == current_user.id
+    recent_activity = db.query(
+        Prompt.id, Prompt.title, Prompt.updated_at, Prompt.is_public, Prompt.is_favorite
+    ).filter(
+        Prompt.user_id == user_id
     ).order_by(desc(Prompt.updated_at)).limit(5).all()
     
     return {
         "overview": {
-            "total_prompts": total_prompts,
-            "public_prompts": public_prompts,
-            "favorite_prompts": favorite_prompts,
-            "total_categories": total_categories,
-            "total_views": total_views,
+            "total_prompts": overview.total_prompts if overview else 0,
+            "public_prompts": overview.public_prompts if overview else 0,
+            "favorite_prompts": overview.favorite_prompts if overview else 0,
+            "total_categories": len(category_stats),
+            "total_views": overview.total_views if overview else 0,
             "recent_prompts": recent_prompts
         },
         "popular_prompts": [
             {
                 "id": prompt.id,
                 "title": prompt.title,
-                "view_count": prompt.view_count,
+                "view_count": prompt.view_count or 0,
                 "is_public": prompt.is_public,
                 "is_favorite": prompt.is_favorite
             }
@@ -100,11 +118,43 @@ async def get_dashboard_stats(
         ]
     }
 
+# 趋势查询允许的最大天数
+TRENDS_MAX_DAYS = 730
+
+def _bucket_expression(column, granularity: str, dialect_name: str):
+    """按粒度截断时间的 SQL 表达式（周以周一为起点）"""
+    if dialect_name == "postgresql":
+        return func.date(func.date_trunc(granularity, column))
+    if dialect_name == "sqlite":
+        if granularity == "week":
+            return func.date(column, "weekday 0", "-6 days")
+        if granularity == "month":
+            return func.strftime("%Y-%m-01", column)
+    # 其他数据库按天分组，再在 Python 中归并
+    return func.date(column)
+
+def _bucket_start(value: date, granularity: str) -> date:
+    """某一天所在时间桶的起始日期"""
+    if granularity == "week":
+        return value - timedelta(days=value.weekday())
+    if granularity == "month":
+        return value.replace(day=1)
+    return value
+
+def _next_bucket(value: date, granularity: str) -> date:
+    """下一个时间桶的起始日期"""
+    if granularity == "week":
+        return value + timedelta(days=7)
+    if granularity == "month":
+        return (value.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return value + timedelta(days=1)
+
 @router.get("/trends")
-async def get_trends(
-    days: int = 30,
+def get_trends(
+    days: int = Query(30, ge=0, le=TRENDS_MAX_DAYS),
+    granularity: str = Query("day", regex="^(day|week|month)$"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ) -> Dict[str, Any]:
     """获取趋势数据"""
     
@@ -112,31 +162,46 @@ async def get_trends(
     end_date = datetime.now().date()
     start_date = end_date - timedelta(days=days)
     
-    # 每日创建数据
+    # 按时间桶汇总每日统计（一次范围查询，行数只与天数有关）
+    bucket = _bucket_expression(UserDailyStats.day, granularity, db.get_bind().dialect.name)
+    rows = db.query(
+        bucket.label('bucket'),
+        func.sum(UserDailyStats.prompts_created).label('count'),
+        func.sum(UserDailyStats.views).label('views')
+    ).filter(
+        UserDailyStats.user_id == current_user.id,
+        UserDailyStats.day >= start_date,
+        UserDailyStats.day <= end_date
+    ).group_by(bucket).all()
+    
+    counts = {}
+    for row in rows:
+        day = row.bucket if isinstance(row.bucket, date) else date.fromisoformat(row.bucket)
+        key = _bucket_start(day, granularity)
+        count, views = counts.get(key, (0, 0))
+        counts[key] = (count + row.count, views + row.views)
+    
+    # 补齐没有数据的时间桶
     daily_creations = []
-    current_date = start_date
+    current_date = _bucket_start(start_date, granularity)
     while current_date <= end_date:
-        count = db.query(Prompt).filter(
-            Prompt.user_id == current_user.id,
-            func.date(Prompt.created_at) == current_date
-        ).count()
-        
+        count, views = counts.get(current_date, (0, 0))
         daily_creations.append({
             "date": current_date.isoformat(),
-            "count": count
+            "count": count,
+            "views": views
         })
-        current_date += timedelta(days=1)
+        current_date = _next_bucket(current_date, granularity)
     
     # 标签使用统计
     tag_usage = db.query(
         Tag.name,
         Tag.color,
-        func.count(Prompt.id).label('usage_count')
-    ).join(Prompt.tags).filter(
-        Prompt.user_id == current_user.id
-    ).group_by(Tag.id, Tag.name, Tag.color).order_by(
-        desc(func.count(Prompt.id))
-    ).limit(10).all()
+        UserTagStats.usage_count
+    ).join(UserTagStats, UserTagStats.tag_id == Tag.id).filter(
+        UserTagStats.user_id == current_user.id,
+        UserTagStats.usage_count > 0
+    ).order_by(desc(UserTagStats.usage_count)).limit(10).all()
     
     return {
         "daily_creations": daily_creations,
@@ -151,50 +216,47 @@ async def get_trends(
         "period": {
             "start_date": start_date.isoformat(),
             "end_date": end_date.isoformat(),
-            "days": days
+            "days": days,
+            "granularity": granularity
         }
     }
 
 @router.get("/export-stats")
-async def get_export_stats(
+def get_export_stats(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ) -> Dict[str, Any]:
     """获取导出统计数据"""
     
-    # 计算内容长度分布
-    prompts = db.query(Prompt).filter(Prompt.user_id == current_user.id).all()
+    # 内容长度分布及总量（只读取 content_length，不加载内容）
+    length = Prompt.content_length
+    stats = db.query(
+        func.count(Prompt.id).label('total_prompts'),
+        func.sum(length).label('total_characters'),
+        func.sum(case((length < 100, 1), else_=0)).label('short'),                          # < 100 字符
+        func.sum(case(((length >= 100) & (length < 500), 1), else_=0)).label('medium'),     # 100-500 字符
+        func.sum(case(((length >= 500) & (length < 1000), 1), else_=0)).label('long'),      # 500-1000 字符
+        func.sum(case((length >= 1000, 1), else_=0)).label('very_long')                     # > 1000 字符
+    ).filter(Prompt.user_id == current_user.id).one()
     
+    total_prompts = stats.total_prompts
+    total_characters = stats.total_characters or 0
     content_length_distribution = {
-        "short": 0,      # < 100 字符
-        "medium": 0,     # 100-500 字符
-        "long": 0,       # 500-1000 字符
-        "very_long": 0   # > 1000 字符
+        "short": stats.short or 0,
+        "medium": stats.medium or 0,
+        "long": stats.long or 0,
+        "very_long": stats.very_long or 0
     }
     
-    total_characters = 0
-    for prompt in prompts:
-        content_length = len(prompt.content)
-        total_characters += content_length
-        
-        if content_length < 100:
-            content_length_distribution["short"] += 1
-        elif content_length < 500:
-            content_length_distribution["medium"] += 1
-        elif content_length < 1000:
-            content_length_distribution["long"] += 1
-        else:
-            content_length_distribution["very_long"] += 1
-    
     # 平均内容长度
-    avg_content_length = total_characters // len(prompts) if prompts else 0
+    avg_content_length = total_characters // total_prompts if total_prompts else 0
     
     # 最长和最短的提示词
-    if prompts:
-        longest_prompt = max(prompts, key=lambda p: len(p.content))
-        shortest_prompt = min(prompts, key=lambda p: len(p.content))
-    else:
-        longest_prompt = shortest_prompt = None
+    base = db.query(Prompt.id, Prompt.title, length.label('length')).filter(
+        Prompt.user_id == current_user.id
+    )
+    longest_prompt = base.order_by(length.desc(), Prompt.id).first()
+    shortest_prompt = base.order_by(length.asc(), Prompt.id).first()
     
     return {
         "content_stats": {
@@ -204,19 +266,52 @@ async def get_export_stats(
             "longest_prompt": {
                 "id": longest_prompt.id,
                 "title": longest_prompt.title,
-                "length": len(longest_prompt.content)
+                "length": longest_prompt.length
             } if longest_prompt else None,
             "shortest_prompt": {
                 "id": shortest_prompt.id,
                 "title": shortest_prompt.title,
-                "length": len(shortest_prompt.content)
+                "length": shortest_prompt.length
             } if shortest_prompt else None
         },
         "export_recommendations": {
-            "best_format": "json" if len(prompts) > 50 else "markdown",
+            "best_format": "json" if total_prompts > 50 else "markdown",
             "estimated_file_size": {
                 "json": f"{(total_characters * 1.5) // 1024}KB",
                 "markdown": f"{(total_characters * 1.2) // 1024}KB"
             }
         }
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/duplicates")
+def get_duplicate_clusters(
+    threshold: float = Query(0.7, ge=0.1, le=1.0, description="最低相似度（Jaccard 估计值）"),
+    limit: int = Query(20, ge=1, le=100, description="最多返回的分组数"),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user)
+) -> Dict[str, Any]:
+    """近似重复的提示词分组（只比较落在同一 LSH 桶中的提示词）"""
+    clusters = find_duplicate_clusters(db.connection(), current_user.id, threshold)
+    
+    shown = clusters[:limit]
+    prompt_ids = [prompt_id for cluster in shown for prompt_id in cluster]
+    titles = dict(
+        db.query(Prompt.id, Prompt.title).filter(Prompt.id.in_(prompt_ids)).all()
+    ) if prompt_ids else {}
+    
+    return {
+        "threshold": threshold,
+        "total_clusters": len(clusters),
+        "duplicate_prompts": sum(len(cluster) for cluster in clusters),
+        "clusters": [
+            {
+                "size": len(cluster),
+                "prompts": [
+                    {"id": prompt_id, "title": titles.get(prompt_id)}
+                    for prompt_id in cluster
+                ]
+            }
+            for cluster in shown
+        ]
+    }
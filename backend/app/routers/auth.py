@@ -1,23 +1,31 @@
-from datetime import timedelta
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from ..database import get_db
-from ..schemas.user import UserCreate, UserLogin, Token, User as UserSchema
+from ..schemas.user import (
+    UserCreate, UserLogin, Token, RefreshRequest, LogoutRequest, TokenData, User as UserSchema
+)
 from ..models.user import User
 from ..utils.auth import (
-    verify_password, 
-    get_password_hash, 
-    create_access_token,
+    verify_password_and_update_async,
+    get_password_hash_async,
+    issue_tokens,
+    decode_refresh_token,
+    verify_token,
     get_current_active_user,
-    ACCESS_TOKEN_EXPIRE_MINUTES
+    Principal
 )
+from ..utils.revocation import token_denylist
 
 router = APIRouter()
 
-@router.post("/register", response_model=UserSchema)
-async def register(user: UserCreate, db: Session = Depends(get_db)):
-    """用户注册"""
+# 注册与登录为 async 函数：密码哈希在独立线程池中计算，等待期间不占用处理请求的线程；
+# 数据库操作仍是同步调用，通过 run_in_threadpool 在线程池中执行
+
+def _check_new_user(db: Session, user: UserCreate):
+    """检查用户名和邮箱是否已被使用"""
     # 检查用户名是否已存在
     db_user = db.query(User).filter(User.username == user.username).first()
     if db_user:
@@ -33,9 +41,8 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="邮箱已注册"
         )
-    
-    # 创建新用户
-    hashed_password = get_password_hash(user.password)
+
+def _create_user(db: Session, user: UserCreate, hashed_password: str) -> User:
     db_user = User(
         username=user.username,
         email=user.email,
@@ -44,30 +51,88 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
-    
     return db_user
 
+@router.post("/register", response_model=UserSchema)
+async def register(user: UserCreate, db: Session = Depends(get_db)):
+    """用户注册"""
+    await run_in_threadpool(_check_new_user, db, user)
+    
+    # 创建新用户
+    hashed_password = await get_password_hash_async(user.password)
+    return await run_in_threadpool(_create_user, db, user, hashed_password)
+
+def _find_user(db: Session, username: str) -> Optional[User]:
+    return db.query(User).filter(User.username == username).first()
+
+def _finish_login(db: Session, user: User, new_hash: Optional[str]) -> dict:
+    # 哈希参数（如 BCRYPT_ROUNDS）变更后按新参数保存
+    if new_hash:
+        user.password_hash = new_hash
+        db.commit()
+    
+    # 创建访问令牌与刷新令牌
+    return issue_tokens(user)
+
 @router.post("/login", response_model=Token)
 async def login(user_login: UserLogin, db: Session = Depends(get_db)):
     """用户登录"""
     # 验证用户
-    user = db.query(User).filter(User.username == user_login.username).first()
-    if not user or not verify_password(user_login.password, user.password_hash):
+    user = await run_in_threadpool(_find_user, db, user_login.username)
+    if user:
+        valid, new_hash = await verify_password_and_update_async(user_login.password, user.password_hash)
+    else:
+        valid, new_hash = False, None
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="用户名或密码错误",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # 创建访问令牌
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
-    )
+    return await run_in_threadpool(_finish_login, db, user, new_hash)
+
+@router.post("/refresh", response_model=Token)
+def refresh(request: RefreshRequest, db: Session = Depends(get_db)):
+    """用刷新令牌换取新的令牌（轮换：旧刷新令牌随即失效，只能使用一次）"""
+    token_data = decode_refresh_token(request.refresh_token)
+    if not token_denylist.revoke(token_data.jti, token_data.user_id, "refresh", token_data.expires_at):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="刷新令牌无效或已过期",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    user = db.query(User).filter(User.id == token_data.user_id).first()
+    if not user or not user.is_active or user.username != token_data.username:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="用户不存在或已停用",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    return issue_tokens(user)
+
+@router.post("/logout")
+def logout(
+    request: Optional[LogoutRequest] = None,
+    token_data: TokenData = Depends(verify_token),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """退出登录：吊销当前访问令牌，以及请求中一并提交的刷新令牌"""
+    if token_data.jti is not None:
+        token_denylist.revoke(token_data.jti, current_user.id, "access", token_data.expires_at)
+    if request is not None and request.refresh_token:
+        try:
+            refresh_data = decode_refresh_token(request.refresh_token)
+        except HTTPException:
+            refresh_data = None
+        if refresh_data is not None and refresh_data.user_id == current_user.id:
+            token_denylist.revoke(refresh_data.jti, current_user.id, "refresh", refresh_data.expires_at)
     
-    return {"access_token": access_token, "token_type": "bearer"}
+    return {"message": "已退出登录"}
 
 @router.get("/me", response_model=UserSchema)
-async def read_users_me(current_user: User = Depends(get_current_active_user)):
+def read_users_me(current_user: Principal = Depends(get_current_active_user)):
     """获取当前用户信息"""
     return current_user
\ No newline at end of file
@@ -5,16 +5,17 @@ from typing import List
 from ..database import get_db
 from ..schemas.category import Category as CategorySchema, CategoryCreate, CategoryUpdate
 from ..models.prompt import Category
-from ..models.user import User
-from ..utils.auth import get_current_active_user
+from ..models.rollup import UserCategoryStats
+from ..utils.auth import Principal, get_current_active_user
+from ..utils.cache import invalidate_category_caches
 
 router = APIRouter()
 
 @router.post("/", response_model=CategorySchema)
-async def create_category(
+def create_category(
     category: CategoryCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """创建新的分类"""
     # 检查分类名称是否已存在
@@ -36,13 +37,14 @@ async def create_category(
     db.add(db_category)
     db.commit()
     db.refresh(db_category)
+    invalidate_category_caches(current_user.id)
     
     return db_category
 
 @router.get("/", response_model=List[CategorySchema])
-async def list_categories(
+def list_categories(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """获取用户的所有分类"""
     categories = db.query(Category).filter(
@@ -52,10 +54,10 @@ async def list_categories(
     return categories
 
 @router.get("/{category_id}", response_model=CategorySchema)
-async def get_category(
+def get_category(
     category_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """获取单个分类"""
     category = db.query(Category).filter(
@@ -72,11 +74,11 @@ async def get_category(
     return category
 
 @router.put("/{category_id}", response_model=CategorySchema)
-async def update_category(
+def update_category(
     category_id: int,
     category_update: CategoryUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """更新分类"""
     category = db.query(Category).filter(
@@ -111,14 +113,15 @@ async def update_category(
     
     db.commit()
     db.refresh(category)
+    invalidate_category_caches(current_user.id)
     
     return category
 
 @router.delete("/{category_id}")
-async def delete_category(
+def delete_category(
     category_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """删除分类"""
     category = db.query(Category).filter(
@@ -139,7 +142,9 @@ async def delete_category(
             detail="该分类下还有提示词，无法删除"
         )
     
+    db.query(UserCategoryStats).filter(UserCategoryStats.category_id == category.id).delete()
     db.delete(category)
     db.commit()
+    invalidate_category_caches(current_user.id)
     
     return {"message": "分类已删除"}
\ No newline at end of file
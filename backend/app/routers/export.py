@@ -1,288 +1,605 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
-from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session, joinedload
-import json
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Header, Query
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy.orm import Session, selectinload
+import csv
 import io
-from typing import List, Optional
+import json
+import os
+import re
+import shutil
+import zipfile
+from typing import Any, Callable, List, NamedTuple, Optional
 
-from ..database import get_db
-from ..models.prompt import Prompt, Category, Tag
-from ..models.user import User
-from ..utils.auth import get_current_active_user
+from ..database import SessionLocal, get_db
+from ..models.prompt import Prompt, Category
+from ..models.job import Job
+from ..schemas.job import ExportJobCreate
+from ..utils.auth import Principal, get_current_active_user
+from ..utils.cache import invalidate_prompt_caches
+from ..utils.compression import FILE_MEDIA_TYPES, FILE_SUFFIXES, compress_stream, is_available, negotiate_encoding
+from ..utils.import_formats import IMPORT_FORMATS, parse_upload
+from ..utils.importer import IMPORT_CHUNK_SIZE, BulkImporter
+from ..utils.jobs import JOB_MAX_PER_USER, JobContext, artifact_path, job_manager, job_to_dict, remove_artifact
 
 router = APIRouter()
 
+# 流式导出时每批读取的提示词数量
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+# 输出缓冲达到该字节数时发送一次
+EXPORT_CHUNK_SIZE = 64 * 1024
+
 @router.get("/prompts")
-async def export_prompts(
+def export_prompts(
     format: str = "json",
-    prompt_ids: Optional[List[int]] = None,
+    prompt_ids: Optional[List[int]] = Query(None, description="只导出指定的提示词（可重复：?prompt_ids=1&prompt_ids=2）"),
+    compression: str = Query("auto", regex="^(auto|none|gzip|zstd)$", description="auto 按 Accept-Encoding 协商传输压缩；gzip/zstd 下载压缩文件"),
+    bundle: bool = Query(False, description="打包为 ZIP，每个分类一个文件"),
+    accept_encoding: Optional[str] = Header(None),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """导出Prompt"""
-    query = db.query(Prompt).options(
-        joinedload(Prompt.category),
-        joinedload(Prompt.tags)
-    ).filter(Prompt.user_id == current_user.id)
+    _check_export_options(format, compression, bundle)
     
-    if prompt_ids:
-        query = query.filter(Prompt.id.in_(prompt_ids))
+    scope = ExportScope(current_user.id, prompt_ids)
+    body, media_type, filename = _export_body(db, format, scope, bundle)
+    headers = {}
     
-    prompts = query.all()
+    if compression in ("gzip", "zstd"):
+        # 下载压缩文件
+        body = compress_stream(body, compression)
+        media_type = FILE_MEDIA_TYPES[compression]
+        filename += FILE_SUFFIXES[compression]
+    elif compression == "auto" and not bundle:
+        # 传输压缩，浏览器会自动解压
+        headers["Vary"] = "Accept-Encoding"
+        encoding = negotiate_encoding(accept_encoding)
+        if encoding:
+            body = compress_stream(body, encoding)
+            headers["Content-Encoding"] = encoding
     
-    if format == "json":
-        return export_json(prompts)
-    elif format == "markdown":
-        return export_markdown(prompts)
-    else:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="不支持的导出格式"
-        )
+    headers["Content-Disposition"] = f"attachment; filename={filename}"
+    return StreamingResponse(body, media_type=media_type, headers=headers)
+
+# 各导出格式的 (媒体类型, 扩展名)
+EXPORT_FORMATS = {
+    "json": ("application/json", "json"),
+    "markdown": ("text/markdown", "md"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+}
+
+# 不按分类过滤
+ALL_CATEGORIES = object()
+
+class ExportScope(NamedTuple):
+    """导出范围：用户的全部或指定提示词，可限定分类（None 表示未分类）"""
+    user_id: int
+    prompt_ids: Optional[List[int]] = None
+    category_id: Any = ALL_CATEGORIES
+    # 每批提示词输出后回调 progress(数量)，后台任务用于上报进度
+    progress: Optional[Callable[[int], None]] = None
 
-def export_json(prompts: List[Prompt]):
-    """导出为JSON格式"""
-    export_data = {
-        "export_info": {
-            "version": "1.0",
-            "exported_at": "2024-01-01T00:00:00Z",
-            "total_prompts": len(prompts)
-        },
-        "prompts": []
+def _export_query(db: Session, scope: ExportScope):
+    """导出范围内的提示词查询"""
+    query = db.query(Prompt).filter(Prompt.user_id == scope.user_id)
+    if scope.prompt_ids:
+        query = query.filter(Prompt.id.in_(scope.prompt_ids))
+    if scope.category_id is not ALL_CATEGORIES:
+        query = query.filter(Prompt.category_id == scope.category_id)
+    return query
+
+def iter_prompt_batches(scope: ExportScope, batch_size: int = EXPORT_BATCH_SIZE):
+    """按 id 分批读取提示词（预加载分类和标签）
+    
+    响应开始发送后请求的数据库会话可能已关闭，这里使用独立会话；
+    每批处理完后清空会话，内存占用与导出总量无关。
+    """
+    db = SessionLocal()
+    try:
+        last_id = 0
+        while True:
+            batch = _export_query(db, scope).options(
+                selectinload(Prompt.category),
+                selectinload(Prompt.tags)
+            ).filter(Prompt.id > last_id).order_by(Prompt.id).limit(batch_size).all()
+            if not batch:
+                return
+            yield batch
+            if scope.progress is not None:
+                scope.progress(len(batch))
+            last_id = batch[-1].id
+            db.expunge_all()
+    finally:
+        db.close()
+
+def _prompt_to_dict(prompt: Prompt) -> dict:
+    """导出时单个提示词的数据结构"""
+    return {
+        "id": prompt.id,
+        "title": prompt.title,
+        "content": prompt.content,
+        "description": prompt.description,
+        "is_public": prompt.is_public,
+        "is_favorite": prompt.is_favorite,
+        "view_count": prompt.view_count,
+        "created_at": prompt.created_at.isoformat(),
+        "updated_at": prompt.updated_at.isoformat(),
+        "category": {
+            "name": prompt.category.name,
+            "color": prompt.category.color
+        } if prompt.category else None,
+        "tags": [
+            {
+                "name": tag.name,
+                "color": tag.color
+            } for tag in prompt.tags
+        ]
     }
+
+def _indent_json(value, level: int) -> str:
+    """序列化为缩进 JSON，并整体右移 level 个空格（与 json.dumps(indent=2) 的整体输出一致）"""
+    text = json.dumps(value, ensure_ascii=False, indent=2)
+    return text.replace("\n", "\n" + " " * level)
+
+def _buffered(pieces, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """将文本片段编码并合并为较大的块再发送，避免大量小块写入"""
+    buffer = []
+    size = 0
+    for piece in pieces:
+        data = piece.encode('utf-8')
+        buffer.append(data)
+        size += len(data)
+        if size >= chunk_size:
+            yield b"".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b"".join(buffer)
+
+def generate_json(scope: ExportScope, total: int):
+    """逐个生成 JSON 导出内容的文本片段"""
+    export_info = {
+        "version": "1.0",
+        "exported_at": "2024-01-01T00:00:00Z",
+        "total_prompts": total
+    }
+    yield '{\n  "export_info": ' + _indent_json(export_info, 2) + ',\n  "prompts": ['
     
-    for prompt in prompts:
-        prompt_data = {
-            "id": prompt.id,
-            "title": prompt.title,
-            "content": prompt.content,
-            "description": prompt.description,
-            "is_public": prompt.is_public,
-            "is_favorite": prompt.is_favorite,
-            "view_count": prompt.view_count,
-            "created_at": prompt.created_at.isoformat(),
-            "updated_at": prompt.updated_at.isoformat(),
-            "category": {
-                "name": prompt.category.name,
-                "color": prompt.category.color
-            } if prompt.category else None,
-            "tags": [
-                {
-                    "name": tag.name,
-                    "color": tag.color
-                } for tag in prompt.tags
-            ]
-        }
-        export_data["prompts"].append(prompt_data)
+    first = True
+    for batch in iter_prompt_batches(scope):
+        for prompt in batch:
+            yield ("\n    " if first else ",\n    ") + _indent_json(_prompt_to_dict(prompt), 4)
+            first = False
     
-    json_str = json.dumps(export_data, ensure_ascii=False, indent=2)
-    json_bytes = io.BytesIO(json_str.encode('utf-8'))
+    yield "]\n}" if first else "\n  ]\n}"
+
+def render_markdown_prompt(index: int, prompt: Prompt) -> str:
+    """渲染单个提示词的 Markdown 片段"""
+    parts = [f"## {index}. {prompt.title}\n\n"]
     
-    return StreamingResponse(
-        io.BytesIO(json_bytes.getvalue()),
-        media_type="application/json",
-        headers={"Content-Disposition": "attachment; filename=prompts_export.json"}
-    )
+    # 元信息
+    metadata = []
+    if prompt.category:
+        metadata.append(f"分类: {prompt.category.name}")
+    if prompt.tags:
+        tag_names = [tag.name for tag in prompt.tags]
+        metadata.append(f"标签: {', '.join(tag_names)}")
+    if prompt.is_favorite:
+        metadata.append("⭐ 收藏")
+    if prompt.is_public:
+        metadata.append("🌐 公开")
+    
+    if metadata:
+        parts.append(f"**元信息**: {' | '.join(metadata)}\n\n")
+    
+    if prompt.description:
+        parts.append(f"**描述**: {prompt.description}\n\n")
+    
+    # 围栏比内容中最长的连续反引号更长，内容中的 ``` 不会提前结束内容块
+    longest = max((len(run) for run in re.findall(r"`+", prompt.content)), default=0)
+    fence = "`" * max(3, longest + 1)
+    parts.append(f"**内容**:\n{fence}\n{prompt.content}\n{fence}\n\n")
+    parts.append(f"**统计**: 查看 {prompt.view_count} 次 | 创建于 {prompt.created_at.strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+    parts.append("---\n\n")
+    return "".join(parts)
 
-def export_markdown(prompts: List[Prompt]):
-    """导出为Markdown格式"""
-    markdown_content = "# 我的Prompt集合\n\n"
-    markdown_content += f"导出时间: {prompts[0].created_at.strftime('%Y-%m-%d %H:%M:%S') if prompts else ''}\n\n"
-    markdown_content += f"总数: {len(prompts)} 个提示词\n\n"
-    markdown_content += "---\n\n"
+def generate_markdown(scope: ExportScope, total: int, first_created_at):
+    """逐个生成 Markdown 导出内容的文本片段"""
+    yield "# 我的Prompt集合\n\n"
+    yield f"导出时间: {first_created_at.strftime('%Y-%m-%d %H:%M:%S') if first_created_at else ''}\n\n"
+    yield f"总数: {total} 个提示词\n\n"
+    yield "---\n\n"
     
-    for i, prompt in enumerate(prompts, 1):
-        markdown_content += f"## {i}. {prompt.title}\n\n"
-        
-        # 元信息
-        metadata = []
-        if prompt.category:
-            metadata.append(f"分类: {prompt.category.name}")
-        if prompt.tags:
-            tag_names = [tag.name for tag in prompt.tags]
-            metadata.append(f"标签: {', '.join(tag_names)}")
-        if prompt.is_favorite:
-            metadata.append("⭐ 收藏")
-        if prompt.is_public:
-            metadata.append("🌐 公开")
-        
-        if metadata:
-            markdown_content += f"**元信息**: {' | '.join(metadata)}\n\n"
-        
-        if prompt.description:
-            markdown_content += f"**描述**: {prompt.description}\n\n"
-        
-        markdown_content += f"**内容**:\n```\n{prompt.content}\n```\n\n"
-        markdown_content += f"**统计**: 查看 {prompt.view_count} 次 | 创建于 {prompt.created_at.strftime('%Y-%m-%d %H:%M:%S')}\n\n"
-        markdown_content += "---\n\n"
+    index = 0
+    for batch in iter_prompt_batches(scope):
+        for prompt in batch:
+            index += 1
+            yield render_markdown_prompt(index, prompt)
+
+def generate_ndjson(scope: ExportScope):
+    """每行一个提示词的 JSON 对象"""
+    for batch in iter_prompt_batches(scope):
+        for prompt in batch:
+            yield json.dumps(_prompt_to_dict(prompt), ensure_ascii=False) + "\n"
+
+# CSV 列；tags 为标签名的 JSON 数组（标签名本身可能含逗号）
+CSV_FIELDS = [
+    "id", "title", "description", "content", "category", "tags",
+    "is_public", "is_favorite", "view_count", "created_at", "updated_at"
+]
+
+class _LineWriter:
+    """csv.writer 的输出目标，直接返回写入的行"""
+    def write(self, value):
+        return value
+
+def generate_csv(scope: ExportScope):
+    """逐行生成 CSV（带 BOM，便于 Excel 识别 UTF-8）"""
+    writer = csv.writer(_LineWriter())
+    yield "\ufeff" + writer.writerow(CSV_FIELDS)
+    for batch in iter_prompt_batches(scope):
+        for prompt in batch:
+            yield writer.writerow([
+                prompt.id,
+                prompt.title,
+                prompt.description or "",
+                prompt.content,
+                prompt.category.name if prompt.category else "",
+                json.dumps([tag.name for tag in prompt.tags], ensure_ascii=False),
+                str(bool(prompt.is_public)).lower(),
+                str(bool(prompt.is_favorite)).lower(),
+                prompt.view_count or 0,
+                prompt.created_at.isoformat(),
+                prompt.updated_at.isoformat()
+            ])
+
+def export_pieces(db: Session, format: str, scope: ExportScope):
+    """查询头部信息并返回该格式的文本片段生成器"""
+    if format == "json":
+        return generate_json(scope, _export_query(db, scope).count())
+    if format == "markdown":
+        query = _export_query(db, scope)
+        first_created_at = query.with_entities(Prompt.created_at).order_by(Prompt.id).limit(1).scalar()
+        return generate_markdown(scope, query.count(), first_created_at)
+    if format == "ndjson":
+        return generate_ndjson(scope)
+    return generate_csv(scope)
+
+# ZIP 包中未分类提示词的文件名
+UNCATEGORIZED_NAME = "未分类"
+
+def _bundle_categories(db: Session, scope: ExportScope):
+    """导出范围内出现的分类 [(分类ID, 文件名)]，未分类为 (None, "未分类")"""
+    category_ids = {
+        row.category_id
+        for row in _export_query(db, scope).with_entities(Prompt.category_id).distinct()
+    }
+    names = dict(
+        db.query(Category.id, Category.name).filter(Category.id.in_(category_ids - {None})).all()
+    ) if category_ids - {None} else {}
     
-    markdown_bytes = io.BytesIO(markdown_content.encode('utf-8'))
+    entries = []
+    # 预留未分类的文件名，同名分类改用带编号的文件名
+    used = {UNCATEGORIZED_NAME}
+    for category_id in sorted(category_ids - {None}):
+        base = re.sub(r'[\\/:*?"<>|]', "_", names[category_id]).strip() or f"category_{category_id}"
+        name, suffix = base, 1
+        while name in used:
+            name = f"{base}_{category_id}" if suffix == 1 else f"{base}_{category_id}_{suffix}"
+            suffix += 1
+        used.add(name)
+        entries.append((category_id, name))
+    if None in category_ids:
+        entries.append((None, UNCATEGORIZED_NAME))
+    return entries
+
+class _ChunkSink(io.RawIOBase):
+    """收集 ZipFile 写出的数据，不支持 seek，ZipFile 会改用数据描述符流式写入"""
+    def __init__(self):
+        self.chunks = []
     
-    return StreamingResponse(
-        io.BytesIO(markdown_bytes.getvalue()),
-        media_type="text/markdown",
-        headers={"Content-Disposition": "attachment; filename=prompts_export.md"}
-    )
+    def writable(self):
+        return True
+    
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+    
+    def take(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+def generate_bundle(format: str, scope: ExportScope, categories):
+    """生成 ZIP 包，每个分类一个文件"""
+    _, extension = EXPORT_FORMATS[format]
+    sink = _ChunkSink()
+    db = SessionLocal()
+    try:
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for category_id, name in categories:
+                pieces = export_pieces(db, format, scope._replace(category_id=category_id))
+                with archive.open(f"{name}.{extension}", "w", force_zip64=True) as entry:
+                    for chunk in _buffered(pieces):
+                        entry.write(chunk)
+                        data = sink.take()
+                        if data:
+                            yield data
+        yield sink.take()
+    finally:
+        db.close()
+
+def _check_export_options(format: str, compression: str, bundle: bool):
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="不支持的导出格式"
+        )
+    if compression in ("gzip", "zstd"):
+        if bundle:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="ZIP打包已经过压缩，不能再指定压缩格式"
+            )
+        if not is_available(compression):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"服务器未启用 {compression} 压缩"
+            )
+
+def _export_body(db: Session, format: str, scope: ExportScope, bundle: bool):
+    """导出内容的 (字节块生成器, 媒体类型, 文件名)"""
+    if bundle:
+        body = generate_bundle(format, scope, _bundle_categories(db, scope))
+        return body, "application/zip", "prompts_export.zip"
+    media_type, extension = EXPORT_FORMATS[format]
+    return _buffered(export_pieces(db, format, scope)), media_type, f"prompts_export.{extension}"
 
 @router.post("/import")
-async def import_prompts(
+def import_prompts(
     file: UploadFile = File(...),
     format: str = Form(...),
+    chunk_size: int = Form(IMPORT_CHUNK_SIZE, ge=1, le=10000),
+    dedupe: str = Form("skip", regex="^(skip|update|keep)$", description="内容重复时：skip 跳过，update 更新已有提示词，keep 仍然新建"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
-    """导入Prompt"""
-    if format not in ["json", "markdown"]:
+    """导入Prompt
+
+    上传文件按块读取并逐条解析，每满 chunk_size 条批量写入一次，
+    不会把整个文件读入内存。同步处理函数在线程池中执行，不阻塞事件循环。
+    """
+    if format not in IMPORT_FORMATS:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="不支持的导入格式"
         )
     
     try:
-        content = await file.read()
-        content_str = content.decode('utf-8')
-        
-        if format == "json":
-            imported_count = await import_from_json(content_str, db, current_user)
-        else:
-            imported_count = await import_from_markdown(content_str, db, current_user)
+        importer = BulkImporter(db, current_user.id, chunk_size, dedupe)
+        importer.add_all(parse_upload(file.file, format))
+        imported_count = importer.finish()
+        invalidate_prompt_caches(current_user.id)
         
         return {
             "message": f"成功导入 {imported_count} 个提示词",
-            "imported_count": imported_count
+            "imported_count": imported_count,
+            "updated_count": importer.updated_count,
+            "skipped_count": importer.skipped_count,
+            "chunks": importer.chunks
         }
         
     except Exception as e:
+        # 已写入的块尚未提交，整体回滚
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"导入失败: {str(e)}"
         )
 
-async def import_from_json(content: str, db: Session, user: User) -> int:
-    """从JSON导入"""
+# ---------- 后台任务 ----------
+
+def _check_job_quota(db: Session, user_id: int):
+    if job_manager.active_count(db, user_id) >= JOB_MAX_PER_USER:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"同时进行的任务不能超过 {JOB_MAX_PER_USER} 个，请等待当前任务完成"
+        )
+
+def _get_user_job(db: Session, job_id: int, user_id: int) -> Job:
+    job = db.query(Job).filter(Job.id == job_id, Job.user_id == user_id).first()
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="任务不存在"
+        )
+    return job
+
+@router.post("/jobs", status_code=status.HTTP_202_ACCEPTED)
+def create_export_job(
+    job_in: ExportJobCreate,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """创建后台导出任务，完成后通过 download_url 下载"""
+    _check_export_options(job_in.format, job_in.compression, job_in.bundle)
+    _check_job_quota(db, current_user.id)
+    
+    job = Job(user_id=current_user.id, kind="export", params=job_in.model_dump_json())
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    job_manager.submit(job.id)
+    return job_to_dict(job)
+
+@router.post("/import/jobs", status_code=status.HTTP_202_ACCEPTED)
+def create_import_job(
+    file: UploadFile = File(...),
+    format: str = Form(...),
+    chunk_size: int = Form(IMPORT_CHUNK_SIZE, ge=1, le=10000),
+    dedupe: str = Form("skip", regex="^(skip|update|keep)$"),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """创建后台导入任务，上传的文件先保存到任务目录"""
+    if format not in IMPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="不支持的导入格式"
+        )
+    _check_job_quota(db, current_user.id)
+    
+    job = Job(
+        user_id=current_user.id,
+        kind="import",
+        params=json.dumps({"format": format, "chunk_size": chunk_size, "dedupe": dedupe}),
+        filename=file.filename
+    )
+    db.add(job)
+    db.flush()
+    job.artifact_path = artifact_path(job.id, ".upload")
+    os.makedirs(os.path.dirname(job.artifact_path), exist_ok=True)
+    with open(job.artifact_path, "wb") as target:
+        shutil.copyfileobj(file.file, target, EXPORT_CHUNK_SIZE)
+    job.bytes_total = os.path.getsize(job.artifact_path)
+    db.commit()
+    db.refresh(job)
+    job_manager.submit(job.id)
+    return job_to_dict(job)
+
+@router.get("/jobs")
+def list_jobs(
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """最近的后台任务"""
+    jobs = db.query(Job).filter(Job.user_id == current_user.id).order_by(Job.id.desc()).limit(limit).all()
+    return [job_to_dict(job) for job in jobs]
+
+@router.get("/jobs/{job_id}")
+def get_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """任务状态、进度与吞吐量"""
+    return job_to_dict(_get_user_job(db, job_id, current_user.id))
+
+@router.get("/jobs/{job_id}/download")
+def download_job_artifact(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """下载导出任务的产物"""
+    job = _get_user_job(db, job_id, current_user.id)
+    if job.kind != "export" or job.status != "completed":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="任务尚未完成，暂无可下载的文件"
+        )
+    if not job.artifact_path or not os.path.exists(job.artifact_path):
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="导出文件已过期，请重新导出"
+        )
+    return FileResponse(job.artifact_path, media_type=job.media_type, filename=job.filename)
+
+def run_export_job(context: JobContext) -> dict:
+    """执行导出任务：写入临时文件，完成后改名为正式产物"""
+    params = ExportJobCreate(**context.params)
+    db = SessionLocal()
     try:
-        data = json.loads(content)
-        prompts_data = data.get("prompts", []) if isinstance(data, dict) else data
+        scope = ExportScope(
+            context.user_id,
+            params.prompt_ids,
+            progress=lambda count: context.report(processed=context.processed + count)
+        )
+        context.report(total=_export_query(db, scope).count(), processed=0, bytes_done=0)
+        body, media_type, filename = _export_body(db, params.format, scope, params.bundle)
+        suffix = os.path.splitext(filename)[1]
+        if params.compression != "none":
+            body = compress_stream(body, params.compression)
+            media_type = FILE_MEDIA_TYPES[params.compression]
+            filename += FILE_SUFFIXES[params.compression]
+            suffix += FILE_SUFFIXES[params.compression]
         
-        imported_count = 0
-        for prompt_data in prompts_data:
-            # 检查必要字段
-            if not prompt_data.get("title") or not prompt_data.get("content"):
-                continue
-            
-            # 处理分类
-            category_id = None
-            if prompt_data.get("category"):
-                category_name = prompt_data["category"].get("name")
-                category_color = prompt_data["category"].get("color", "#e07a47")
-                if category_name:
-                    category = db.query(Category).filter(
-                        Category.name == category_name,
-                        Category.user_id == user.id
-                    ).first()
-                    if not category:
-                        category = Category(
-                            name=category_name,
-                            color=category_color,
-                            user_id=user.id
-                        )
-                        db.add(category)
-                        db.flush()
-                    category_id = category.id
-            
-            # 创建提示词
-            prompt = Prompt(
-                title=prompt_data["title"],
-                content=prompt_data["content"],
-                description=prompt_data.get("description"),
-                is_public=prompt_data.get("is_public", False),
-                is_favorite=prompt_data.get("is_favorite", False),
-                category_id=category_id,
-                user_id=user.id
-            )
-            db.add(prompt)
-            db.flush()
-            
-            # 处理标签
-            if prompt_data.get("tags"):
-                for tag_data in prompt_data["tags"]:
-                    tag_name = tag_data.get("name")
-                    tag_color = tag_data.get("color", "#0066cc")
-                    if tag_name:
-                        tag = db.query(Tag).filter(Tag.name == tag_name).first()
-                        if not tag:
-                            tag = Tag(name=tag_name, color=tag_color)
-                            db.add(tag)
-                            db.flush()
-                        prompt.tags.append(tag)
-            
-            imported_count += 1
+        path = artifact_path(context.id, suffix)
+        temp_path = path + ".part"
+        try:
+            with open(temp_path, "wb") as target:
+                for chunk in body:
+                    target.write(chunk)
+                    context.report(bytes_done=context.bytes_done + len(chunk))
+            os.replace(temp_path, path)
+        finally:
+            remove_artifact(temp_path)
         
+        db.query(Job).filter(Job.id == context.id).update(
+            {"artifact_path": path, "filename": filename, "media_type": media_type},
+            synchronize_session=False
+        )
         db.commit()
-        return imported_count
+        return {"exported_count": context.processed, "size": context.bytes_done}
+    finally:
+        db.close()
+
+def run_import_job(context: JobContext) -> dict:
+    """执行导入任务
+
+    与同步导入不同，每块记录单独提交并在同一事务内保存断点（已读取的记录数与各项计数），
+    任务中断后重新执行时跳过已提交的记录；任务失败时已提交的部分会保留。
+    """
+    chunk_size = context.params.get("chunk_size", IMPORT_CHUNK_SIZE)
+    # 中断前已提交的断点
+    previous = dict(context.checkpoint)
+    committed_records = previous.get("records", 0)
+    db = SessionLocal()
+    try:
+        importer = BulkImporter(db, context.user_id, chunk_size, context.params.get("dedupe", "skip"))
         
-    except json.JSONDecodeError:
-        raise ValueError("无效的JSON格式")
-
-async def import_from_markdown(content: str, db: Session, user: User) -> int:
-    """从Markdown导入"""
-    lines = content.split('\n')
-    prompts = []
-    current_prompt = None
-    content_lines = []
-    in_content_block = False
-    
-    for line in lines:
-        line = line.strip()
+        def counts() -> dict:
+            # 加上中断前已提交的计数
+            return {
+                name: previous.get(name, 0) + getattr(importer, f"{name}_count")
+                for name in ("imported", "updated", "skipped")
+            }
         
-        # 检测标题
-        if line.startswith('## ') and not line.startswith('### '):
-            # 保存上一个提示词
-            if current_prompt and content_lines:
-                current_prompt['content'] = '\n'.join(content_lines).strip()
-                prompts.append(current_prompt)
-            
-            # 开始新的提示词
-            title = line[3:].strip()
-            # 移除编号（如果有）
-            if '. ' in title:
-                title = title.split('. ', 1)[1]
-            
-            current_prompt = {'title': title}
-            content_lines = []
-            in_content_block = False
-            
-        elif current_prompt:
-            # 检测描述
-            if line.startswith('**描述**:'):
-                current_prompt['description'] = line[6:].strip()
-            
-            # 检测内容块
-            elif line.startswith('**内容**:'):
-                in_content_block = True
-                content_lines = []
-            elif line == '```' and in_content_block:
-                in_content_block = False
-            elif in_content_block and line != '```':
-                content_lines.append(line)
-    
-    # 保存最后一个提示词
-    if current_prompt and content_lines:
-        current_prompt['content'] = '\n'.join(content_lines).strip()
-        prompts.append(current_prompt)
-    
-    # 导入到数据库
-    imported_count = 0
-    for prompt_data in prompts:
-        if prompt_data.get('title') and prompt_data.get('content'):
-            prompt = Prompt(
-                title=prompt_data['title'],
-                content=prompt_data['content'],
-                description=prompt_data.get('description'),
-                user_id=user.id
-            )
-            db.add(prompt)
-            imported_count += 1
-    
-    db.commit()
-    return imported_count
\ No newline at end of file
+        def commit(records: int, bytes_done: int):
+            importer.flush()
+            progress = counts()
+            context.processed = sum(progress.values())
+            context.bytes_done = bytes_done
+            context.save(db.connection(), checkpoint={"records": records, **progress})
+            importer.commit()
+            invalidate_prompt_caches(context.user_id)
+            context.check_stopped()
+        
+        with open(context.artifact_path, "rb") as source:
+            context.bytes_total = os.path.getsize(context.artifact_path)
+            records = 0
+            for record in parse_upload(source, context.params["format"]):
+                records += 1
+                if records <= committed_records:
+                    continue
+                importer.add(record)
+                if records % chunk_size == 0:
+                    commit(records, source.tell())
+        
+        importer.flush()
+        result = {f"{name}_count": count for name, count in counts().items()}
+        context.processed = sum(result.values())
+        context.bytes_done = context.bytes_total
+        # 任务状态与最后一块数据一起提交
+        context.complete(db.connection(), result)
+        importer.commit()
+        invalidate_prompt_caches(context.user_id)
+        remove_artifact(context.artifact_path)
+        return result
+    finally:
+        db.close()
+
+job_manager.register("export", run_export_job)
+job_manager.register("import", run_import_job)
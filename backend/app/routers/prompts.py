@@ -1,41 +1,59 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import or_
+from sqlalchemy.orm import Session, joinedload, selectinload
 from typing import List, Optional
 
 from ..database import get_db
-from ..schemas.prompt import Prompt as PromptSchema, PromptCreate, PromptUpdate, PromptList
-from ..models.prompt import Prompt, Tag
-from ..models.user import User
-from ..utils.auth import get_current_active_user
+from ..schemas.prompt import Prompt as PromptSchema, PromptCreate, PromptUpdate, PromptListResponse
+from ..models.prompt import Prompt, Tag, compute_content_hash
+from ..utils.auth import Principal, get_current_active_user
+from ..utils.cache import PUBLIC_SCOPE, invalidate_prompt_caches
+from ..utils.pagination import paginate, count_total, total_pages_of
+from ..utils.prompt_views import PROMPT_PREVIEW_LENGTH, VIEW_PATTERN, prompt_list_response, select_view
+from ..utils.rollups import apply_prompt_change, prompt_facts
+from ..utils.search import get_search_backend, normalize_query
+from ..utils.similarity import DEFAULT_THRESHOLD, find_similar, index_prompt, remove_from_index
+from ..utils.view_counter import view_counter
 
 router = APIRouter()
 
 @router.post("/", response_model=PromptSchema)
-async def create_prompt(
+def create_prompt(
     prompt: PromptCreate,
+    dedupe: str = Query("keep", regex="^(keep|skip)$", description="skip：已有相同内容的提示词时直接返回该提示词"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """创建新的Prompt"""
+    if dedupe == "skip":
+        existing = db.query(Prompt).filter(
+            Prompt.user_id == current_user.id,
+            Prompt.content_hash == compute_content_hash(prompt.content)
+        ).order_by(Prompt.id).first()
+        if existing:
+            return existing
+    
     db_prompt = Prompt(
         **prompt.dict(exclude={"tag_ids"}),
         user_id=current_user.id
     )
-    db.add(db_prompt)
-    db.commit()
-    db.refresh(db_prompt)
     
     # 处理标签关联
     if prompt.tag_ids:
         tags = db.query(Tag).filter(Tag.id.in_(prompt.tag_ids)).all()
         db_prompt.tags = tags
-        db.commit()
     
+    db.add(db_prompt)
+    db.flush()
+    apply_prompt_change(db, None, prompt_facts(db_prompt))
+    index_prompt(db, db_prompt)
+    db.commit()
+    db.refresh(db_prompt)
+    
+    invalidate_prompt_caches(current_user.id)
     return db_prompt
 
-@router.get("/", response_model=PromptList)
-async def list_prompts(
+@router.get("/", response_model=PromptListResponse)
+def list_prompts(
     page: int = Query(1, ge=1),
     per_page: int = Query(20, ge=1, le=100),
     category_id: Optional[int] = None,
@@ -44,8 +62,12 @@ async def list_prompts(
     search: Optional[str] = None,
     sort_by: str = Query("created_at", regex="^(created_at|updated_at|view_count|title)$"),
     sort_order: str = Query("desc", regex="^(asc|desc)$"),
+    cursor: Optional[str] = Query(None, description="游标分页：首页传空字符串，之后传上一页的 next_cursor"),
+    total_mode: str = Query("exact", regex="^(exact|estimate|none)$", description="总数计算方式：exact 实时统计，estimate 缓存估算，none 不统计"),
+    view: str = Query("full", regex=VIEW_PATTERN, description="返回视图：full 完整内容，summary 只返回内容预览"),
+    preview_length: int = Query(PROMPT_PREVIEW_LENGTH, ge=0, le=2000, description="summary 视图的预览长度（字符）"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """获取Prompt列表"""
     # 使用更高效的查询策略
@@ -58,51 +80,113 @@ async def list_prompts(
         query = query.filter(Prompt.is_public == is_public)
     if is_favorite is not None:
         query = query.filter(Prompt.is_favorite == is_favorite)
+    search = normalize_query(search)
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            or_(
-                Prompt.title.ilike(search_term),
-                Prompt.content.ilike(search_term),
-                Prompt.description.ilike(search_term)
-            )
-        )
-    
-    # 动态排序
-    sort_column = getattr(Prompt, sort_by)
-    if sort_order == "desc":
-        query = query.order_by(sort_column.desc())
-    else:
-        query = query.order_by(sort_column.asc())
+        query = get_search_backend().apply(query, search)
     
     # 计算总数（在分页之前）
-    total = query.count()
+    total = count_total(
+        query,
+        total_mode,
+        cache_owner=current_user.id,
+        cache_key=("list", category_id, is_public, is_favorite, search)
+    )
     
-    # 分页并预加载关联数据
-    offset = (page - 1) * per_page
-    prompts = query.offset(offset).limit(per_page).options(
-        joinedload(Prompt.category),
-        joinedload(Prompt.tags)
-    ).all()
+    # 排序、分页（页码或游标），只查询视图需要的列
+    query = select_view(query, view, preview_length)
+    rows, next_cursor = paginate(
+        query,
+        sort_by=sort_by,
+        sort_key=getattr(Prompt, sort_by),
+        sort_order=sort_order,
+        id_column=Prompt.id,
+        page=page,
+        per_page=per_page,
+        cursor=cursor
+    )
+    
+    # 直接拼装响应，分类与标签按本页 id 批量查询
+    return prompt_list_response(
+        db,
+        rows,
+        view,
+        total=total,
+        page=page,
+        per_page=per_page,
+        total_pages=total_pages_of(total, per_page),
+        next_cursor=next_cursor
+    )
+
+@router.get("/public", response_model=PromptListResponse)
+def list_public_prompts(
+    page: int = Query(1, ge=1),
+    per_page: int = Query(20, ge=1, le=100),
+    category_id: Optional[int] = None,
+    search: Optional[str] = None,
+    sort_by: str = Query("view_count", regex="^(created_at|updated_at|view_count|title)$"),
+    sort_order: str = Query("desc", regex="^(asc|desc)$"),
+    cursor: Optional[str] = Query(None, description="游标分页：首页传空字符串，之后传上一页的 next_cursor"),
+    total_mode: str = Query("exact", regex="^(exact|estimate|none)$", description="总数计算方式：exact 实时统计，estimate 缓存估算，none 不统计"),
+    view: str = Query("full", regex=VIEW_PATTERN, description="返回视图：full 完整内容，summary 只返回内容预览"),
+    preview_length: int = Query(PROMPT_PREVIEW_LENGTH, ge=0, le=2000, description="summary 视图的预览长度（字符）"),
+    db: Session = Depends(get_db)
+):
+    """获取公开的Prompt列表"""
+    # 使用索引优化的查询
+    query = db.query(Prompt).filter(Prompt.is_public == True)
     
-    return PromptList(
-        prompts=prompts,
+    # 应用过滤器
+    if category_id is not None:
+        query = query.filter(Prompt.category_id == category_id)
+    search = normalize_query(search)
+    if search:
+        query = get_search_backend().apply(query, search)
+    
+    # 计算总数
+    total = count_total(
+        query,
+        total_mode,
+        cache_owner=PUBLIC_SCOPE,
+        cache_key=("public", category_id, search)
+    )
+    
+    # 排序、分页（页码或游标），只查询视图需要的列
+    query = select_view(query, view, preview_length)
+    rows, next_cursor = paginate(
+        query,
+        sort_by=sort_by,
+        sort_key=getattr(Prompt, sort_by),
+        sort_order=sort_order,
+        id_column=Prompt.id,
+        page=page,
+        per_page=per_page,
+        cursor=cursor
+    )
+    
+    # 直接拼装响应，分类与标签按本页 id 批量查询
+    return prompt_list_response(
+        db,
+        rows,
+        view,
         total=total,
         page=page,
         per_page=per_page,
-        total_pages=(total + per_page - 1) // per_page
+        total_pages=total_pages_of(total, per_page),
+        next_cursor=next_cursor
     )
 
 @router.get("/{prompt_id}", response_model=PromptSchema)
-async def get_prompt(
+def get_prompt(
     prompt_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """获取单个Prompt"""
+    # 标签用 selectinload 按 prompt_id 单独查询：joinedload 在 LIMIT 子查询外
+    # 连接 prompt_tags JOIN tags 时，SQLite 会物化整张 prompt_tags 表
     prompt = db.query(Prompt).options(
         joinedload(Prompt.category),
-        joinedload(Prompt.tags)
+        selectinload(Prompt.tags)
     ).filter(
         Prompt.id == prompt_id,
         Prompt.user_id == current_user.id
@@ -114,18 +198,21 @@ async def get_prompt(
             detail="Prompt不存在"
         )
     
-    # 增加查看次数
-    prompt.view_count += 1
-    db.commit()
+    # 增加查看次数：先记入内存缓冲，由后台线程批量写回
+    view_counter.record(prompt.id, prompt.user_id)
+    
+    # 返回值包含尚未写回的次数；先脱离会话，避免该修改被写入数据库
+    db.expunge(prompt)
+    prompt.view_count = (prompt.view_count or 0) + view_counter.pending_for(prompt.id)
     
     return prompt
 
 @router.put("/{prompt_id}", response_model=PromptSchema)
-async def update_prompt(
+def update_prompt(
     prompt_id: int,
     prompt_update: PromptUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """更新Prompt"""
     prompt = db.query(Prompt).filter(
@@ -139,6 +226,8 @@ async def update_prompt(
             detail="Prompt不存在"
         )
     
+    before = prompt_facts(prompt)
+    
     # 更新字段
     update_data = prompt_update.dict(exclude_unset=True, exclude={"tag_ids"})
     for field, value in update_data.items():
@@ -152,16 +241,55 @@ async def update_prompt(
         else:
             prompt.tags = []
     
+    apply_prompt_change(db, before, prompt_facts(prompt))
+    if "content" in update_data:
+        index_prompt(db, prompt)
     db.commit()
     db.refresh(prompt)
+    invalidate_prompt_caches(current_user.id)
     
     return prompt
 
+@router.get("/{prompt_id}/similar")
+def get_similar_prompts(
+    prompt_id: int,
+    threshold: float = Query(DEFAULT_THRESHOLD, ge=0.1, le=1.0, description="最低相似度（Jaccard 估计值）"),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """与指定Prompt内容相似的Prompt（基于 LSH 索引，只比较候选）"""
+    exists = db.query(Prompt.id).filter(
+        Prompt.id == prompt_id,
+        Prompt.user_id == current_user.id
+    ).first()
+    
+    if not exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Prompt不存在"
+        )
+    
+    similar = find_similar(db.connection(), prompt_id, current_user.id, threshold, limit)
+    titles = dict(
+        db.query(Prompt.id, Prompt.title).filter(Prompt.id.in_([item_id for item_id, _ in similar])).all()
+    ) if similar else {}
+    
+    return {
+        "prompt_id": prompt_id,
+        "threshold": threshold,
+        "similar": [
+            {"id": item_id, "title": titles[item_id], "similarity": round(similarity, 3)}
+            for item_id, similarity in similar
+            if item_id in titles
+        ]
+    }
+
 @router.post("/{prompt_id}/favorite")
-async def toggle_favorite(
+def toggle_favorite(
     prompt_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """切换收藏状态"""
     prompt = db.query(Prompt).filter(
@@ -175,8 +303,11 @@ async def toggle_favorite(
             detail="Prompt不存在"
         )
     
+    before = prompt_facts(prompt)
     prompt.is_favorite = not prompt.is_favorite
+    apply_prompt_change(db, before, prompt_facts(prompt))
     db.commit()
+    invalidate_prompt_caches(current_user.id)
     
     return {
         "message": "收藏状态已更新",
@@ -184,10 +315,10 @@ async def toggle_favorite(
     }
 
 @router.post("/{prompt_id}/public")
-async def toggle_public(
+def toggle_public(
     prompt_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """切换公开状态"""
     prompt = db.query(Prompt).filter(
@@ -201,72 +332,22 @@ async def toggle_public(
             detail="Prompt不存在"
         )
     
+    before = prompt_facts(prompt)
     prompt.is_public = not prompt.is_public
+    apply_prompt_change(db, before, prompt_facts(prompt))
     db.commit()
+    invalidate_prompt_caches(current_user.id)
     
     return {
         "message": "公开状态已更新",
         "is_public": prompt.is_public
     }
 
-@router.get("/public", response_model=PromptList)
-async def list_public_prompts(
-    page: int = Query(1, ge=1),
-    per_page: int = Query(20, ge=1, le=100),
-    category_id: Optional[int] = None,
-    search: Optional[str] = None,
-    sort_by: str = Query("view_count", regex="^(created_at|updated_at|view_count|title)$"),
-    sort_order: str = Query("desc", regex="^(asc|desc)$"),
-    db: Session = Depends(get_db)
-):
-    """获取公开的Prompt列表"""
-    # 使用索引优化的查询
-    query = db.query(Prompt).filter(Prompt.is_public == True)
-    
-    # 应用过滤器
-    if category_id is not None:
-        query = query.filter(Prompt.category_id == category_id)
-    if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            or_(
-                Prompt.title.ilike(search_term),
-                Prompt.content.ilike(search_term),
-                Prompt.description.ilike(search_term)
-            )
-        )
-    
-    # 动态排序
-    sort_column = getattr(Prompt, sort_by)
-    if sort_order == "desc":
-        query = query.order_by(sort_column.desc())
-    else:
-        query = query.order_by(sort_column.asc())
-    
-    # 计算总数
-    total = query.count()
-    
-    # 分页并预加载关联数据
-    offset = (page - 1) * per_page
-    prompts = query.offset(offset).limit(per_page).options(
-        joinedload(Prompt.category),
-        joinedload(Prompt.tags),
-        joinedload(Prompt.owner)
-    ).all()
-    
-    return PromptList(
-        prompts=prompts,
-        total=total,
-        page=page,
-        per_page=per_page,
-        total_pages=(total + per_page - 1) // per_page
-    )
-
 @router.delete("/{prompt_id}")
-async def delete_prompt(
+def delete_prompt(
     prompt_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """删除Prompt"""
     prompt = db.query(Prompt).filter(
@@ -280,7 +361,11 @@ async def delete_prompt(
             detail="Prompt不存在"
         )
     
+    before = prompt_facts(prompt)
+    remove_from_index(db.connection(), [prompt.id])
     db.delete(prompt)
+    apply_prompt_change(db, before, None)
     db.commit()
+    invalidate_prompt_caches(current_user.id)
     
     return {"message": "Prompt已删除"}
\ No newline at end of file
@@ -1,52 +1,88 @@
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
 from typing import Optional
 
 from ..database import get_db
-from ..schemas.prompt import PromptList
+from ..schemas.prompt import PromptListResponse
 from ..models.prompt import Prompt
-from ..models.user import User
-from ..utils.auth import get_current_active_user
+from ..utils.auth import Principal, get_current_active_user
+from ..utils.pagination import paginate, count_total, total_pages_of
+from ..utils.prompt_views import PROMPT_PREVIEW_LENGTH, VIEW_PATTERN, prompt_list_response, select_view
+from ..utils.search import get_search_backend, normalize_query
 
 router = APIRouter()
 
-@router.get("/", response_model=PromptList)
-async def search_prompts(
+@router.get("/", response_model=PromptListResponse)
+def search_prompts(
     q: str = Query(..., description="搜索关键词"),
     page: int = Query(1, ge=1),
     per_page: int = Query(20, ge=1, le=100),
     category_id: Optional[int] = None,
+    sort_by: str = Query("relevance", regex="^(relevance|created_at|updated_at|view_count|title)$"),
+    sort_order: str = Query("desc", regex="^(asc|desc)$"),
+    cursor: Optional[str] = Query(None, description="游标分页：首页传空字符串，之后传上一页的 next_cursor"),
+    total_mode: str = Query("exact", regex="^(exact|estimate|none)$", description="总数计算方式：exact 实时统计，estimate 缓存估算，none 不统计"),
+    view: str = Query("full", regex=VIEW_PATTERN, description="返回视图：full 完整内容，summary 只返回内容预览"),
+    preview_length: int = Query(PROMPT_PREVIEW_LENGTH, ge=0, le=2000, description="summary 视图的预览长度（字符）"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
-    """搜索Prompt"""
+    """搜索Prompt（关键词为空白时返回未过滤的列表）"""
+    backend = get_search_backend()
+    q = normalize_query(q)
+
     # 基础查询
     query = db.query(Prompt).filter(Prompt.user_id == current_user.id)
     
-    # 搜索条件
-    search_filter = or_(
-        Prompt.title.contains(q),
-        Prompt.content.contains(q),
-        Prompt.description.contains(q)
-    )
-    query = query.filter(search_filter)
+    # 搜索条件（全文索引）
+    if q:
+        query = backend.apply(query, q)
     
     # 分类过滤
     if category_id is not None:
         query = query.filter(Prompt.category_id == category_id)
     
     # 计算总数
-    total = query.count()
+    total = count_total(
+        query,
+        total_mode,
+        cache_owner=current_user.id,
+        cache_key=("search", q, category_id)
+    )
+    
+    # 排序：默认按相关度（标题 > 描述 > 内容）；没有关键词时按创建时间
+    if sort_by == "relevance":
+        sort_key = backend.rank_expression(q) if q else Prompt.created_at
+        sort_order = "desc"
+    else:
+        sort_key = getattr(Prompt, sort_by)
     
-    # 分页
-    offset = (page - 1) * per_page
-    prompts = query.offset(offset).limit(per_page).all()
+    # 分页（页码或游标），只查询视图需要的列，同时取出高亮摘要和排序值；
+    # 摘要视图下 LIKE 回退的摘要同样只截取前 preview_length 个字符
+    snippet_length = preview_length if view == "summary" else None
+    query = select_view(query, view, preview_length).add_columns(sort_key.label("sort_key"))
+    if q:
+        query = query.add_columns(backend.snippet_expression(q, snippet_length).label("snippet"))
+    rows, next_cursor = paginate(
+        query,
+        sort_by=sort_by,
+        sort_key=sort_key,
+        sort_order=sort_order,
+        id_column=Prompt.id,
+        page=page,
+        per_page=per_page,
+        cursor=cursor,
+        cursor_of=lambda row: (row.sort_key, row.id)
+    )
     
-    return PromptList(
-        prompts=prompts,
+    return prompt_list_response(
+        db,
+        rows,
+        view,
         total=total,
         page=page,
         per_page=per_page,
-        total_pages=(total + per_page - 1) // per_page
-    )
\ No newline at end of file
+        total_pages=total_pages_of(total, per_page),
+        next_cursor=next_cursor,
+        snippets=[backend.render_snippet(row.snippet, q) for row in rows] if q else None
+    )
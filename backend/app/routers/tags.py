@@ -1,20 +1,32 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from typing import List
 
 from ..database import get_db
 from ..schemas.tag import Tag as TagSchema, TagCreate, TagUpdate
-from ..models.prompt import Tag
-from ..models.user import User
-from ..utils.auth import get_current_active_user
+from ..models.prompt import Prompt, Tag, prompt_tags
+from ..models.rollup import UserTagStats
+from ..utils.auth import Principal, get_current_active_user
+from ..utils.responses import FastJSONResponse
 
 router = APIRouter()
 
+def _tag_list_response(db: Session, *criteria) -> FastJSONResponse:
+    """按列查询标签并直接拼装响应（结构与 Tag 模型一致）"""
+    rows = db.execute(
+        select(Tag.name, Tag.color, Tag.id, Tag.created_at).where(*criteria).order_by(Tag.name)
+    )
+    return FastJSONResponse([
+        {"name": row.name, "color": row.color, "id": row.id, "created_at": row.created_at}
+        for row in rows
+    ])
+
 @router.post("/", response_model=TagSchema)
-async def create_tag(
+def create_tag(
     tag: TagCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """创建新的标签"""
     # 检查标签名称是否已存在（全局唯一）
@@ -31,32 +43,30 @@ async def create_tag(
     return db_tag
 
 @router.get("/", response_model=List[TagSchema])
-async def list_tags(
+def list_tags(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """获取所有标签"""
-    tags = db.query(Tag).order_by(Tag.name).all()
-    return tags
+    return _tag_list_response(db)
 
 @router.get("/my", response_model=List[TagSchema])
-async def list_my_tags(
+def list_my_tags(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """获取用户使用过的标签"""
-    # 查询用户的提示词中使用的所有标签
-    tags = db.query(Tag).join(Tag.prompts).filter(
-        Tag.prompts.any(user_id=current_user.id)
-    ).order_by(Tag.name).all()
-    
-    return tags
+    # 查询用户的提示词中使用的所有标签（经 user_id 索引 -> prompt_tags 主键 -> tags 主键）
+    used_tag_ids = select(prompt_tags.c.tag_id).join(
+        Prompt, Prompt.id == prompt_tags.c.prompt_id
+    ).where(Prompt.user_id == current_user.id)
+    return _tag_list_response(db, Tag.id.in_(used_tag_ids))
 
 @router.get("/{tag_id}", response_model=TagSchema)
-async def get_tag(
+def get_tag(
     tag_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """获取单个标签"""
     tag = db.query(Tag).filter(Tag.id == tag_id).first()
@@ -70,11 +80,11 @@ async def get_tag(
     return tag
 
 @router.put("/{tag_id}", response_model=TagSchema)
-async def update_tag(
+def update_tag(
     tag_id: int,
     tag_update: TagUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """更新标签"""
     tag = db.query(Tag).filter(Tag.id == tag_id).first()
@@ -109,10 +119,10 @@ async def update_tag(
     return tag
 
 @router.delete("/{tag_id}")
-async def delete_tag(
+def delete_tag(
     tag_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """删除标签"""
     tag = db.query(Tag).filter(Tag.id == tag_id).first()
@@ -130,6 +140,7 @@ async def delete_tag(
             detail="该标签还在使用中，无法删除"
         )
     
+    db.query(UserTagStats).filter(UserTagStats.tag_id == tag.id).delete()
     db.delete(tag)
     db.commit()
     
@@ -0,0 +1,8 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+class ExportJobCreate(BaseModel):
+    format: str = Field("json", description="导出格式：json / markdown / ndjson / csv")
+    prompt_ids: Optional[List[int]] = Field(None, description="只导出指定的提示词")
+    compression: str = Field("none", pattern="^(none|gzip|zstd)$", description="产物文件的压缩格式")
+    bundle: bool = Field(False, description="打包为 ZIP，每个分类一个文件")
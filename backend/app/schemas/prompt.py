@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Optional, Union
 
 # Tag schemas
 class TagBase(BaseModel):
@@ -73,13 +73,65 @@ class Prompt(PromptBase):
     updated_at: datetime
     category: Optional[Category] = None
     tags: List[Tag] = []
+    # 搜索结果的高亮摘要（仅搜索接口返回）
+    snippet: Optional[str] = None
 
     class Config:
         from_attributes = True
 
-class PromptList(BaseModel):
-    prompts: List[Prompt]
-    total: int
+# 列表摘要视图（view=summary）：不含全文，只返回内容预览
+class TagBrief(BaseModel):
+    id: int
+    name: str
+    color: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class CategoryBrief(BaseModel):
+    id: int
+    name: str
+    color: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class PromptSummary(BaseModel):
+    id: int
+    title: str
+    description: Optional[str] = None
+    # 内容的前 preview_length 个字符；content_length 为全文长度
+    preview: str = ""
+    content_length: int = 0
+    is_public: Optional[bool] = False
+    is_favorite: Optional[bool] = False
+    view_count: int
+    user_id: int
+    category_id: Optional[int] = None
+    created_at: datetime
+    updated_at: datetime
+    category: Optional[CategoryBrief] = None
+    tags: List[TagBrief] = []
+    snippet: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class PromptListBase(BaseModel):
+    # total_mode=none 时不计算总数
+    total: Optional[int] = None
     page: int
     per_page: int
-    total_pages: int
\ No newline at end of file
+    total_pages: Optional[int] = None
+    has_more: bool = False
+    # 游标分页：下一页游标，没有更多数据时为空
+    next_cursor: Optional[str] = None
+
+class PromptList(PromptListBase):
+    prompts: List[Prompt]
+
+class PromptSummaryList(PromptListBase):
+    prompts: List[PromptSummary]
+
+# 列表接口按 view 参数返回其中之一
+PromptListResponse = Union[PromptList, PromptSummaryList]
@@ -1,16 +1,20 @@
 import os
+import uuid
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import NamedTuple, Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 from dotenv import load_dotenv
 
 from ..database import get_db
 from ..models.user import User
 from ..schemas.user import TokenData
+from .cache import principal_cache
+from .passwords import PasswordHasherBusy, password_hasher, pwd_context
+from .revocation import token_denylist
 
 # Load environment variables
 load_dotenv()
@@ -19,20 +23,68 @@ load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY", "your-super-secret-jwt-key-change-this-in-production")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
-
-# Password context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
 
 # Security scheme
 security = HTTPBearer()
 
+# 用户快照在 principal_cache 中的键
+_PRINCIPAL_KEY = "principal"
+
+class Principal(NamedTuple):
+    """已认证用户的只读快照，不绑定数据库会话，可跨请求缓存"""
+    id: int
+    username: str
+    email: str
+    is_active: bool
+    created_at: datetime
+    updated_at: datetime
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(user.id, user.username, user.email, user.is_active, user.created_at, user.updated_at)
+
+def _password_hashing_busy():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="服务繁忙，请稍后重试",
+        headers={"Retry-After": "1"},
+    )
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """验证密码"""
-    return pwd_context.verify(plain_password, hashed_password)
+    try:
+        return password_hasher.verify(plain_password, hashed_password)
+    except PasswordHasherBusy:
+        raise _password_hashing_busy()
+
+def verify_password_and_update(plain_password: str, hashed_password: str):
+    """验证密码，哈希参数已过时时同时返回新哈希：(是否匹配, 新哈希或 None)"""
+    try:
+        return password_hasher.verify_and_update(plain_password, hashed_password)
+    except PasswordHasherBusy:
+        raise _password_hashing_busy()
 
 def get_password_hash(password: str) -> str:
     """生成密码哈希"""
-    return pwd_context.hash(password)
+    try:
+        return password_hasher.hash(password)
+    except PasswordHasherBusy:
+        raise _password_hashing_busy()
+
+async def verify_password_and_update_async(plain_password: str, hashed_password: str):
+    """verify_password_and_update 的 async 版本，等待计算时不占用线程"""
+    try:
+        return await password_hasher.verify_and_update_async(plain_password, hashed_password)
+    except PasswordHasherBusy:
+        raise _password_hashing_busy()
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash 的 async 版本，等待计算时不占用线程"""
+    try:
+        return await password_hasher.hash_async(password)
+    except PasswordHasherBusy:
+        raise _password_hashing_busy()
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """创建访问令牌"""
@@ -41,10 +93,57 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+    to_encode.setdefault("type", "access")
+    to_encode.update({"exp": expire, "jti": str(uuid.uuid4())})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def issue_tokens(user: User) -> dict:
+    """签发访问令牌与刷新令牌"""
+    claims = {"sub": user.username, "uid": user.id}
+    return {
+        "access_token": create_access_token(
+            claims, expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        ),
+        "refresh_token": create_access_token(
+            {**claims, "type": "refresh"}, expires_delta=timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+        ),
+        "token_type": "bearer"
+    }
+
+def decode_refresh_token(token: str) -> TokenData:
+    """校验刷新令牌（签名、有效期、类型与是否已吊销）"""
+    refresh_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="刷新令牌无效或已过期",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise refresh_exception
+    token_data = _token_data(payload)
+    if (
+        payload.get("type") != "refresh"
+        or token_data is None
+        or token_data.user_id is None
+        or token_data.jti is None
+        or token_denylist.is_revoked(token_data.jti)
+    ):
+        raise refresh_exception
+    return token_data
+
+def _token_data(payload: dict) -> Optional[TokenData]:
+    username = payload.get("sub")
+    if username is None:
+        return None
+    return TokenData(
+        username=username,
+        user_id=payload.get("uid"),
+        jti=payload.get("jti"),
+        expires_at=datetime.utcfromtimestamp(payload["exp"]) if "exp" in payload else None
+    )
+
 def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """验证JWT令牌"""
     credentials_exception = HTTPException(
@@ -54,30 +153,73 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     )
     try:
         payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        token_data = TokenData(username=username)
     except JWTError:
         raise credentials_exception
+    # 刷新令牌不能用于访问接口；吊销检查只查内存，不访问数据库
+    token_data = _token_data(payload)
+    if (
+        token_data is None
+        or payload.get("type", "access") != "access"
+        or (token_data.jti is not None and token_denylist.is_revoked(token_data.jti))
+    ):
+        raise credentials_exception
     return token_data
 
 def get_current_user(
     token_data: TokenData = Depends(verify_token),
     db: Session = Depends(get_db)
-):
-    """获取当前用户"""
-    user = db.query(User).filter(User.username == token_data.username).first()
-    if user is None:
+) -> Principal:
+    """获取当前用户（Principal 快照，不是 ORM 对象，不能访问关联关系）
+
+    令牌带有用户ID（uid）时优先读取缓存的用户快照，命中时不查询 users 表；
+    旧令牌没有 uid，每次按用户名查询。
+    """
+    principal = None
+    if token_data.user_id is not None:
+        principal = principal_cache.get(token_data.user_id, _PRINCIPAL_KEY)
+    if principal is None:
+        query = db.query(User)
+        if token_data.user_id is not None:
+            query = query.filter(User.id == token_data.user_id)
+        else:
+            query = query.filter(User.username == token_data.username)
+        user = query.first()
+        if user is not None:
+            principal = Principal.from_user(user)
+            if token_data.user_id is not None:
+                principal_cache.set(user.id, _PRINCIPAL_KEY, principal)
+    if principal is None or principal.username != token_data.username:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    return user
+    return principal
 
-def get_current_active_user(current_user: User = Depends(get_current_user)):
+def get_current_active_user(current_user: Principal = Depends(get_current_user)) -> Principal:
     """获取当前活跃用户"""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-    return current_user
\ No newline at end of file
+    return current_user
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_changed(mapper, connection, target):
+    """用户被修改或删除时使其快照失效
+
+    提交后再失效一次，避免提交前并发请求读到旧数据并重新写入缓存。
+    通过 Core 语句批量更新 users 表时不会触发，需自行调用 principal_cache.invalidate。
+    """
+    principal_cache.invalidate(target.id)
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_user_ids", set()).add(target.id)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    for user_id in session.info.pop("changed_user_ids", ()):
+        principal_cache.invalidate(user_id)
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_changed_users(session, previous_transaction):
+    session.info.pop("changed_user_ids", None)
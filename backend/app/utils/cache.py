@@ -0,0 +1,87 @@
+"""进程内缓存
+
+按所有者（用户ID，或公开列表的 PUBLIC_SCOPE）分组保存短期缓存，
+写操作后按所有者整体失效；多进程部署时其他进程的数据最多滞后一个 TTL。
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# 列表总数估算缓存时间（秒）
+COUNT_CACHE_TTL = float(os.getenv("COUNT_CACHE_TTL", "30"))
+# 仪表板快照缓存时间（秒），写操作会主动失效，因此可以较长
+DASHBOARD_CACHE_TTL = float(os.getenv("DASHBOARD_CACHE_TTL", "300"))
+# 已认证用户快照缓存时间（秒），用户更新或停用时主动失效
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+
+# 公开列表使用的缓存分组
+PUBLIC_SCOPE = "public"
+
+
+class TTLCache:
+    """按所有者分组的 TTL 缓存"""
+
+    def __init__(self, ttl: float, max_owners: int = 10000, max_entries_per_owner: int = 256):
+        self.ttl = ttl
+        self.max_owners = max_owners
+        self.max_entries_per_owner = max_entries_per_owner
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+
+    def get(self, owner, key):
+        """读取缓存，不存在或已过期时返回 None"""
+        with self._lock:
+            entries = self._data.get(owner)
+            if not entries or key not in entries:
+                return None
+            expires_at, value = entries[key]
+            if expires_at < time.monotonic():
+                del entries[key]
+                return None
+            self._data.move_to_end(owner)
+            return value
+
+    def set(self, owner, key, value, ttl: float = None):
+        """写入缓存"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            entries = self._data.setdefault(owner, {})
+            self._data.move_to_end(owner)
+            entries.pop(key, None)
+            entries[key] = (expires_at, value)
+            if len(entries) > self.max_entries_per_owner:
+                del entries[next(iter(entries))]
+            while len(self._data) > self.max_owners:
+                self._data.popitem(last=False)
+
+    def invalidate(self, owner):
+        """使某个所有者的全部缓存失效"""
+        with self._lock:
+            self._data.pop(owner, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# 列表总数缓存
+count_cache = TTLCache(ttl=COUNT_CACHE_TTL)
+
+# 仪表板快照缓存
+dashboard_cache = TTLCache(ttl=DASHBOARD_CACHE_TTL, max_entries_per_owner=1)
+
+# 已认证用户快照缓存（按用户ID分组）
+principal_cache = TTLCache(ttl=PRINCIPAL_CACHE_TTL, max_entries_per_owner=1)
+
+
+def invalidate_prompt_caches(user_id: int):
+    """Prompt 发生增删改后调用"""
+    count_cache.invalidate(user_id)
+    count_cache.invalidate(PUBLIC_SCOPE)
+    dashboard_cache.invalidate(user_id)
+
+
+def invalidate_category_caches(user_id: int):
+    """分类发生增删改后调用"""
+    dashboard_cache.invalidate(user_id)
@@ -0,0 +1,71 @@
+"""导出内容的流式压缩
+
+- gzip：标准库 zlib，始终可用
+- zstd：需要安装可选依赖 zstandard
+"""
+import zlib
+from typing import Optional
+
+try:
+    import zstandard
+except ImportError:  # 可选依赖
+    zstandard = None
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+# 协商时的优先顺序
+_PREFERENCE = ["zstd", "gzip"]
+
+# 压缩文件下载时的扩展名与类型
+FILE_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+FILE_MEDIA_TYPES = {"gzip": "application/gzip", "zstd": "application/zstd"}
+
+
+def is_available(encoding: str) -> bool:
+    """该压缩算法在当前环境中是否可用"""
+    if encoding == "zstd":
+        return zstandard is not None
+    return encoding == "gzip"
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """根据 Accept-Encoding 选择压缩算法，客户端不支持时返回 None"""
+    if not accept_encoding:
+        return None
+
+    weights = {}
+    for item in accept_encoding.split(","):
+        token, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[token.strip().lower()] = quality
+
+    candidates = [
+        encoding for encoding in _PREFERENCE
+        if is_available(encoding) and weights.get(encoding, weights.get("*", 0.0)) > 0
+    ]
+    if not candidates:
+        return None
+    # 权重相同时按服务端偏好
+    return max(candidates, key=lambda encoding: (weights.get(encoding, weights.get("*", 0.0)), -_PREFERENCE.index(encoding)))
+
+
+def compress_stream(chunks, encoding: str):
+    """对字节块迭代器做流式压缩"""
+    if encoding == "zstd":
+        compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    else:
+        # wbits=31 输出带 gzip 头的数据
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
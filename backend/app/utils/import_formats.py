@@ -0,0 +1,260 @@
+"""导入文件的流式解析
+
+上传文件按块读取、增量解码，逐条产出记录交给 BulkImporter，
+内存占用只与单条记录大小有关，与文件大小无关。
+"""
+import codecs
+import csv
+import json
+import re
+
+# 每次从上传文件读取的字节数
+READ_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+
+
+class TextStreamReader:
+    """从二进制文件增量读取文本（utf-8，兼容 BOM）"""
+
+    def __init__(self, file, read_size: int = READ_SIZE):
+        self._file = file
+        self._read_size = read_size
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """读取下一块并丢弃已消费的部分，到达文件末尾时返回 False"""
+        if self.eof:
+            return False
+        data = self._file.read(self._read_size)
+        text = self._decoder.decode(data, final=not data)
+        self.buffer = self.buffer[self.pos:] + text
+        self.pos = 0
+        if not data:
+            self.eof = True
+        return bool(data)
+
+    def lines(self, keepends: bool = False):
+        """逐行读取（按 \\n 分行）"""
+        while True:
+            newline = self.buffer.find("\n", self.pos)
+            if newline >= 0:
+                line = self.buffer[self.pos:newline + 1 if keepends else newline]
+                self.pos = newline + 1
+                yield line
+            elif not self.fill():
+                if self.pos < len(self.buffer):
+                    yield self.buffer[self.pos:]
+                    self.pos = len(self.buffer)
+                return
+
+    def peek(self):
+        """跳过空白并返回下一个字符，文件结束时返回 None"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return None
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError("无效的JSON格式")
+        self.pos += 1
+
+    def json_value(self):
+        """解析下一个完整的 JSON 值，数据不完整时继续读取"""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise ValueError("无效的JSON格式")
+                continue
+            # 数字等值可能被截断在块边界上，需读到后续字符才能确定
+            if end == len(self.buffer) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def _json_items(reader: TextStreamReader, close: str):
+    """遍历数组元素或对象成员之间的分隔，每个位置产出一次（调用前已消费开括号）"""
+    if reader.peek() == close:
+        reader.pos += 1
+        return
+    while True:
+        yield
+        char = reader.peek()
+        reader.pos += 1
+        if char == close:
+            return
+        if char != ",":
+            raise ValueError("无效的JSON格式")
+
+
+def _json_array(reader: TextStreamReader):
+    """逐个产出数组元素（调用前已消费 '['）"""
+    for _ in _json_items(reader, "]"):
+        yield reader.json_value()
+
+
+def json_records(reader: TextStreamReader):
+    """JSON 导出文件（{"prompts": [...]} 或直接为数组）中的记录"""
+    if reader.peek() == "[":
+        reader.pos += 1
+        yield from _json_array(reader)
+        return
+    reader.expect("{")
+
+    for _ in _json_items(reader, "}"):
+        key = reader.json_value()
+        reader.expect(":")
+        if key == "prompts" and reader.peek() == "[":
+            reader.pos += 1
+            yield from _json_array(reader)
+        else:
+            # 其他字段（如 export_info）直接跳过
+            reader.json_value()
+
+
+def ndjson_records(reader: TextStreamReader):
+    """NDJSON 中的记录（每行一个提示词）"""
+    for line_number, line in enumerate(reader.lines(), 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            raise ValueError(f"第 {line_number} 行不是有效的JSON")
+
+
+def _parse_bool(value) -> bool:
+    return str(value).strip().lower() in ("true", "1", "yes", "y", "是")
+
+
+def _parse_tag_names(value) -> list:
+    """CSV 的 tags 列：JSON 数组；旧版导出文件及手工编写的文件为逗号分隔"""
+    value = (value or "").strip()
+    if value.startswith("["):
+        try:
+            names = json.loads(value)
+        except ValueError:
+            names = None
+        if isinstance(names, list):
+            return [str(name).strip() for name in names if str(name).strip()]
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def csv_records(reader: TextStreamReader):
+    """CSV 中的记录（列与CSV导出一致，至少需要 title 和 content）"""
+    # 保留换行符，以便 csv 模块处理引号内的多行字段
+    for row in csv.DictReader(reader.lines(keepends=True)):
+        yield {
+            "title": row.get("title"),
+            "content": row.get("content"),
+            "description": row.get("description") or None,
+            "is_public": _parse_bool(row.get("is_public", "")),
+            "is_favorite": _parse_bool(row.get("is_favorite", "")),
+            "category": {"name": row["category"]} if row.get("category") else None,
+            "tags": [{"name": name} for name in _parse_tag_names(row.get("tags"))]
+        }
+
+
+_MARKDOWN_NUMBERING = re.compile(r"^\d+\.\s+")
+_MARKDOWN_FENCE = re.compile(r"^(`{3,})[^`]*$")
+
+
+def _parse_markdown_metadata(value: str, record: dict):
+    """**元信息** 行：分类: x | 标签: a, b | ⭐ 收藏 | 🌐 公开"""
+    for item in value.split(" | "):
+        item = item.strip()
+        if item.startswith("分类:"):
+            record["category"] = {"name": item[3:].strip()}
+        elif item.startswith("标签:"):
+            record["tags"] = [{"name": name.strip()} for name in item[3:].split(",") if name.strip()]
+        elif item == "⭐ 收藏":
+            record["is_favorite"] = True
+        elif item == "🌐 公开":
+            record["is_public"] = True
+
+
+def markdown_records(reader: TextStreamReader):
+    """Markdown 导出文件中的记录（逐行状态机）
+
+    - fields：标题之后，读取元信息与描述（描述可跨多行，到空行为止）；遇到 "**内容**:" 进入 fence
+    - fence：等待内容块的开始围栏（```）
+    - content：内容块内的行原样保留（包括 "## " 开头的行），
+      遇到不短于开始围栏的围栏行时结束内容块，回到 fields
+    """
+    record = None
+    content_lines = None
+    fence = None
+    state = "fields"
+    in_description = False
+
+    for raw_line in reader.lines():
+        raw_line = raw_line.rstrip("\r")
+        line = raw_line.strip()
+
+        if state == "content":
+            if line.startswith(fence) and not line.strip("`"):
+                record["content"] = "\n".join(content_lines)
+                state = "fields"
+            else:
+                content_lines.append(raw_line)
+            continue
+
+        if line.startswith("## "):
+            # 上一个提示词
+            if record is not None and "content" in record:
+                yield record
+            record = {"title": _MARKDOWN_NUMBERING.sub("", line[3:].strip(), count=1)}
+            state = "fields"
+            in_description = False
+        elif record is None:
+            continue
+        elif in_description and line and not line.startswith("**"):
+            record["description"] += "\n" + raw_line
+        elif state == "fence":
+            match = _MARKDOWN_FENCE.match(line)
+            if match:
+                fence = match.group(1)
+                content_lines = []
+                state = "content"
+        else:
+            in_description = False
+            if line.startswith("**内容**:"):
+                state = "fence"
+            elif line.startswith("**描述**:"):
+                record["description"] = line[len("**描述**:"):].strip()
+                in_description = True
+            elif line.startswith("**元信息**:"):
+                _parse_markdown_metadata(line[len("**元信息**:"):], record)
+
+    if record is None:
+        return
+    if state == "content":
+        # 文件在内容块中结束（被截断），保留已读到的内容
+        record["content"] = "\n".join(content_lines)
+    if "content" in record:
+        yield record
+
+
+# 支持的导入格式：格式 -> 记录解析函数
+IMPORT_FORMATS = {
+    "json": json_records,
+    "markdown": markdown_records,
+    "ndjson": ndjson_records,
+    "csv": csv_records,
+}
+
+
+def parse_upload(file, format: str):
+    """按格式逐条解析上传的二进制文件"""
+    return IMPORT_FORMATS[format](TextStreamReader(file))
@@ -0,0 +1,348 @@
+"""批量导入
+
+记录按块写入：每块先批量解析/创建分类和标签（名称 -> ID 缓存在内存中），
+再用一次 executemany 写入提示词、一次写入标签关联，往返次数与记录数无关。
+整个导入在同一事务内，由 finish() 提交；后台任务可用 commit() 逐块提交。
+
+按内容哈希去重（dedupe）：
+- skip：跳过内容已存在的记录（默认）
+- update：用导入的记录更新已存在的提示词（标题、描述、状态、分类、标签）
+- keep：不去重，全部新建
+每块只需一次按 (user_id, content_hash) 的批量查询。
+"""
+import logging
+import os
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+from sqlalchemy import bindparam, delete, insert, select
+from sqlalchemy.orm import Session
+
+from ..models.prompt import Prompt, Category, Tag, compute_content_hash, prompt_tags
+from .rollups import PromptFacts, RollupDelta, utc_today
+from .similarity import write_index
+
+logger = logging.getLogger(__name__)
+
+# 每块写入的记录数
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+
+DEFAULT_CATEGORY_COLOR = "#e07a47"
+DEFAULT_TAG_COLOR = "#0066cc"
+
+DEDUPE_MODES = ("skip", "update", "keep")
+
+
+class BulkImporter:
+    """批量导入提示词记录
+
+    记录格式与 JSON 导出一致：title、content、description、is_public、is_favorite、
+    category（{"name", "color"}）、tags（[{"name", "color"}]），其余字段忽略。
+    """
+
+    def __init__(self, db: Session, user_id: int, chunk_size: int = IMPORT_CHUNK_SIZE, dedupe: str = "skip"):
+        self.db = db
+        self.user_id = user_id
+        self.chunk_size = chunk_size
+        self.dedupe = dedupe
+        self.imported_count = 0
+        self.updated_count = 0
+        self.skipped_count = 0
+        # 每块的耗时统计
+        self.chunks: List[dict] = []
+        self._pending: List[dict] = []
+        self._category_ids: Dict[str, int] = {}
+        self._tag_ids: Dict[str, int] = {}
+        self._rollup_delta = RollupDelta()
+
+    def add(self, record: dict):
+        """加入一条记录，缺少标题或内容的记录会被跳过"""
+        if not isinstance(record, dict) or not record.get("title") or not record.get("content"):
+            return
+        self._pending.append(record)
+        if len(self._pending) >= self.chunk_size:
+            self.flush()
+
+    def add_all(self, records):
+        for record in records:
+            self.add(record)
+
+    def flush(self):
+        """写入当前缓冲的记录"""
+        if not self._pending:
+            return
+        records, self._pending = self._pending, []
+        started = time.perf_counter()
+
+        hashes = [compute_content_hash(record["content"]) for record in records]
+        new_records, new_hashes, updates, skipped = self._dedupe(records, hashes)
+
+        category_ids = self._resolve_categories(new_records + list(updates.values()))
+        tag_ids = self._resolve_tags(new_records + list(updates.values()))
+
+        self._insert(new_records, new_hashes, category_ids, tag_ids)
+        if updates:
+            self._update(updates, category_ids, tag_ids)
+
+        elapsed = time.perf_counter() - started
+        self.imported_count += len(new_records)
+        self.updated_count += len(updates)
+        self.skipped_count += skipped
+        self.chunks.append({
+            "records": len(records),
+            "imported": len(new_records),
+            "updated": len(updates),
+            "skipped": skipped,
+            "seconds": round(elapsed, 4),
+            "records_per_second": round(len(records) / elapsed) if elapsed > 0 else None
+        })
+        logger.info(
+            "导入第 %d 块：%d 条（新建 %d，更新 %d，跳过 %d），耗时 %.3f 秒",
+            len(self.chunks), len(records), len(new_records), len(updates), skipped, elapsed
+        )
+
+    def _dedupe(self, records, hashes):
+        """按内容哈希划分为新建、更新（提示词 ID -> 记录）与跳过的记录"""
+        if self.dedupe == "keep":
+            return records, hashes, {}, 0
+
+        # 一次查询本块所有哈希对应的已有提示词（重复时取最早的一条）
+        table = Prompt.__table__
+        existing = {}
+        for prompt_id, content_hash in self.db.execute(
+            select(table.c.id, table.c.content_hash).where(
+                table.c.user_id == self.user_id,
+                table.c.content_hash.in_(set(hashes))
+            ).order_by(table.c.id)
+        ):
+            existing.setdefault(content_hash, prompt_id)
+
+        new_records, new_hashes, updates = [], [], {}
+        skipped = 0
+        seen = set()
+        for record, content_hash in zip(records, hashes):
+            if content_hash in existing and self.dedupe == "update" and existing[content_hash] not in updates:
+                updates[existing[content_hash]] = record
+            elif content_hash in existing or content_hash in seen:
+                # 已存在，或与本块中前面的记录重复
+                skipped += 1
+            else:
+                seen.add(content_hash)
+                new_records.append(record)
+                new_hashes.append(content_hash)
+        return new_records, new_hashes, updates, skipped
+
+    def _insert(self, records, hashes, category_ids, tag_ids):
+        """新建提示词及其标签关联"""
+        if not records:
+            return
+        prompt_rows = []
+        for record, content_hash in zip(records, hashes):
+            category = record.get("category") or {}
+            prompt_rows.append({
+                "title": record["title"],
+                "content": record["content"],
+                "content_length": len(record["content"]),
+                "content_hash": content_hash,
+                "description": record.get("description"),
+                "is_public": bool(record.get("is_public", False)),
+                "is_favorite": bool(record.get("is_favorite", False)),
+                "view_count": 0,
+                "category_id": category_ids.get(category.get("name")),
+                "user_id": self.user_id,
+            })
+        new_ids = self._insert_prompts(prompt_rows)
+
+        link_rows = []
+        day = utc_today()
+        for prompt_id, row, record in zip(new_ids, prompt_rows, records):
+            prompt_tag_ids = _record_tag_ids(record, tag_ids)
+            link_rows.extend({"prompt_id": prompt_id, "tag_id": tag_id} for tag_id in prompt_tag_ids)
+            # 新提示词的创建时间由数据库取当前时间
+            self._rollup_delta.add_prompt(PromptFacts(
+                user_id=self.user_id,
+                day=day,
+                is_public=row["is_public"],
+                is_favorite=row["is_favorite"],
+                view_count=0,
+                category_id=row["category_id"],
+                tag_ids=prompt_tag_ids
+            ))
+        if link_rows:
+            self.db.execute(insert(prompt_tags), link_rows)
+        write_index(self.db.connection(), [
+            (prompt_id, self.user_id, row["content"]) for prompt_id, row in zip(new_ids, prompt_rows)
+        ])
+
+    def _insert_prompts(self, prompt_rows) -> List[int]:
+        """批量插入提示词，按参数顺序返回新 ID
+
+        SQLite 不支持按参数顺序返回结果的多行 INSERT（sort_by_parameter_order 会退化为逐行执行）。
+        同一写事务内的多行 INSERT 按 VALUES 顺序分配递增的 rowid，按 ID 排序即为参数顺序，
+        再用内容哈希核对。
+        """
+        table = Prompt.__table__
+        if self.db.get_bind().dialect.name != "sqlite":
+            return self.db.execute(
+                insert(table).returning(table.c.id, sort_by_parameter_order=True), prompt_rows
+            ).scalars().all()
+
+        rows = sorted(self.db.execute(
+            insert(table).returning(table.c.id, table.c.content_hash), prompt_rows
+        ).all())
+        if [content_hash for _, content_hash in rows] != [row["content_hash"] for row in prompt_rows]:
+            raise RuntimeError("批量插入返回的提示词顺序与记录不一致")
+        return [prompt_id for prompt_id, _ in rows]
+
+    def _update(self, updates, category_ids, tag_ids):
+        """用导入的记录更新已存在的提示词（浏览次数与创建时间保持不变）
+
+        内容哈希相同即规范化后的内容相同，近似重复索引无需更新。
+        """
+        table = Prompt.__table__
+        prompt_ids = list(updates)
+        before_tags = defaultdict(list)
+        for prompt_id, tag_id in self.db.execute(
+            select(prompt_tags.c.prompt_id, prompt_tags.c.tag_id).where(prompt_tags.c.prompt_id.in_(prompt_ids))
+        ):
+            before_tags[prompt_id].append(tag_id)
+        before_rows = self.db.execute(
+            select(
+                table.c.id, table.c.is_public, table.c.is_favorite, table.c.view_count,
+                table.c.category_id, table.c.created_at
+            ).where(table.c.id.in_(prompt_ids))
+        ).all()
+
+        update_rows = []
+        link_rows = []
+        for row in before_rows:
+            record = updates[row.id]
+            category = record.get("category") or {}
+            day = row.created_at.date() if row.created_at is not None else utc_today()
+            before = PromptFacts(
+                user_id=self.user_id,
+                day=day,
+                is_public=bool(row.is_public),
+                is_favorite=bool(row.is_favorite),
+                view_count=row.view_count or 0,
+                category_id=row.category_id,
+                tag_ids=tuple(before_tags[row.id])
+            )
+            after = before._replace(
+                is_public=bool(record.get("is_public", False)),
+                is_favorite=bool(record.get("is_favorite", False)),
+                category_id=category_ids.get(category.get("name")),
+                tag_ids=_record_tag_ids(record, tag_ids)
+            )
+            self._rollup_delta.remove_prompt(before)
+            self._rollup_delta.add_prompt(after)
+
+            update_rows.append({
+                "prompt_id": row.id,
+                "title": record["title"],
+                "content": record["content"],
+                "content_length": len(record["content"]),
+                "description": record.get("description"),
+                "is_public": after.is_public,
+                "is_favorite": after.is_favorite,
+                "category_id": after.category_id,
+            })
+            link_rows.extend({"prompt_id": row.id, "tag_id": tag_id} for tag_id in after.tag_ids)
+
+        # 绑定参数名不能与列名相同，加前缀区分
+        columns = [name for name in update_rows[0] if name != "prompt_id"]
+        self.db.execute(
+            table.update().where(table.c.id == bindparam("prompt_id")).values(
+                {name: bindparam(f"new_{name}") for name in columns}
+            ),
+            [
+                {"prompt_id": row["prompt_id"], **{f"new_{name}": row[name] for name in columns}}
+                for row in update_rows
+            ]
+        )
+        self.db.execute(delete(prompt_tags).where(prompt_tags.c.prompt_id.in_(prompt_ids)))
+        if link_rows:
+            self.db.execute(insert(prompt_tags), link_rows)
+
+    def commit(self):
+        """写入缓冲的记录、更新统计汇总并提交（后台任务按块提交时使用）"""
+        self.flush()
+        self._rollup_delta.apply(self.db.connection())
+        self._rollup_delta = RollupDelta()
+        self.db.commit()
+
+    def finish(self) -> int:
+        """写入剩余记录、更新统计汇总并提交，返回导入数量"""
+        self.commit()
+        return self.imported_count
+
+    def _resolve_categories(self, records) -> Dict[str, int]:
+        """分类名称 -> ID，不存在的分类一次性批量创建"""
+        wanted = {}
+        for record in records:
+            category = record.get("category") or {}
+            name = category.get("name")
+            if name and name not in self._category_ids:
+                wanted.setdefault(name, category.get("color") or DEFAULT_CATEGORY_COLOR)
+
+        if wanted:
+            table = Category.__table__
+            existing = self.db.execute(
+                select(table.c.name, table.c.id).where(
+                    table.c.user_id == self.user_id,
+                    table.c.name.in_(list(wanted))
+                )
+            ).all()
+            self._category_ids.update(existing)
+
+            missing = [
+                {"name": name, "color": color, "user_id": self.user_id}
+                for name, color in wanted.items()
+                if name not in self._category_ids
+            ]
+            if missing:
+                created = self.db.execute(
+                    insert(table).returning(table.c.name, table.c.id), missing
+                ).all()
+                self._category_ids.update(created)
+        return self._category_ids
+
+    def _resolve_tags(self, records) -> Dict[str, int]:
+        """标签名称 -> ID，不存在的标签一次性批量创建（标签为全局共享）"""
+        wanted = {}
+        for record in records:
+            for tag in record.get("tags") or []:
+                name = tag.get("name") if isinstance(tag, dict) else None
+                if name and name not in self._tag_ids:
+                    wanted.setdefault(name, tag.get("color") or DEFAULT_TAG_COLOR)
+
+        if wanted:
+            table = Tag.__table__
+            existing = self.db.execute(
+                select(table.c.name, table.c.id).where(table.c.name.in_(list(wanted)))
+            ).all()
+            self._tag_ids.update(existing)
+
+            missing = [
+                {"name": name, "color": color}
+                for name, color in wanted.items()
+                if name not in self._tag_ids
+            ]
+            if missing:
+                created = self.db.execute(
+                    insert(table).returning(table.c.name, table.c.id), missing
+                ).all()
+                self._tag_ids.update(created)
+        return self._tag_ids
+
+
+def _tag_names(record: dict):
+    for tag in record.get("tags") or []:
+        name = tag.get("name") if isinstance(tag, dict) else None
+        if name:
+            yield name
+
+
+def _record_tag_ids(record: dict, tag_ids: Dict[str, int]):
+    return tuple(dict.fromkeys(tag_ids[name] for name in _tag_names(record)))
@@ -0,0 +1,338 @@
+"""后台任务
+
+大批量导入/导出不在请求内执行：接口写入一条 jobs 记录后立即返回，
+由本进程的线程池执行，客户端轮询状态并在完成后下载产物。
+
+- 任务状态保存在数据库中，执行中定期更新心跳；工作进程退出（重启、崩溃）后，
+  心跳超时的任务会被重新排队，从断点（导入）或从头（导出）重新执行
+- 多个进程可以共享同一张表，任务通过条件 UPDATE 认领，不会被重复执行
+- 各类任务的执行函数由业务模块通过 register 注册
+- 导入任务的上传文件在任务结束（完成或失败）时删除，导出产物保留到过期
+"""
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+
+from ..database import SessionLocal
+from ..models.job import Job
+
+logger = logging.getLogger(__name__)
+
+# 工作线程数
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# 每个用户同时排队或执行的任务上限
+JOB_MAX_PER_USER = int(os.getenv("JOB_MAX_PER_USER", "2"))
+# 扫描待执行/超时任务的间隔（秒）
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "5"))
+# 心跳超过该时间未更新的执行中任务重新排队（秒）
+JOB_STALE_AFTER = float(os.getenv("JOB_STALE_AFTER", "60"))
+# 已结束任务及其产物的保留时间（小时）
+JOB_RETENTION_HOURS = float(os.getenv("JOB_RETENTION_HOURS", "24"))
+# 任务产物目录
+JOB_ARTIFACT_DIR = os.getenv("JOB_ARTIFACT_DIR", "./data/jobs")
+
+# 进度写回数据库的最小间隔（秒）
+_PROGRESS_INTERVAL = 1.0
+
+ACTIVE_STATUSES = ("pending", "running")
+
+
+class JobInterrupted(Exception):
+    """服务关闭，任务中止后重新排队"""
+
+
+class JobContext:
+    """传给任务执行函数的上下文：参数、产物路径、断点与进度上报"""
+
+    def __init__(self, manager: "JobManager", job: Job):
+        self._manager = manager
+        self.id = job.id
+        self.user_id = job.user_id
+        self.params = json.loads(job.params or "{}")
+        self.artifact_path = job.artifact_path
+        # 上次执行提交的断点，首次执行时为空
+        self.checkpoint = json.loads(job.checkpoint) if job.checkpoint else {}
+        self.total = job.total
+        self.processed = job.processed or 0
+        self.bytes_done = job.bytes_done or 0
+        self.bytes_total = job.bytes_total
+        self._reported_at = 0.0
+
+    def check_stopped(self):
+        """服务正在关闭时中止任务"""
+        if self._manager.stopping:
+            raise JobInterrupted()
+
+    def report(self, **progress):
+        """更新进度（total / processed / bytes_done / bytes_total），按间隔写回数据库"""
+        for name, value in progress.items():
+            setattr(self, name, value)
+        self.check_stopped()
+        now = time.monotonic()
+        if now - self._reported_at >= _PROGRESS_INTERVAL:
+            self._reported_at = now
+            self.save()
+
+    def save(self, connection=None, checkpoint: dict = None):
+        """立即写回进度与心跳
+
+        传入 connection 时在调用方的事务内执行，断点随业务数据一起提交。
+        SQLite 写事务未提交时其他连接无法写入，此时也必须通过该事务写回。
+        """
+        values = {
+            "total": self.total,
+            "processed": self.processed,
+            "bytes_done": self.bytes_done,
+            "bytes_total": self.bytes_total,
+            "heartbeat_at": datetime.utcnow()
+        }
+        if checkpoint is not None:
+            self.checkpoint = checkpoint
+            values["checkpoint"] = json.dumps(checkpoint)
+        statement = update(Job.__table__).where(Job.__table__.c.id == self.id).values(**values)
+        if connection is not None:
+            connection.execute(statement)
+            return
+        with self._manager.bind.begin() as connection:
+            connection.execute(statement)
+
+    def complete(self, connection, result: dict):
+        """在调用方的事务内标记任务完成
+
+        结果需要与业务数据一起提交时使用（例如导入），避免提交后进程退出导致任务被重复执行。
+        """
+        self.save(connection)
+        connection.execute(_finish_statement(self.id, "completed", result=result))
+
+
+def _finish_statement(job_id: int, status: str, result: dict = None, error: str = None):
+    table = Job.__table__
+    return update(table).where(
+        table.c.id == job_id, table.c.status == "running"
+    ).values(
+        status=status,
+        result=json.dumps(result, ensure_ascii=False) if result is not None else None,
+        error=error,
+        finished_at=datetime.utcnow()
+    )
+
+
+class JobManager:
+    """线程池执行 jobs 表中的任务"""
+
+    def __init__(self, session_factory, workers: int, poll_interval: float):
+        self.session_factory = session_factory
+        self.bind = session_factory.kw["bind"]
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._handlers = {}
+        self._lock = threading.Lock()
+        # 已提交到线程池、尚未结束的任务
+        self._queued = set()
+        self._executor = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def stopping(self) -> bool:
+        return self._stop.is_set()
+
+    def register(self, kind: str, handler):
+        """注册任务执行函数 handler(context) -> 结果 dict"""
+        self._handlers[kind] = handler
+
+    def active_count(self, db, user_id: int) -> int:
+        """用户排队或执行中的任务数"""
+        return db.query(Job).filter(Job.user_id == user_id, Job.status.in_(ACTIVE_STATUSES)).count()
+
+    def submit(self, job_id: int):
+        """提交任务；服务未启动时由之后的扫描提交"""
+        with self._lock:
+            if self._executor is None or job_id in self._queued:
+                return
+            self._queued.add(job_id)
+            self._executor.submit(self._run, job_id)
+
+    def start(self):
+        """启动线程池与扫描线程（重新排队上次未完成的任务）"""
+        if self._thread is not None:
+            return
+        os.makedirs(JOB_ARTIFACT_DIR, exist_ok=True)
+        self._stop.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job-worker")
+        self._thread = threading.Thread(target=self._run_poller, name="job-poller", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止接收任务，执行中的任务在下次上报进度时中止并重新排队"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            # 尚未开始的任务保持 pending，下次启动时执行
+            executor.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            self._queued.clear()
+
+    def poll(self):
+        """重新排队心跳超时的任务，提交待执行任务，清理过期任务"""
+        table = Job.__table__
+        stale_before = datetime.utcnow() - timedelta(seconds=JOB_STALE_AFTER)
+        with self.bind.begin() as connection:
+            requeued = connection.execute(
+                update(table).where(
+                    table.c.status == "running", table.c.heartbeat_at < stale_before
+                ).values(status="pending")
+            ).rowcount
+            if requeued:
+                logger.warning("%d 个任务心跳超时，重新排队", requeued)
+            pending = connection.execute(
+                select(table.c.id).where(table.c.status == "pending").order_by(table.c.id)
+            ).scalars().all()
+        for job_id in pending:
+            self.submit(job_id)
+        self._purge_expired()
+
+    def _run_poller(self):
+        while True:
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("扫描后台任务失败")
+            if self._stop.wait(self.poll_interval):
+                return
+
+    def _claim(self, job_id: int):
+        """认领待执行的任务，已被其他线程或进程认领时返回 None"""
+        table = Job.__table__
+        now = datetime.utcnow()
+        with self.bind.begin() as connection:
+            claimed = connection.execute(
+                update(table).where(table.c.id == job_id, table.c.status == "pending").values(
+                    status="running", started_at=now, heartbeat_at=now, error=None
+                )
+            ).rowcount
+        if not claimed:
+            return None
+        db = self.session_factory()
+        try:
+            return db.get(Job, job_id)
+        finally:
+            db.close()
+
+    def _run(self, job_id: int):
+        try:
+            job = self._claim(job_id)
+            if job is None:
+                return
+            handler = self._handlers.get(job.kind)
+            context = JobContext(self, job)
+            started = time.perf_counter()
+            try:
+                if handler is None:
+                    raise ValueError(f"未知的任务类型: {job.kind}")
+                result = handler(context)
+            except JobInterrupted:
+                with self.bind.begin() as connection:
+                    connection.execute(
+                        update(Job.__table__).where(Job.__table__.c.id == job_id).values(status="pending")
+                    )
+                logger.info("任务 %d 已中止，将在服务重启后重新执行", job_id)
+                return
+            except Exception as e:
+                logger.exception("任务 %d 执行失败", job_id)
+                with self.bind.begin() as connection:
+                    connection.execute(_finish_statement(job_id, "failed", error=str(e)))
+                # 失败的任务不会重新执行，上传的导入文件不再需要保留到过期
+                remove_artifact(context.artifact_path)
+                return
+
+            with self.bind.begin() as connection:
+                context.save(connection)
+                connection.execute(_finish_statement(job_id, "completed", result=result or {}))
+            logger.info("任务 %d 完成，耗时 %.3f 秒", job_id, time.perf_counter() - started)
+        finally:
+            with self._lock:
+                self._queued.discard(job_id)
+
+    def _purge_expired(self):
+        """删除超过保留时间的已结束任务及其产物"""
+        table = Job.__table__
+        expired_before = datetime.utcnow() - timedelta(hours=JOB_RETENTION_HOURS)
+        with self.bind.begin() as connection:
+            expired = connection.execute(
+                select(table.c.id, table.c.artifact_path).where(
+                    table.c.status.in_(("completed", "failed")),
+                    table.c.finished_at < expired_before
+                )
+            ).all()
+            if not expired:
+                return
+            connection.execute(table.delete().where(table.c.id.in_([job_id for job_id, _ in expired])))
+        for _, path in expired:
+            remove_artifact(path)
+
+
+def artifact_path(job_id: int, suffix: str) -> str:
+    return os.path.join(JOB_ARTIFACT_DIR, f"job_{job_id}{suffix}")
+
+
+def remove_artifact(path):
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+def job_to_dict(job: Job) -> dict:
+    """任务状态（进度为 0-1，吞吐量为每秒处理的提示词数）"""
+    if job.status == "completed":
+        progress = 1.0
+    elif job.total:
+        progress = min(job.processed / job.total, 1.0)
+    elif job.bytes_total:
+        progress = min(job.bytes_done / job.bytes_total, 1.0)
+    else:
+        progress = None
+
+    throughput = None
+    if job.started_at is not None:
+        end = job.finished_at or job.heartbeat_at
+        elapsed = (end - job.started_at).total_seconds() if end is not None else 0
+        if elapsed > 0:
+            throughput = {
+                "items_per_second": round(job.processed / elapsed, 1),
+                "bytes_per_second": round(job.bytes_done / elapsed)
+            }
+
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "params": json.loads(job.params or "{}"),
+        "progress": progress,
+        "total": job.total,
+        "processed": job.processed,
+        "bytes_done": job.bytes_done,
+        "bytes_total": job.bytes_total,
+        "throughput": throughput,
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "download_url": (
+            f"/api/export/jobs/{job.id}/download"
+            if job.kind == "export" and job.status == "completed" else None
+        )
+    }
+
+
+job_manager = JobManager(SessionLocal, JOB_WORKERS, JOB_POLL_INTERVAL)
@@ -0,0 +1,184 @@
+"""分页工具
+
+- 页码分页：page/per_page，兼容旧接口
+- 游标分页：cursor/next_cursor，按 (排序列, id) 做 keyset 查询，深分页无需 OFFSET，
+  并发插入时也不会出现重复或遗漏
+- 总数模式 total_mode：exact 实时 COUNT，estimate 使用短期缓存，none 不计数（只返回 has_more）
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import DateTime, Integer, String, and_, literal, or_
+
+from .cache import count_cache
+
+
+def encode_cursor(sort_by: str, sort_order: str, value, row_id: int) -> str:
+    """生成不透明游标"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps(
+        {"s": sort_by, "o": sort_order, "v": value, "id": row_id},
+        ensure_ascii=False,
+        separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _invalid_cursor():
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="无效的分页游标"
+    )
+
+
+def bind_datetime(value: datetime, dialect_name: str):
+    """将时间转为可与 DateTime 列比较的参数"""
+    if dialect_name == "sqlite":
+        # SQLite 以文本保存时间，CURRENT_TIMESTAMP 不带微秒，需按相同格式比较
+        text_value = value.strftime("%Y-%m-%d %H:%M:%S")
+        if value.microsecond:
+            text_value += f".{value.microsecond:06d}"
+        return literal(text_value)
+    return value
+
+
+def _cursor_value(sort_key, value, dialect_name: str):
+    """将游标中的值还原为可与排序列比较的参数，类型不符时抛出 ValueError"""
+    if value is None or isinstance(value, bool):
+        raise ValueError("游标排序值无效")
+    column_type = getattr(sort_key, "type", None)
+    if isinstance(column_type, DateTime):
+        if not isinstance(value, str):
+            raise ValueError("游标排序值无效")
+        return bind_datetime(datetime.fromisoformat(value), dialect_name)
+    if isinstance(column_type, String):
+        if not isinstance(value, str):
+            raise ValueError("游标排序值无效")
+        return value
+    if isinstance(column_type, Integer):
+        if not isinstance(value, int):
+            raise ValueError("游标排序值无效")
+        return value
+    # 其他表达式（如搜索相关度）为数值
+    if not isinstance(value, (int, float)):
+        raise ValueError("游标排序值无效")
+    return value
+
+
+def decode_cursor(cursor: str, sort_by: str, sort_order: str, sort_key, dialect_name: str):
+    """解析并校验游标，返回 (可与排序列比较的排序值, id)
+
+    游标来自客户端，格式、排序参数或值的类型不符时一律返回 400。
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        cursor_sort_by, cursor_sort_order = payload["s"], payload["o"]
+        value, row_id = payload["v"], payload["id"]
+    except (ValueError, TypeError, KeyError, binascii.Error):
+        raise _invalid_cursor()
+
+    if cursor_sort_by != sort_by or cursor_sort_order != sort_order:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="分页游标与排序参数不匹配"
+        )
+
+    if not isinstance(row_id, int) or isinstance(row_id, bool):
+        raise _invalid_cursor()
+    try:
+        value = _cursor_value(sort_key, value, dialect_name)
+    except (ValueError, TypeError):
+        raise _invalid_cursor()
+    return value, row_id
+
+
+def paginate(
+    query,
+    sort_by: str,
+    sort_key,
+    sort_order: str,
+    id_column,
+    page: int,
+    per_page: int,
+    cursor: Optional[str] = None,
+    cursor_of=None
+):
+    """按 (sort_key, id) 排序并取出一页
+
+    cursor 为 None 时使用页码分页，否则使用游标分页（空字符串表示第一页）。
+    两种模式都会返回 next_cursor，前端可以随时切换到游标模式。
+    cursor_of(row) 返回该行的 (排序值, id)，默认从 ORM 对象上读取。
+    排序列需为非空列。
+
+    返回 (rows, next_cursor)
+    """
+    if cursor_of is None:
+        def cursor_of(row):
+            return getattr(row, sort_by), row.id
+
+    descending = sort_order == "desc"
+
+    if cursor:
+        value, last_id = decode_cursor(
+            cursor, sort_by, sort_order, sort_key, query.session.get_bind().dialect.name
+        )
+        if descending:
+            query = query.filter(or_(
+                sort_key < value,
+                and_(sort_key == value, id_column < last_id)
+            ))
+        else:
+            query = query.filter(or_(
+                sort_key > value,
+                and_(sort_key == value, id_column > last_id)
+            ))
+
+    if descending:
+        query = query.order_by(sort_key.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_key.asc(), id_column.asc())
+
+    if cursor is None:
+        query = query.offset((page - 1) * per_page)
+
+    # 多取一行用于判断是否还有下一页
+    rows = query.limit(per_page + 1).all()
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        value, row_id = cursor_of(rows[-1])
+        next_cursor = encode_cursor(sort_by, sort_order, value, row_id)
+
+    return rows, next_cursor
+
+
+def count_total(query, total_mode: str, cache_owner=None, cache_key=None) -> Optional[int]:
+    """按 total_mode 计算列表总数
+
+    estimate 模式下按 (cache_owner, cache_key) 缓存 COUNT 结果，
+    cache_key 需包含全部过滤条件。
+    """
+    if total_mode == "none":
+        return None
+
+    if total_mode == "estimate":
+        total = count_cache.get(cache_owner, cache_key)
+        if total is None:
+            total = query.count()
+            count_cache.set(cache_owner, cache_key, total)
+        return total
+
+    return query.count()
+
+
+def total_pages_of(total: Optional[int], per_page: int) -> Optional[int]:
+    """根据总数计算总页数"""
+    if total is None:
+        return None
+    return (total + per_page - 1) // per_page
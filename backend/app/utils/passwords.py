@@ -0,0 +1,132 @@
+"""密码哈希
+
+bcrypt 每次计算耗时约数百毫秒，在独立的有界线程池中执行（bcrypt 计算时释放 GIL）。
+登录与注册接口为 async 函数，通过 *_async 方法等待计算结果，排队期间不占用处理请求的线程池：
+
+- 排队与执行中的计算超过 PASSWORD_HASH_QUEUE_SIZE 时立即拒绝（PasswordHasherBusy），
+  由接口返回 503，避免登录高峰拖慢其他请求
+- 同步方法（hash 等）阻塞当前线程直到计算完成，供脚本使用
+- 代价因子由 BCRYPT_ROUNDS 配置；修改后，旧哈希在用户下次登录成功时按新参数重新计算
+- 记录计算耗时、排队数与拒绝次数，开启 METRICS_ENABLED 后通过 /api/metrics 查看
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from passlib.context import CryptContext
+
+# bcrypt 代价因子（每加 1 耗时翻倍）
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# 哈希计算线程数
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# 排队与执行中的计算上限，超过时拒绝
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", "16"))
+
+# 参与延迟分位数统计的最近样本数
+_LATENCY_SAMPLES = 1000
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+
+class PasswordHasherBusy(Exception):
+    """哈希计算排队已满"""
+
+
+class PasswordHasher:
+    """有界线程池中的密码哈希与校验"""
+
+    def __init__(self, context: CryptContext, workers: int, queue_size: int):
+        self.context = context
+        self.workers = workers
+        self.queue_size = queue_size
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._total_seconds = 0.0
+        self._latencies = deque(maxlen=_LATENCY_SAMPLES)
+
+    def _submit(self, function, *args) -> Future:
+        """提交计算；名额在计算结束（或排队中被取消）时释放"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise PasswordHasherBusy()
+        with self._lock:
+            self._in_flight += 1
+        try:
+            future = self._executor.submit(self._timed, function, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future=None):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def _timed(self, function, *args):
+        started = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._completed += 1
+                self._total_seconds += elapsed
+                self._latencies.append(elapsed)
+
+    def hash(self, password: str) -> str:
+        return self._submit(self.context.hash, password).result()
+
+    def verify(self, password: str, password_hash: str) -> bool:
+        return self._submit(self.context.verify, password, password_hash).result()
+
+    def verify_and_update(self, password: str, password_hash: str):
+        """(是否匹配, 新哈希)；哈希参数与当前配置不一致时返回新哈希，否则为 None"""
+        return self._submit(self.context.verify_and_update, password, password_hash).result()
+
+    async def hash_async(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit(self.context.hash, password))
+
+    async def verify_async(self, password: str, password_hash: str) -> bool:
+        return await asyncio.wrap_future(self._submit(self.context.verify, password, password_hash))
+
+    async def verify_and_update_async(self, password: str, password_hash: str):
+        return await asyncio.wrap_future(
+            self._submit(self.context.verify_and_update, password, password_hash)
+        )
+
+    def metrics(self) -> dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            completed, total_seconds = self._completed, self._total_seconds
+            in_flight, rejected = self._in_flight, self._rejected
+
+        def percentile(fraction):
+            if not latencies:
+                return None
+            return round(latencies[min(int(len(latencies) * fraction), len(latencies) - 1)] * 1000, 1)
+
+        return {
+            "rounds": BCRYPT_ROUNDS,
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "in_flight": in_flight,
+            "completed": completed,
+            "rejected": rejected,
+            "avg_ms": round(total_seconds / completed * 1000, 1) if completed else None,
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+            "max_ms": round(latencies[-1] * 1000, 1) if latencies else None
+        }
+
+
+password_hasher = PasswordHasher(pwd_context, PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_SIZE)
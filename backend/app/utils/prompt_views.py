@@ -0,0 +1,149 @@
+"""列表接口的返回视图（view 参数）与序列化
+
+- full：完整的 Prompt，包含全文 content（默认，兼容旧客户端）
+- summary：PromptSummary，content 只在数据库中截取前 preview_length 个字符作为 preview 返回，
+  长内容不会被读出和序列化
+
+列表、公开列表和搜索接口只查询视图需要的列（行元组，不构造 ORM 对象），
+分类与标签按本页的 id 各用一条查询取出，直接拼成与响应模型结构一致的 dict，
+由 FastJSONResponse 编码，跳过 response_model 的校验与转换。
+
+返回的 view_count 与 get_prompt 一致，包含尚未写回的浏览次数；
+按 view_count 排序时使用数据库中的值，写回前顺序可能与返回的次数略有出入。
+"""
+import os
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, select
+
+from ..models.prompt import Prompt, Category, Tag, prompt_tags
+from .responses import FastJSONResponse
+from .view_counter import view_counter
+
+# 摘要视图默认的预览长度（字符）
+PROMPT_PREVIEW_LENGTH = int(os.getenv("PROMPT_PREVIEW_LENGTH", "200"))
+
+VIEW_PATTERN = "^(summary|full)$"
+
+_COMMON_COLUMNS = (
+    Prompt.id, Prompt.title, Prompt.description, Prompt.is_public, Prompt.is_favorite,
+    Prompt.view_count, Prompt.user_id, Prompt.category_id, Prompt.created_at, Prompt.updated_at
+)
+
+
+def select_view(query, view: str, preview_length: int = PROMPT_PREVIEW_LENGTH):
+    """把 Prompt 查询换成视图需要的列，保留原有的连接与过滤条件"""
+    if view == "summary":
+        return query.with_entities(
+            *_COMMON_COLUMNS,
+            Prompt.content_length,
+            func.substr(Prompt.content, 1, preview_length).label("preview")
+        )
+    return query.with_entities(*_COMMON_COLUMNS, Prompt.content)
+
+
+def _load_categories(db, category_ids, view: str) -> Dict[int, dict]:
+    if not category_ids:
+        return {}
+    if view == "summary":
+        rows = db.execute(
+            select(Category.id, Category.name, Category.color).where(Category.id.in_(category_ids))
+        )
+        return {row.id: {"id": row.id, "name": row.name, "color": row.color} for row in rows}
+    rows = db.execute(
+        select(
+            Category.id, Category.name, Category.description, Category.color,
+            Category.user_id, Category.created_at
+        ).where(Category.id.in_(category_ids))
+    )
+    return {
+        row.id: {
+            "name": row.name,
+            "description": row.description,
+            "color": row.color,
+            "id": row.id,
+            "user_id": row.user_id,
+            "created_at": row.created_at
+        }
+        for row in rows
+    }
+
+
+def _load_tags(db, prompt_ids, view: str) -> Dict[int, List[dict]]:
+    tags = {}
+    if not prompt_ids:
+        return tags
+    rows = db.execute(
+        select(prompt_tags.c.prompt_id, Tag.id, Tag.name, Tag.color, Tag.created_at).join(
+            Tag, Tag.id == prompt_tags.c.tag_id
+        ).where(
+            prompt_tags.c.prompt_id.in_(prompt_ids)
+        ).order_by(prompt_tags.c.prompt_id, prompt_tags.c.tag_id)
+    )
+    for prompt_id, tag_id, name, color, created_at in rows:
+        if view == "summary":
+            item = {"id": tag_id, "name": name, "color": color}
+        else:
+            item = {"name": name, "color": color, "id": tag_id, "created_at": created_at}
+        tags.setdefault(prompt_id, []).append(item)
+    return tags
+
+
+def serialize_prompts(db, rows, view: str, snippets: Optional[list] = None) -> List[dict]:
+    """将 select_view 查询的行转为响应 dict（字段顺序与 Prompt / PromptSummary 一致）"""
+    categories = _load_categories(db, {row.category_id for row in rows if row.category_id is not None}, view)
+    tags = _load_tags(db, [row.id for row in rows], view)
+    pending_views = view_counter.pending_for_many([row.id for row in rows])
+
+    items = []
+    for index, row in enumerate(rows):
+        if view == "summary":
+            item = {
+                "id": row.id,
+                "title": row.title,
+                "description": row.description,
+                "preview": row.preview or "",
+                "content_length": row.content_length or 0,
+                "is_public": row.is_public,
+                "is_favorite": row.is_favorite,
+                "view_count": (row.view_count or 0) + pending_views.get(row.id, 0),
+                "user_id": row.user_id,
+                "category_id": row.category_id,
+                "created_at": row.created_at,
+                "updated_at": row.updated_at,
+            }
+        else:
+            item = {
+                "title": row.title,
+                "content": row.content,
+                "description": row.description,
+                "is_public": row.is_public,
+                "is_favorite": row.is_favorite,
+                "id": row.id,
+                "user_id": row.user_id,
+                "category_id": row.category_id,
+                "view_count": (row.view_count or 0) + pending_views.get(row.id, 0),
+                "created_at": row.created_at,
+                "updated_at": row.updated_at,
+            }
+        item["category"] = categories.get(row.category_id)
+        item["tags"] = tags.get(row.id, [])
+        item["snippet"] = snippets[index] if snippets is not None else None
+        items.append(item)
+    return items
+
+
+def prompt_list_response(
+    db, rows, view: str, total: Optional[int], page: int, per_page: int,
+    total_pages: Optional[int], next_cursor: Optional[str], snippets: Optional[list] = None
+) -> FastJSONResponse:
+    """列表响应（结构与 PromptList / PromptSummaryList 一致）"""
+    return FastJSONResponse({
+        "total": total,
+        "page": page,
+        "per_page": per_page,
+        "total_pages": total_pages,
+        "has_more": next_cursor is not None,
+        "next_cursor": next_cursor,
+        "prompts": serialize_prompts(db, rows, view, snippets)
+    })
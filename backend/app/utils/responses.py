@@ -0,0 +1,38 @@
+"""JSON 响应
+
+FastJSONResponse 在安装了 orjson 时用它编码（速度约为标准库的数倍），否则退回 json。
+接口直接返回该响应时，FastAPI 不再按 response_model 校验和转换，
+只用于内容由服务端自行构造、结构已确定的热点接口（response_model 仍用于生成文档）。
+"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # 可选依赖
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"无法序列化的类型: {type(value).__name__}")
+
+
+def dumps(content) -> bytes:
+    """编码为紧凑的 UTF-8 JSON（与 JSONResponse 的输出格式一致）"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_default
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -0,0 +1,106 @@
+"""令牌吊销
+
+登出和刷新令牌轮换时，把被吊销令牌的 jti 写入 revoked_tokens 表，同时加入进程内的字典。
+verify_token 每次只做一次字典查找，不访问数据库。
+
+- 启动时加载尚未过期的记录；后台线程按固定间隔增量同步其他进程写入的记录，
+  并删除已过期的记录（令牌过期后本身就无法通过校验）
+- 多进程部署时，其他进程吊销的令牌最多在一个同步间隔后生效
+- 主键保证同一个刷新令牌只能被吊销（使用）一次
+"""
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError
+
+from ..database import engine
+from ..models.token import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+# 同步与清理间隔（秒）
+TOKEN_REVOCATION_SYNC_INTERVAL = float(os.getenv("TOKEN_REVOCATION_SYNC_INTERVAL", "30"))
+
+# 增量同步时向前多读的时间，容忍写入与提交之间的延迟及进程间的时钟偏差
+_SYNC_OVERLAP = timedelta(seconds=60)
+
+
+class TokenDenylist:
+    """已吊销令牌的 jti 集合（内存）与 revoked_tokens 表"""
+
+    def __init__(self, bind, interval: float):
+        self.bind = bind
+        self.interval = interval
+        self._lock = threading.Lock()
+        # jti -> 令牌过期时间
+        self._entries = {}
+        self._synced_at = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def is_revoked(self, jti: str) -> bool:
+        return jti in self._entries
+
+    def revoke(self, jti: str, user_id: int, token_type: str, expires_at: datetime) -> bool:
+        """吊销令牌；已被吊销过时返回 False"""
+        try:
+            with self.bind.begin() as connection:
+                connection.execute(insert(RevokedToken.__table__).values(
+                    jti=jti,
+                    user_id=user_id,
+                    token_type=token_type,
+                    expires_at=expires_at,
+                    revoked_at=datetime.utcnow()
+                ))
+        except IntegrityError:
+            with self._lock:
+                self._entries[jti] = expires_at
+            return False
+        with self._lock:
+            self._entries[jti] = expires_at
+        return True
+
+    def sync(self):
+        """删除过期记录，并加载上次同步以来新增的记录"""
+        table = RevokedToken.__table__
+        now = datetime.utcnow()
+        statement = select(table.c.jti, table.c.expires_at).where(table.c.expires_at >= now)
+        if self._synced_at is not None:
+            statement = statement.where(table.c.revoked_at >= self._synced_at - _SYNC_OVERLAP)
+        with self.bind.begin() as connection:
+            connection.execute(delete(table).where(table.c.expires_at < now))
+            rows = connection.execute(statement).all()
+        with self._lock:
+            self._entries = {
+                jti: expires_at for jti, expires_at in self._entries.items() if expires_at >= now
+            }
+            self._entries.update(rows)
+        self._synced_at = now
+
+    def start(self):
+        """加载未过期的记录并启动后台同步线程"""
+        if self._thread is not None:
+            return
+        self.sync()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="token-denylist", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sync()
+            except Exception:
+                logger.exception("同步已吊销令牌失败")
+
+
+token_denylist = TokenDenylist(engine, TOKEN_REVOCATION_SYNC_INTERVAL)
@@ -0,0 +1,222 @@
+"""统计汇总表维护
+
+仪表板与趋势接口读取 user_stats / user_daily_stats / user_tag_stats / user_category_stats，
+这些表由写操作增量维护：
+
+    before = prompt_facts(prompt)        # 修改前
+    ...修改 prompt...
+    apply_prompt_change(db, before, prompt_facts(prompt))
+    db.commit()
+
+增量与业务修改在同一事务内提交；数据不一致时可执行 rebuild_rollups.py 重建。
+"""
+import logging
+from collections import Counter, defaultdict
+from datetime import date, datetime
+from typing import NamedTuple, Optional, Tuple
+
+from sqlalchemy import and_, case, delete, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from ..models.prompt import Prompt, prompt_tags
+from ..models.rollup import UserStats, UserDailyStats, UserTagStats, UserCategoryStats
+
+logger = logging.getLogger(__name__)
+
+
+class PromptFacts(NamedTuple):
+    """一个提示词对汇总表有影响的字段"""
+    user_id: int
+    day: date
+    is_public: bool
+    is_favorite: bool
+    view_count: int
+    category_id: Optional[int]
+    tag_ids: Tuple[int, ...]
+
+
+def utc_today() -> date:
+    # 与 SQLite CURRENT_TIMESTAMP 一致使用 UTC 日期
+    return datetime.utcnow().date()
+
+
+def prompt_facts(prompt: Prompt) -> PromptFacts:
+    """读取提示词当前的统计相关字段"""
+    created_at = prompt.created_at
+    return PromptFacts(
+        user_id=prompt.user_id,
+        # 尚未写入数据库的新提示词，创建时间由数据库取当前时间
+        day=created_at.date() if created_at is not None else utc_today(),
+        is_public=bool(prompt.is_public),
+        is_favorite=bool(prompt.is_favorite),
+        view_count=prompt.view_count or 0,
+        category_id=prompt.category_id,
+        tag_ids=tuple(tag.id for tag in prompt.tags)
+    )
+
+
+class RollupDelta:
+    """累积各汇总表的增量，apply 时每张表一次批量 upsert"""
+
+    def __init__(self):
+        self.user_stats = defaultdict(Counter)   # user_id -> {列: 增量}
+        self.daily = defaultdict(Counter)        # (user_id, day) -> {列: 增量}
+        self.tags = Counter()                    # (user_id, tag_id) -> 增量
+        self.categories = Counter()              # (user_id, category_id) -> 增量
+
+    def add_prompt(self, facts: PromptFacts, sign: int = 1):
+        stats = self.user_stats[facts.user_id]
+        stats["total_prompts"] += sign
+        stats["public_prompts"] += sign * facts.is_public
+        stats["favorite_prompts"] += sign * facts.is_favorite
+        stats["total_views"] += sign * facts.view_count
+        self.daily[(facts.user_id, facts.day)]["prompts_created"] += sign
+        for tag_id in facts.tag_ids:
+            self.tags[(facts.user_id, tag_id)] += sign
+        if facts.category_id is not None:
+            self.categories[(facts.user_id, facts.category_id)] += sign
+
+    def remove_prompt(self, facts: PromptFacts):
+        self.add_prompt(facts, -1)
+
+    def add_views(self, user_id: int, count: int, day: Optional[date] = None):
+        self.user_stats[user_id]["total_views"] += count
+        self.daily[(user_id, day or utc_today())]["views"] += count
+
+    def apply(self, connection):
+        """写入汇总表（在调用方的事务内执行）"""
+        _upsert(connection, UserStats.__table__, ["user_id"], [
+            {"user_id": user_id, **counts}
+            for user_id, counts in self.user_stats.items()
+        ])
+        _upsert(connection, UserDailyStats.__table__, ["user_id", "day"], [
+            {"user_id": user_id, "day": day, **counts}
+            for (user_id, day), counts in self.daily.items()
+        ])
+        _upsert(connection, UserTagStats.__table__, ["user_id", "tag_id"], [
+            {"user_id": user_id, "tag_id": tag_id, "usage_count": count}
+            for (user_id, tag_id), count in self.tags.items()
+        ])
+        _upsert(connection, UserCategoryStats.__table__, ["user_id", "category_id"], [
+            {"user_id": user_id, "category_id": category_id, "prompt_count": count}
+            for (user_id, category_id), count in self.categories.items()
+        ])
+
+
+def _upsert(connection, table, key_columns, rows):
+    """按主键累加计数列，不存在时插入"""
+    counter_columns = [column.name for column in table.columns if column.name not in key_columns]
+    # 统一参数结构以便 executemany，并跳过增量全为 0 的行
+    rows = [
+        {**row, **{name: row.get(name, 0) for name in counter_columns}}
+        for row in rows
+        if any(row.get(name, 0) for name in counter_columns)
+    ]
+    if not rows:
+        return
+
+    dialect_name = connection.dialect.name
+    if dialect_name in ("sqlite", "postgresql"):
+        insert = (sqlite.insert if dialect_name == "sqlite" else postgresql.insert)(table)
+        statement = insert.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={name: table.c[name] + insert.excluded[name] for name in counter_columns}
+        )
+        connection.execute(statement, rows)
+        return
+
+    # 其他数据库：先更新，不存在再插入
+    for row in rows:
+        result = connection.execute(
+            update(table)
+            .where(and_(*(table.c[name] == row[name] for name in key_columns)))
+            .values({name: table.c[name] + row[name] for name in counter_columns})
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(**row))
+
+
+def apply_prompt_change(db, before: Optional[PromptFacts], after: Optional[PromptFacts]):
+    """记录一次提示词创建（before=None）、修改或删除（after=None）"""
+    delta = RollupDelta()
+    if before is not None:
+        delta.remove_prompt(before)
+    if after is not None:
+        delta.add_prompt(after)
+    delta.apply(db.connection())
+
+
+def _as_date(value) -> date:
+    # SQLite 的 date() 返回文本
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+
+def rebuild_rollups(connection, user_id: Optional[int] = None):
+    """根据 prompts 表重新计算汇总数据
+
+    每日浏览次数只能增量累积，无法从 prompts 表还原，重建时予以保留。
+    """
+    def scoped(statement, column):
+        return statement.where(column == user_id) if user_id is not None else statement
+
+    daily = UserDailyStats.__table__
+    connection.execute(scoped(delete(UserStats.__table__), UserStats.user_id))
+    connection.execute(scoped(delete(UserTagStats.__table__), UserTagStats.user_id))
+    connection.execute(scoped(delete(UserCategoryStats.__table__), UserCategoryStats.user_id))
+    connection.execute(scoped(update(daily).values(prompts_created=0), daily.c.user_id))
+    connection.execute(scoped(delete(daily).where(daily.c.views == 0), daily.c.user_id))
+
+    delta = RollupDelta()
+    rows = connection.execute(scoped(
+        select(
+            Prompt.user_id,
+            func.count(Prompt.id),
+            func.sum(case((Prompt.is_public == True, 1), else_=0)),
+            func.sum(case((Prompt.is_favorite == True, 1), else_=0)),
+            func.sum(func.coalesce(Prompt.view_count, 0))
+        ).group_by(Prompt.user_id),
+        Prompt.user_id
+    ))
+    for owner_id, total, public, favorite, views in rows:
+        delta.user_stats[owner_id].update(
+            total_prompts=total, public_prompts=public, favorite_prompts=favorite, total_views=views
+        )
+
+    created_day = func.date(Prompt.created_at)
+    rows = connection.execute(scoped(
+        select(Prompt.user_id, created_day, func.count(Prompt.id))
+        .group_by(Prompt.user_id, created_day),
+        Prompt.user_id
+    ))
+    for owner_id, day, count in rows:
+        delta.daily[(owner_id, _as_date(day))]["prompts_created"] += count
+
+    rows = connection.execute(scoped(
+        select(Prompt.user_id, prompt_tags.c.tag_id, func.count())
+        .join(prompt_tags, prompt_tags.c.prompt_id == Prompt.id)
+        .group_by(Prompt.user_id, prompt_tags.c.tag_id),
+        Prompt.user_id
+    ))
+    for owner_id, tag_id, count in rows:
+        delta.tags[(owner_id, tag_id)] += count
+
+    rows = connection.execute(scoped(
+        select(Prompt.user_id, Prompt.category_id, func.count(Prompt.id))
+        .where(Prompt.category_id.isnot(None))
+        .group_by(Prompt.user_id, Prompt.category_id),
+        Prompt.user_id
+    ))
+    for owner_id, category_id, count in rows:
+        delta.categories[(owner_id, category_id)] += count
+
+    delta.apply(connection)
+
+
+def init_rollups(bind):
+    """汇总表为空而已有数据时（首次升级），执行一次全量重建"""
+    with bind.begin() as connection:
+        has_stats = connection.execute(select(UserStats.user_id).limit(1)).first()
+        has_prompts = connection.execute(select(Prompt.id).limit(1)).first()
+        if has_prompts and not has_stats:
+            logger.info("初始化统计汇总表")
+            rebuild_rollups(connection)
@@ -0,0 +1,276 @@
+"""全文搜索后端
+
+- SQLite: FTS5 虚拟表（trigram 分词，可做中文子串匹配），由触发器与 prompts 表保持同步
+- PostgreSQL: tsvector 生成列 + GIN 索引；含中日韩字符的关键词改用 ILIKE 子串匹配
+  （simple 分词把连续的中文当作一个词，tsquery 只能匹配词首），由 pg_trgm 索引加速
+- 其他情况（或 SEARCH_BACKEND=like）回退到 LIKE 扫描
+
+索引结构由迁移 0009_fulltext_search 创建，启动时只检查是否存在。
+"""
+import html
+import logging
+import os
+import re
+
+from sqlalchemy import Column, Integer, MetaData, Table, Text, case, func, literal_column, or_, text
+from sqlalchemy.exc import DBAPIError
+
+from ..models.prompt import Prompt
+
+logger = logging.getLogger(__name__)
+
+# auto: 按数据库类型选择全文索引; like: 始终使用 LIKE
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "auto")
+
+# 字段权重：标题 > 描述 > 内容
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 5.0
+CONTENT_WEIGHT = 1.0
+
+# 摘要长度（字符数）
+SNIPPET_LENGTH = int(os.getenv("SEARCH_SNIPPET_LENGTH", "64"))
+
+# 高亮标记，先用私有区字符占位，转义后再替换为 <mark>
+_HIGHLIGHT_START = "\ue000"
+_HIGHLIGHT_END = "\ue001"
+
+# FTS5 虚拟表，仅用于构造查询，不注册到 Base.metadata（避免 create_all 建成普通表）
+prompts_fts = Table(
+    "prompts_fts",
+    MetaData(),
+    Column("rowid", Integer),
+    Column("prompts_fts", Text),
+    Column("title", Text),
+    Column("description", Text),
+    Column("content", Text),
+)
+
+class LikeSearchBackend:
+    """LIKE 回退实现（全表扫描）"""
+
+    name = "like"
+
+    def available(self, connection) -> bool:
+        """数据库中是否已有所需的索引结构"""
+        return True
+
+    def apply(self, query, q: str):
+        """为查询追加搜索条件"""
+        search_term = f"%{q}%"
+        return query.filter(
+            or_(
+                Prompt.title.ilike(search_term),
+                Prompt.content.ilike(search_term),
+                Prompt.description.ilike(search_term)
+            )
+        )
+
+    def rank_expression(self, q: str):
+        """相关度表达式，值越大越相关（需配合 apply 使用）"""
+        search_term = f"%{q}%"
+        return case(
+            (Prompt.title.ilike(search_term), TITLE_WEIGHT),
+            (Prompt.description.ilike(search_term), DESCRIPTION_WEIGHT),
+            else_=CONTENT_WEIGHT
+        )
+
+    def snippet_expression(self, q: str, max_length: int = None):
+        """摘要表达式，结果交给 render_snippet 处理
+
+        max_length 不为空时只在数据库中截取内容的前 max_length 个字符（摘要视图不读出全文）。
+        """
+        if max_length is None:
+            return Prompt.content
+        return func.substr(Prompt.content, 1, max_length)
+
+    def render_snippet(self, raw, q: str):
+        """截取匹配位置附近的内容并高亮关键词"""
+        if not raw:
+            return raw
+        position = raw.lower().find(q.lower())
+        if position < 0:
+            fragment = raw[:SNIPPET_LENGTH]
+            return _render_highlight(fragment + ("…" if len(raw) > SNIPPET_LENGTH else ""))
+
+        start = max(0, position - (SNIPPET_LENGTH - len(q)) // 2)
+        end = min(len(raw), start + max(SNIPPET_LENGTH, len(q)))
+        fragment = (
+            raw[start:position]
+            + _HIGHLIGHT_START + raw[position:position + len(q)] + _HIGHLIGHT_END
+            + raw[position + len(q):end]
+        )
+        return _render_highlight(
+            ("…" if start > 0 else "") + fragment + ("…" if end < len(raw) else "")
+        )
+
+
+class SqliteFtsBackend(LikeSearchBackend):
+    """SQLite FTS5 实现"""
+
+    name = "sqlite_fts5"
+    # trigram 分词至少需要3个字符，更短的关键词回退到 LIKE
+    min_query_length = 3
+
+    def _match_query(self, q: str):
+        """FTS5 MATCH 查询；转义后不足一个 trigram 时返回 None（回退到 LIKE）"""
+        if len(q) < self.min_query_length:
+            return None
+        return _fts5_phrase(q)
+
+    def available(self, connection) -> bool:
+        return connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'prompts_fts'")
+        ).first() is not None
+
+    def apply(self, query, q: str):
+        match_query = self._match_query(q)
+        if match_query is None:
+            return super().apply(query, q)
+        return query.join(prompts_fts, prompts_fts.c.rowid == Prompt.id).filter(
+            prompts_fts.c.prompts_fts.match(match_query)
+        )
+
+    def rank_expression(self, q: str):
+        if self._match_query(q) is None:
+            return super().rank_expression(q)
+        # bm25() 越小越相关，取负数统一为越大越相关
+        return -func.bm25(
+            literal_column("prompts_fts"), TITLE_WEIGHT, DESCRIPTION_WEIGHT, CONTENT_WEIGHT
+        )
+
+    def snippet_expression(self, q: str, max_length: int = None):
+        if self._match_query(q) is None:
+            return super().snippet_expression(q, max_length)
+        # trigram 分词下每个 token 约等于一个字符；第2列为 content
+        return func.snippet(
+            literal_column("prompts_fts"), 2, _HIGHLIGHT_START, _HIGHLIGHT_END, "…",
+            min(SNIPPET_LENGTH, 64)
+        )
+
+    def render_snippet(self, raw, q: str):
+        if self._match_query(q) is None:
+            return super().render_snippet(raw, q)
+        return _render_highlight(raw)
+
+
+class PostgresFtsBackend(LikeSearchBackend):
+    """PostgreSQL tsvector 实现"""
+
+    name = "postgres_tsvector"
+
+    def available(self, connection) -> bool:
+        return connection.execute(
+            text(
+                "SELECT 1 FROM information_schema.columns "
+                "WHERE table_name = 'prompts' AND column_name = 'search_vector'"
+            )
+        ).first() is not None
+
+    def apply(self, query, q: str):
+        ts_query = _to_tsquery(q)
+        if not ts_query:
+            return super().apply(query, q)
+        return query.filter(
+            literal_column("prompts.search_vector").op("@@")(func.to_tsquery("simple", ts_query))
+        )
+
+    def rank_expression(self, q: str):
+        ts_query = _to_tsquery(q)
+        if not ts_query:
+            return super().rank_expression(q)
+        # 权重数组顺序为 {D, C, B, A}，对应 setweight 中的 内容=C、描述=B、标题=A
+        weights = "'{0, %s, %s, 1}'::float4[]" % (
+            CONTENT_WEIGHT / TITLE_WEIGHT, DESCRIPTION_WEIGHT / TITLE_WEIGHT
+        )
+        return func.ts_rank_cd(
+            literal_column(weights),
+            literal_column("prompts.search_vector"),
+            func.to_tsquery("simple", ts_query)
+        )
+
+    def snippet_expression(self, q: str, max_length: int = None):
+        ts_query = _to_tsquery(q)
+        if not ts_query:
+            return super().snippet_expression(q, max_length)
+        words = max(SNIPPET_LENGTH // 4, 8)
+        options = (
+            f"StartSel={_HIGHLIGHT_START}, StopSel={_HIGHLIGHT_END}, "
+            f"MaxFragments=1, MaxWords={words}, MinWords={words // 2}, FragmentDelimiter=…"
+        )
+        return func.ts_headline("simple", Prompt.content, func.to_tsquery("simple", ts_query), options)
+
+    def render_snippet(self, raw, q: str):
+        if not _to_tsquery(q):
+            return super().render_snippet(raw, q)
+        return _render_highlight(raw)
+
+
+def normalize_query(q) -> str:
+    """统一处理用户输入的关键词：去掉首尾空白（中间的空白属于子串的一部分，保持不变）
+
+    结果为空串时调用方不做搜索过滤（返回未过滤的列表）；
+    各搜索后端只接收非空的规范化关键词。
+    """
+    return (q or "").strip()
+
+
+def _fts5_phrase(q: str) -> str:
+    """将用户输入转为 FTS5 短语查询，语义与 LIKE '%q%' 一致"""
+    return '"' + q.replace('"', '""') + '"'
+
+
+def _render_highlight(raw):
+    """转义摘要中的 HTML，并将占位标记替换为 <mark>"""
+    if raw is None:
+        return None
+    return (
+        html.escape(raw)
+        .replace(_HIGHLIGHT_START, "<mark>")
+        .replace(_HIGHLIGHT_END, "</mark>")
+    )
+
+
+# 中日韩字符（假名、谚文、汉字及兼容区）
+_CJK = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]")
+
+
+def _to_tsquery(q: str) -> str:
+    """将用户输入转为前缀匹配的 tsquery；含中日韩字符或没有可检索的词时返回空串（改用 ILIKE）"""
+    if _CJK.search(q):
+        return ""
+    words = re.findall(r"\w+", q)
+    return " & ".join(f"{word}:*" for word in words)
+
+
+_backend = LikeSearchBackend()
+
+
+def init_search_backend(bind):
+    """根据数据库类型及已有的索引结构选择全文搜索后端"""
+    global _backend
+
+    backend = LikeSearchBackend()
+    candidate = None
+    if SEARCH_BACKEND != "like":
+        if bind.dialect.name == "sqlite":
+            candidate = SqliteFtsBackend()
+        elif bind.dialect.name == "postgresql":
+            candidate = PostgresFtsBackend()
+
+    if candidate is not None:
+        try:
+            with bind.connect() as connection:
+                if candidate.available(connection):
+                    backend = candidate
+                else:
+                    logger.warning("未找到全文索引（迁移 0009_fulltext_search），使用LIKE搜索")
+        except DBAPIError as e:
+            logger.warning("全文索引检查失败，回退到LIKE搜索: %s", e)
+
+    _backend = backend
+    return backend
+
+
+def get_search_backend():
+    """获取当前搜索后端"""
+    return _backend
@@ -0,0 +1,260 @@
+"""近似重复提示词检测（MinHash + LSH）
+
+- 分片：规范化内容（NFC、小写、合并空白）的字符 4-gram
+- 签名：单次哈希 MinHash（one permutation hashing）——每个分片只计算一次哈希，
+  按哈希值分到 NUM_HASHES 个槽，每槽取最小值；空槽从右侧最近的非空槽借值（densification）。
+  两个签名相同槽位的比例即 Jaccard 相似度的估计
+- LSH：签名切成 BANDS 段，每段哈希为一个桶；至少有一段落在同一桶的提示词才作为候选，
+  查询只读取同桶的候选，不做两两比较
+
+阈值约为 (1/BANDS)^(1/ROWS) ≈ 0.5：相似度高于该值的提示词大概率成为候选。
+索引由写操作增量维护；修改以下参数后需执行 rebuild_similarity.py 重建。
+"""
+import hashlib
+import logging
+import struct
+import unicodedata
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, func, insert, select
+
+from ..models.prompt import Prompt
+from ..models.similarity import PromptSignature, PromptLshBucket
+
+logger = logging.getLogger(__name__)
+
+SHINGLE_SIZE = 4
+NUM_HASHES = 64
+BANDS = 16
+ROWS = NUM_HASHES // BANDS
+
+# 默认相似度阈值
+DEFAULT_THRESHOLD = 0.5
+# 桶内成员超过该数量时只与桶内第一个成员比较，避免大量完全相同的内容退化为两两比较
+_MAX_PAIRWISE_BUCKET = 32
+
+_SIGNATURE_FORMAT = f"<{NUM_HASHES}I"
+_EMPTY = 1 << 32
+
+
+def shingles(content: str) -> set:
+    """内容的字符 n-gram 集合"""
+    text = " ".join(unicodedata.normalize("NFC", content or "").lower().split())
+    if len(text) <= SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def minhash(content: str) -> Optional[List[int]]:
+    """内容的 MinHash 签名（NUM_HASHES 个 32 位整数），空内容返回 None"""
+    slots = [_EMPTY] * NUM_HASHES
+    for shingle in shingles(content):
+        value = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+        slot = value % NUM_HASHES
+        value >>= 32
+        if value < slots[slot]:
+            slots[slot] = value
+    if all(value == _EMPTY for value in slots):
+        return None
+
+    # 空槽取右侧（循环）最近的非空槽的值，并按距离偏移以区分来源
+    signature = []
+    for index in range(NUM_HASHES):
+        distance = 0
+        while slots[(index + distance) % NUM_HASHES] == _EMPTY:
+            distance += 1
+        value = slots[(index + distance) % NUM_HASHES]
+        signature.append((value + distance * 0x9E3779B1) & 0xFFFFFFFF if distance else value)
+    return signature
+
+
+def pack_signature(signature: List[int]) -> bytes:
+    return struct.pack(_SIGNATURE_FORMAT, *signature)
+
+
+def unpack_signature(data: bytes) -> tuple:
+    return struct.unpack(_SIGNATURE_FORMAT, data)
+
+
+def band_buckets(signature) -> List[int]:
+    """每个 band 的桶编号（有符号 64 位整数）"""
+    buckets = []
+    for band in range(BANDS):
+        data = struct.pack(f"<{ROWS}I", *signature[band * ROWS:(band + 1) * ROWS])
+        buckets.append(int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little", signed=True))
+    return buckets
+
+
+def estimate_similarity(left, right) -> float:
+    """两个签名的 Jaccard 相似度估计"""
+    return sum(a == b for a, b in zip(left, right)) / NUM_HASHES
+
+
+def index_rows(prompt_id: int, user_id: int, content: str):
+    """(签名行, 分桶行列表)，空内容返回 (None, [])"""
+    signature = minhash(content)
+    if signature is None:
+        return None, []
+    signature_row = {"prompt_id": prompt_id, "user_id": user_id, "signature": pack_signature(signature)}
+    bucket_rows = [
+        {"user_id": user_id, "band": band, "bucket": bucket, "prompt_id": prompt_id}
+        for band, bucket in enumerate(band_buckets(signature))
+    ]
+    return signature_row, bucket_rows
+
+
+def write_index(connection, items):
+    """批量写入索引，items 为 (prompt_id, user_id, content)"""
+    signature_rows, bucket_rows = [], []
+    for prompt_id, user_id, content in items:
+        signature_row, rows = index_rows(prompt_id, user_id, content)
+        if signature_row is not None:
+            signature_rows.append(signature_row)
+            bucket_rows.extend(rows)
+    if signature_rows:
+        connection.execute(insert(PromptSignature.__table__), signature_rows)
+        connection.execute(insert(PromptLshBucket.__table__), bucket_rows)
+
+
+def remove_from_index(connection, prompt_ids):
+    """删除提示词的签名与分桶"""
+    prompt_ids = list(prompt_ids)
+    if not prompt_ids:
+        return
+    connection.execute(delete(PromptLshBucket.__table__).where(PromptLshBucket.prompt_id.in_(prompt_ids)))
+    connection.execute(delete(PromptSignature.__table__).where(PromptSignature.prompt_id.in_(prompt_ids)))
+
+
+def index_prompt(db, prompt: Prompt):
+    """创建或修改内容后更新单个提示词的索引（在调用方的事务内执行）"""
+    connection = db.connection()
+    remove_from_index(connection, [prompt.id])
+    write_index(connection, [(prompt.id, prompt.user_id, prompt.content)])
+
+
+def _load_signatures(connection, prompt_ids) -> Dict[int, tuple]:
+    table = PromptSignature.__table__
+    signatures = {}
+    prompt_ids = list(prompt_ids)
+    # 分批读取，避免 IN 参数过多
+    for start in range(0, len(prompt_ids), 500):
+        for prompt_id, data in connection.execute(
+            select(table.c.prompt_id, table.c.signature).where(table.c.prompt_id.in_(prompt_ids[start:start + 500]))
+        ):
+            signatures[prompt_id] = unpack_signature(data)
+    return signatures
+
+
+def find_similar(connection, prompt_id: int, user_id: int, threshold: float = DEFAULT_THRESHOLD, limit: int = 10):
+    """与指定提示词相似的提示词 [(prompt_id, 相似度)]，按相似度降序"""
+    signature = _load_signatures(connection, [prompt_id]).get(prompt_id)
+    if signature is None:
+        return []
+
+    buckets = PromptLshBucket.__table__
+    # band 与 bucket 分别用 IN，可按 (user_id, band, bucket) 主键逐一查找；
+    # 桶编号是 64 位哈希，不同 band 间误配的概率可以忽略，候选最终还会按签名过滤
+    candidates = connection.execute(
+        select(buckets.c.prompt_id).distinct().where(
+            buckets.c.user_id == user_id,
+            buckets.c.band.in_(range(BANDS)),
+            buckets.c.bucket.in_(band_buckets(signature)),
+            buckets.c.prompt_id != prompt_id
+        )
+    ).scalars().all()
+
+    results = [
+        (candidate_id, estimate_similarity(signature, candidate))
+        for candidate_id, candidate in _load_signatures(connection, candidates).items()
+    ]
+    results = [item for item in results if item[1] >= threshold]
+    results.sort(key=lambda item: (-item[1], item[0]))
+    return results[:limit]
+
+
+def find_duplicate_clusters(connection, user_id: int, threshold: float = DEFAULT_THRESHOLD):
+    """用户的近似重复分组 [[prompt_id, ...]]，按组大小降序
+
+    只比较落在同一 LSH 桶中的提示词，再用并查集合并为分组。
+    """
+    buckets = PromptLshBucket.__table__
+    shared = select(buckets.c.band, buckets.c.bucket).where(
+        buckets.c.user_id == user_id
+    ).group_by(buckets.c.band, buckets.c.bucket).having(func.count() > 1).subquery()
+    members = {}
+    for band, bucket, prompt_id in connection.execute(
+        select(buckets.c.band, buckets.c.bucket, buckets.c.prompt_id).join(
+            shared, (buckets.c.band == shared.c.band) & (buckets.c.bucket == shared.c.bucket)
+        ).where(buckets.c.user_id == user_id).order_by(buckets.c.prompt_id)
+    ):
+        members.setdefault((band, bucket), []).append(prompt_id)
+    if not members:
+        return []
+
+    signatures = _load_signatures(connection, {prompt_id for ids in members.values() for prompt_id in ids})
+    parent = {}
+
+    def find(node):
+        parent.setdefault(node, node)
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    compared = set()
+    for prompt_ids in members.values():
+        if len(prompt_ids) <= _MAX_PAIRWISE_BUCKET:
+            pairs = (
+                (left, right)
+                for index, left in enumerate(prompt_ids)
+                for right in prompt_ids[index + 1:]
+            )
+        else:
+            pairs = ((prompt_ids[0], right) for right in prompt_ids[1:])
+        for left, right in pairs:
+            if (left, right) in compared or find(left) == find(right):
+                continue
+            compared.add((left, right))
+            if estimate_similarity(signatures[left], signatures[right]) >= threshold:
+                parent[find(right)] = find(left)
+
+    clusters = {}
+    for prompt_id in parent:
+        clusters.setdefault(find(prompt_id), []).append(prompt_id)
+    return sorted(
+        (sorted(ids) for ids in clusters.values() if len(ids) > 1),
+        key=lambda ids: (-len(ids), ids[0])
+    )
+
+
+def rebuild_similarity_index(connection, user_id: Optional[int] = None, batch_size: int = 500):
+    """根据 prompts 表重建近似重复索引"""
+    signatures, buckets = PromptSignature.__table__, PromptLshBucket.__table__
+    if user_id is not None:
+        connection.execute(delete(buckets).where(buckets.c.user_id == user_id))
+        connection.execute(delete(signatures).where(signatures.c.user_id == user_id))
+    else:
+        connection.execute(delete(buckets))
+        connection.execute(delete(signatures))
+
+    table = Prompt.__table__
+    last_id = 0
+    while True:
+        statement = select(table.c.id, table.c.user_id, table.c.content).where(table.c.id > last_id)
+        if user_id is not None:
+            statement = statement.where(table.c.user_id == user_id)
+        rows = connection.execute(statement.order_by(table.c.id).limit(batch_size)).all()
+        if not rows:
+            return
+        write_index(connection, rows)
+        last_id = rows[-1].id
+
+
+def init_similarity_index(bind):
+    """索引为空而已有数据时（首次升级），执行一次全量重建"""
+    with bind.begin() as connection:
+        has_index = connection.execute(select(PromptSignature.prompt_id).limit(1)).first()
+        has_prompts = connection.execute(select(Prompt.id).limit(1)).first()
+        if has_prompts and not has_index:
+            logger.info("初始化近似重复索引")
+            rebuild_similarity_index(connection)
@@ -0,0 +1,151 @@
+"""浏览次数写回缓冲
+
+get_prompt 只在内存中累加浏览次数，后台线程按固定间隔用一条批量
+UPDATE prompts SET view_count = view_count + n 写回数据库（同时累加统计汇总表）；
+应用关闭时（及进程退出前）会把剩余增量全部写回。
+"""
+import atexit
+import logging
+import os
+import threading
+
+from sqlalchemy import bindparam, func, select, update
+
+from ..database import engine
+from ..models.prompt import Prompt
+from .cache import dashboard_cache
+from .rollups import RollupDelta
+
+logger = logging.getLogger(__name__)
+
+# 写回间隔（秒）
+VIEW_COUNT_FLUSH_INTERVAL = float(os.getenv("VIEW_COUNT_FLUSH_INTERVAL", "5"))
+
+
+class ViewCounter:
+    """按 prompt 聚合浏览次数增量并定期批量写回"""
+
+    def __init__(self, bind, interval: float):
+        self.bind = bind
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # prompt_id -> [user_id, 增量]
+        self._pending = {}
+        # 正在写回的批次，提交前仍计入读取结果，保证读到的数值不回退
+        self._flushing = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def record(self, prompt_id: int, user_id: int, count: int = 1):
+        """记录一次浏览"""
+        with self._lock:
+            entry = self._pending.get(prompt_id)
+            if entry is None:
+                self._pending[prompt_id] = [user_id, count]
+            else:
+                entry[1] += count
+
+    def pending_for(self, prompt_id: int) -> int:
+        """某个 prompt 尚未写回的浏览次数"""
+        with self._lock:
+            return sum(
+                batch[prompt_id][1]
+                for batch in (self._pending, self._flushing)
+                if prompt_id in batch
+            )
+
+    def pending_for_many(self, prompt_ids) -> dict:
+        """多个 prompt 尚未写回的浏览次数 {prompt_id: 次数}，不含没有增量的 prompt"""
+        counts = {}
+        with self._lock:
+            for batch in (self._pending, self._flushing):
+                for prompt_id in prompt_ids:
+                    entry = batch.get(prompt_id)
+                    if entry is not None:
+                        counts[prompt_id] = counts.get(prompt_id, 0) + entry[1]
+        return counts
+
+    def pending_for_user(self, user_id: int) -> int:
+        """某个用户全部 prompt 尚未写回的浏览次数"""
+        with self._lock:
+            return sum(
+                count
+                for batch in (self._pending, self._flushing)
+                for owner_id, count in batch.values()
+                if owner_id == user_id
+            )
+
+    def flush(self) -> int:
+        """写回当前累积的增量，返回写回的 prompt 数量"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                self._flushing, self._pending = self._pending, {}
+                batch = self._flushing
+
+            table = Prompt.__table__
+            statement = update(table).where(
+                table.c.id == bindparam("prompt_id")
+            ).values(
+                view_count=func.coalesce(table.c.view_count, 0) + bindparam("increment"),
+                # 浏览不算编辑，保持 updated_at 不变
+                updated_at=table.c.updated_at
+            )
+            try:
+                with self.bind.begin() as connection:
+                    connection.execute(statement, [
+                        {"prompt_id": prompt_id, "increment": count}
+                        for prompt_id, (_, count) in batch.items()
+                    ])
+                    # 同一事务内累加统计汇总（跳过期间已被删除的提示词）
+                    delta = RollupDelta()
+                    existing = connection.execute(
+                        select(table.c.id).where(table.c.id.in_(list(batch)))
+                    ).scalars()
+                    for prompt_id in existing:
+                        user_id, count = batch[prompt_id]
+                        delta.add_views(user_id, count)
+                    delta.apply(connection)
+            except Exception:
+                logger.exception("浏览次数写回失败，将在下次重试")
+                with self._lock:
+                    for prompt_id, (user_id, count) in batch.items():
+                        entry = self._pending.setdefault(prompt_id, [user_id, 0])
+                        entry[1] += count
+                    self._flushing = {}
+                return 0
+
+            with self._lock:
+                self._flushing = {}
+            # 仪表板快照中的浏览次数已过期
+            for user_id in {user_id for user_id, _ in batch.values()}:
+                dashboard_cache.invalidate(user_id)
+            return len(batch)
+
+    def start(self):
+        """启动后台写回线程"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="view-counter", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止后台线程并写回剩余增量"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+
+view_counter = ViewCounter(engine, VIEW_COUNT_FLUSH_INTERVAL)
+
+# 非正常关闭（未触发 shutdown 事件）时的兜底写回
+atexit.register(view_counter.flush)
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""并发基准：同步数据库调用放在线程池中与直接在事件循环中执行的对比
+
+在临时 SQLite 库上以独立进程启动 uvicorn（与压测客户端不共享事件循环和 GIL），
+通过 HTTP 导入测试数据后分两轮压测同一个列表查询：
+
+- threadpool：实际的 GET /api/prompts/（同步处理函数，由线程池执行）
+- event-loop：create_app 注册的 async 路由，直接调用同一个处理函数（改造前的行为）
+
+两轮使用相同的查询参数（LIST_PARAMS 显式给出处理函数的全部参数）。
+压测期间持续探测 /api/health，事件循环被阻塞时其延迟会明显上升。
+
+    python bench_concurrency.py
+    python bench_concurrency.py --prompts 5000 --concurrency 32 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 列表处理函数的全部查询参数（两轮相同）
+LIST_PARAMS = {
+    "page": 1,
+    "per_page": 100,
+    "category_id": None,
+    "is_public": None,
+    "is_favorite": None,
+    "search": None,
+    "sort_by": "title",
+    "sort_order": "asc",
+    "cursor": None,
+    "total_mode": "exact",
+    "view": "full",
+    "preview_length": 200,
+}
+
+
+def create_app():
+    """服务进程的应用工厂：在应用上注册事件循环中执行的对照路由"""
+    from fastapi import Depends
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import NullPool
+
+    from app.database import DATABASE_URL
+    from app.main import app
+    from app.routers import prompts
+    from app.utils.auth import Principal, get_current_active_user
+
+    # 对照路由使用不带连接池的独立引擎：在事件循环中等待连接池会使事件循环永久阻塞
+    event_loop_session = sessionmaker(
+        autocommit=False, autoflush=False,
+        bind=create_engine(DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=NullPool)
+    )
+
+    @app.get("/bench/event-loop/prompts", include_in_schema=False)
+    async def list_prompts_on_event_loop(current_user: Principal = Depends(get_current_active_user)):
+        """在事件循环中直接执行同步查询"""
+        db = event_loop_session()
+        try:
+            return prompts.list_prompts(db=db, current_user=current_user, **LIST_PARAMS)
+        finally:
+            db.close()
+
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, env: dict) -> subprocess.Popen:
+    """以独立进程启动 uvicorn，等待 /api/health 可用"""
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "bench_concurrency:create_app", "--factory",
+            "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"
+        ],
+        cwd=BACKEND_DIR,
+        env=env
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"服务进程启动失败，退出码 {process.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/api/health", timeout=1).status_code == 200:
+                return process
+        except httpx.TransportError:
+            pass
+        time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("等待服务进程启动超时")
+
+
+def stop_server(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def setup(base_url: str, count: int) -> dict:
+    """注册用户并导入测试数据，返回认证请求头"""
+    with httpx.Client(base_url=base_url, timeout=120) as client:
+        account = {"username": "bench", "email": "bench@example.com", "password": "bench123456"}
+        client.post("/api/auth/register", json=account).raise_for_status()
+        token = client.post("/api/auth/login", json=account).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        records = [
+            {"title": f"基准提示词 {i}", "content": f"第 {i} 条测试内容 " * 20, "tags": [{"name": f"tag{i % 10}"}]}
+            for i in range(count)
+        ]
+        client.post(
+            "/api/export/import",
+            files={"file": ("bench.json", json.dumps(records))},
+            data={"format": "json", "dedupe": "keep"},
+            headers=headers
+        ).raise_for_status()
+    return headers
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)] * 1000 if ordered else 0.0
+
+
+async def run_round(base_url: str, path: str, headers: dict, concurrency: int, duration: float) -> dict:
+    latencies, probes = [], []
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency + 1)
+
+    # 值为 None 的参数即处理函数的默认值，不出现在查询字符串中
+    params = {key: value for key, value in LIST_PARAMS.items() if value is not None}
+
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, timeout=60, limits=limits) as client:
+        async def worker():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = await client.get(path, params=params)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        async def probe():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                (await client.get("/api/health")).raise_for_status()
+                probes.append(time.perf_counter() - started)
+                await asyncio.sleep(0.01)
+
+        started = time.perf_counter()
+        await asyncio.gather(probe(), *(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests_per_second": len(latencies) / elapsed,
+        "list_p50_ms": percentile(latencies, 0.5),
+        "list_p95_ms": percentile(latencies, 0.95),
+        "health_p50_ms": percentile(probes, 0.5),
+        "health_p95_ms": percentile(probes, 0.95),
+        "health_max_ms": max(probes) * 1000 if probes else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="同步数据库调用的并发基准")
+    parser.add_argument("--prompts", type=int, default=2000, help="测试数据量")
+    parser.add_argument("--concurrency", type=int, default=16, help="并发请求数")
+    parser.add_argument("--duration", type=float, default=5, help="每轮压测秒数")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp()
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(work_dir, 'bench.db')}",
+        JOB_ARTIFACT_DIR=os.path.join(work_dir, "artifacts")
+    )
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        server = start_server(port, env)
+    except Exception:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise
+    try:
+        headers = setup(base_url, args.prompts)
+        rounds = [("threadpool", "/api/prompts/"), ("event-loop", "/bench/event-loop/prompts")]
+        print(f"{args.prompts} 条数据，并发 {args.concurrency}，每轮 {args.duration} 秒\n")
+        print(f"{'模式':<12}{'req/s':>8}{'列表p50':>10}{'列表p95':>10}{'health p50':>12}{'health p95':>12}{'health max':>12}")
+        for name, path in rounds:
+            result = asyncio.run(run_round(base_url, path, headers, args.concurrency, args.duration))
+            print(
+                f"{name:<12}{result['requests_per_second']:>8.1f}"
+                f"{result['list_p50_ms']:>10.1f}{result['list_p95_ms']:>10.1f}"
+                f"{result['health_p50_ms']:>12.1f}{result['health_p95_ms']:>12.1f}{result['health_max_ms']:>12.1f}"
+            )
+    finally:
+        stop_server(server)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""序列化基准：列表接口的 ORM + response_model 路径与行元组 + FastJSONResponse 路径的对比
+
+在临时 SQLite 库上生成测试数据，对同一页数据分别执行：
+
+- orm：joinedload 加载 ORM 对象，构造 PromptList，再经 FastAPI 的 serialize_response
+  （response_model 校验与转换）和 JSONResponse 编码（改造前的接口行为）
+- rows：select_view 只查询需要的列，serialize_prompts 拼装 dict，由 FastJSONResponse 编码
+
+分别统计查询、序列化耗时与响应字节数，并检查两条路径的输出是否一致。
+
+    python bench_serialization.py
+    python bench_serialization.py --prompts 5000 --per-page 100 --content-length 4000 --repeat 50
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+DB_FILE = tempfile.mktemp(suffix=".db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_FILE}"
+
+from fastapi.responses import JSONResponse
+from fastapi.utils import create_response_field
+from sqlalchemy.orm import joinedload
+
+from app.database import SessionLocal, init_db
+from app.models.prompt import Prompt, Category, Tag
+from app.models.user import User
+from app.schemas.prompt import PromptList, PromptListResponse, PromptSummaryList
+from app.utils import responses
+from app.utils.pagination import paginate
+from app.utils.prompt_views import select_view, serialize_prompts
+
+
+def seed(count: int, content_length: int) -> int:
+    db = SessionLocal()
+    try:
+        user = User(username="bench", email="bench@example.com", password_hash="x")
+        db.add(user)
+        db.flush()
+        categories = [Category(name=f"分类{i}", user_id=user.id) for i in range(10)]
+        tags = [Tag(name=f"bench-tag-{i}") for i in range(20)]
+        db.add_all(categories + tags)
+        db.flush()
+        body = ("这是一段用于基准测试的提示词内容。" * (content_length // 16 + 1))[:content_length]
+        for i in range(count):
+            prompt = Prompt(
+                title=f"基准提示词 {i}",
+                content=f"{i} {body}",
+                description=f"第 {i} 条",
+                user_id=user.id,
+                category_id=categories[i % 10].id,
+                view_count=i
+            )
+            prompt.tags = [tags[i % 20], tags[(i * 7 + 3) % 20]]
+            db.add(prompt)
+        db.commit()
+        return user.id
+    finally:
+        db.close()
+
+
+# 接口的 response_model 字段（与 FastAPI 为路由创建的字段相同）
+RESPONSE_FIELD = create_response_field(name="response", type_=PromptListResponse)
+
+
+def orm_path(user_id: int, per_page: int, view: str):
+    """改造前：ORM 对象 + response_model 校验 + JSONResponse"""
+    schema = PromptSummaryList if view == "summary" else PromptList
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        query = db.query(Prompt).filter(Prompt.user_id == user_id).options(
+            joinedload(Prompt.category), joinedload(Prompt.tags)
+        )
+        prompts, next_cursor = paginate(
+            query, sort_by="created_at", sort_key=Prompt.created_at, sort_order="desc",
+            id_column=Prompt.id, page=1, per_page=per_page
+        )
+        if view == "summary":
+            # ORM 路径没有预览列，在 Python 中截取
+            for prompt in prompts:
+                prompt.preview = prompt.content[:200]
+        queried = time.perf_counter()
+        content = schema(
+            prompts=prompts, total=None, page=1, per_page=per_page,
+            has_more=next_cursor is not None, next_cursor=next_cursor
+        )
+        # 与 fastapi.routing.serialize_response 相同：按 response_model 校验后转为 JSON 兼容对象
+        value, errors = RESPONSE_FIELD.validate(content, {}, loc=("response",))
+        assert not errors, errors
+        body = JSONResponse(RESPONSE_FIELD.serialize(value, by_alias=True)).body
+        return queried - started, time.perf_counter() - queried, body
+    finally:
+        db.close()
+
+
+def rows_path(user_id: int, per_page: int, view: str):
+    """行元组 + 直接拼装 dict + FastJSONResponse"""
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        query = select_view(db.query(Prompt).filter(Prompt.user_id == user_id), view)
+        rows, next_cursor = paginate(
+            query, sort_by="created_at", sort_key=Prompt.created_at, sort_order="desc",
+            id_column=Prompt.id, page=1, per_page=per_page
+        )
+        prompts = serialize_prompts(db, rows, view)
+        queried = time.perf_counter()
+        body = responses.FastJSONResponse({
+            "total": None, "page": 1, "per_page": per_page, "total_pages": None,
+            "has_more": next_cursor is not None, "next_cursor": next_cursor, "prompts": prompts
+        }).body
+        return queried - started, time.perf_counter() - queried, body
+    finally:
+        db.close()
+
+
+def normalized(body: bytes) -> dict:
+    """解析响应；joinedload 下标签顺序取决于查询计划，比较前按 id 排序"""
+    data = json.loads(body)
+    for prompt in data["prompts"]:
+        prompt["tags"].sort(key=lambda tag: tag["id"])
+    return data
+
+
+def measure(path, repeat: int, *args):
+    path(*args)  # 预热
+    query_total = serialize_total = 0.0
+    for _ in range(repeat):
+        query_seconds, serialize_seconds, body = path(*args)
+        query_total += query_seconds
+        serialize_total += serialize_seconds
+    return query_total / repeat * 1000, serialize_total / repeat * 1000, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description="列表接口序列化基准")
+    parser.add_argument("--prompts", type=int, default=2000, help="测试数据量")
+    parser.add_argument("--per-page", type=int, default=100, help="每页条数")
+    parser.add_argument("--content-length", type=int, default=2000, help="每条内容的字符数")
+    parser.add_argument("--repeat", type=int, default=30, help="每种路径的执行次数")
+    args = parser.parse_args()
+
+    try:
+        init_db()
+        user_id = seed(args.prompts, args.content_length)
+        encoder = "orjson" if responses.orjson is not None else "json"
+        print(f"{args.prompts} 条数据，每页 {args.per_page} 条，内容 {args.content_length} 字符，编码器 {encoder}\n")
+        print(f"{'视图':<10}{'路径':<8}{'查询ms':>10}{'序列化ms':>12}{'合计ms':>10}{'字节':>12}")
+        for view in ("full", "summary"):
+            bodies = {}
+            for name, path in (("orm", orm_path), ("rows", rows_path)):
+                query_ms, serialize_ms, body = measure(path, args.repeat, user_id, args.per_page, view)
+                bodies[name] = body
+                print(f"{view:<10}{name:<8}{query_ms:>10.2f}{serialize_ms:>12.2f}{query_ms + serialize_ms:>10.2f}{len(body):>12}")
+            if normalized(bodies["orm"]) != normalized(bodies["rows"]):
+                print(f"警告：{view} 视图两条路径的输出不一致")
+    finally:
+        if os.path.exists(DB_FILE):
+            os.remove(DB_FILE)
+
+
+if __name__ == "__main__":
+    main()
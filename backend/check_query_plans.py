@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""检查各路由的热点查询是否命中索引
+
+不手写 SQL：通过测试客户端调用各个只读接口，记录路由代码（paginate、select_view、
+iter_prompt_batches 等）实际执行的 SELECT 语句，逐条执行 EXPLAIN，
+出现全表扫描时以非零状态退出，可用于 CI。
+
+示例数据在同一个事务中通过接口写入，检查结束后回滚，不会留在数据库中。
+
+    python check_query_plans.py                    # 临时 SQLite 库
+    python check_query_plans.py postgresql://...   # 指定数据库（需已迁移到最新版本）
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+# 应用模块在导入时按 DATABASE_URL 创建引擎，需先指定数据库
+PREPARE = len(sys.argv) < 2
+DATABASE_URL = sys.argv[1] if not PREPARE else "sqlite:///" + os.path.join(tempfile.mkdtemp(), "query_plans.db")
+os.environ["DATABASE_URL"] = DATABASE_URL
+os.environ.setdefault("JOB_ARTIFACT_DIR", tempfile.mkdtemp())
+# 示例用户的密码哈希，使用最小代价因子
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.database import engine, get_db, init_db
+from app.routers import API_ROUTERS
+from app.utils.search import init_search_backend
+
+# (名称, 路径, 查询参数)；参数中 cursor 为空字符串时再用返回的 next_cursor 请求下一页
+CHECKS = [
+    *(
+        (f"list_prompts sort_by={sort_by}", "/api/prompts/", {"sort_by": sort_by, "cursor": "", "per_page": 2})
+        for sort_by in ("created_at", "updated_at", "view_count", "title")
+    ),
+    ("list_prompts page", "/api/prompts/", {"page": 2, "per_page": 2}),
+    ("list_prompts category_id", "/api/prompts/", {"category_id": "{category_id}"}),
+    ("list_prompts is_favorite", "/api/prompts/", {"is_favorite": True}),
+    ("list_prompts search", "/api/prompts/", {"search": "python"}),
+    ("list_prompts view=summary", "/api/prompts/", {"view": "summary", "cursor": "", "per_page": 2}),
+    *(
+        (f"list_public_prompts sort_by={sort_by}", "/api/prompts/public", {"sort_by": sort_by, "cursor": "", "per_page": 2})
+        for sort_by in ("created_at", "updated_at", "view_count", "title")
+    ),
+    ("search_prompts", "/api/search/", {"q": "python", "cursor": "", "per_page": 2}),
+    ("search_prompts category_id", "/api/search/", {"q": "python", "category_id": "{category_id}"}),
+    ("search_prompts view=summary", "/api/search/", {"q": "python", "view": "summary"}),
+    ("search_prompts sort_by=created_at", "/api/search/", {"q": "python", "sort_by": "created_at", "cursor": "", "per_page": 2}),
+    ("get_prompt", "/api/prompts/{prompt_id}", {}),
+    ("similar_prompts", "/api/prompts/{prompt_id}/similar", {"threshold": 0.1}),
+    ("list_my_tags", "/api/tags/my", {}),
+    ("list_categories", "/api/categories/", {}),
+    ("dashboard", "/api/analytics/dashboard", {}),
+    ("trends", "/api/analytics/trends", {}),
+    ("export-stats", "/api/analytics/export-stats", {}),
+    ("duplicates", "/api/analytics/duplicates", {}),
+    ("export json", "/api/export/prompts", {"format": "json", "compression": "none"}),
+    ("export prompt_ids", "/api/export/prompts", {"format": "ndjson", "compression": "none", "prompt_ids": ["{prompt_id}"]}),
+    ("export bundle", "/api/export/prompts", {"format": "json", "bundle": True}),
+    ("me", "/api/auth/me", {}),
+]
+
+
+def seed(client: TestClient) -> dict:
+    """通过接口写入示例数据，返回认证头与路径参数"""
+    account = {"username": "plan_check", "email": "plan_check@example.com", "password": "plan_check"}
+    client.post("/api/auth/register", json=account).raise_for_status()
+    token = client.post("/api/auth/login", json=account).json()["access_token"]
+    client.headers["Authorization"] = f"Bearer {token}"
+    category = client.post("/api/categories/", json={"name": "示例"}).json()
+    tag = client.post("/api/tags/", json={"name": "plan-check"}).json()
+    prompt_ids = []
+    for i in range(6):
+        response = client.post("/api/prompts/", json={
+            "title": f"python {i}",
+            "content": f"Please review this Python code {i} " * 5,
+            "category_id": category["id"] if i % 2 else None,
+            "tag_ids": [tag["id"]],
+            "is_public": i % 2 == 0,
+            "is_favorite": i % 3 == 0
+        })
+        response.raise_for_status()
+        prompt_ids.append(response.json()["id"])
+    return {"category_id": category["id"], "prompt_id": prompt_ids[0]}
+
+
+def _format(value, values: dict):
+    if isinstance(value, list):
+        return [_format(item, values) for item in value]
+    return value.format(**values) if isinstance(value, str) else value
+
+
+def run_checks(client: TestClient, values: dict, capture: dict):
+    """依次请求各接口，capture["label"] 标记当前请求"""
+    for name, path, params in CHECKS:
+        params = {key: _format(value, values) for key, value in params.items()}
+        capture["label"] = name
+        response = client.get(path.format(**values), params=params)
+        if response.status_code >= 500:
+            response.raise_for_status()
+        if params.get("cursor") == "":
+            next_cursor = response.json()["next_cursor"]
+            assert next_cursor, f"{name} 没有下一页，示例数据不足"
+            capture["label"] = f"{name} cursor"
+            client.get(path.format(**values), params={**params, "cursor": next_cursor}).raise_for_status()
+    capture["label"] = None
+
+
+def explain(connection, sql: str, parameters):
+    """执行 EXPLAIN，返回 (计划文本行, 是否全表扫描)"""
+    if connection.dialect.name == "sqlite":
+        rows = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + sql, parameters).fetchall()
+        lines = [row[-1] for row in rows]
+        # 物化的子查询（MATERIALIZE / CO-ROUTINE）只包含已按索引筛选的行，扫描它们不算全表扫描
+        subqueries = {
+            line.split(" ", 1)[1] for line in lines if line.startswith(("MATERIALIZE ", "CO-ROUTINE "))
+        }
+        full_scan = any(
+            line.startswith("SCAN ") and " USING " not in line and "VIRTUAL TABLE" not in line
+            and line[len("SCAN "):] not in subqueries
+            for line in lines
+        )
+    else:
+        rows = connection.exec_driver_sql("EXPLAIN " + sql, parameters).fetchall()
+        lines = [row[0] for row in rows]
+        full_scan = any("Seq Scan" in line for line in lines)
+    return lines, full_scan
+
+
+def check() -> int:
+    if PREPARE:
+        init_db(engine)
+    init_search_backend(engine)
+
+    # 记录检查阶段执行的 SELECT：SQL -> (参数, 请求名称)
+    capture = {"label": None, "statements": {}}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if capture["label"] and not executemany and statement.lstrip().upper().startswith("SELECT"):
+            capture["statements"].setdefault(statement, (parameters, capture["label"]))
+
+    connection = engine.connect()
+    try:
+        if connection.dialect.name == "sqlite":
+            connection.execute(text("ANALYZE"))
+            connection.commit()
+        transaction = connection.begin()
+        if connection.dialect.name == "postgresql":
+            # 小表上规划器倾向顺序扫描，这里只检查能否使用索引
+            connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+
+        def get_test_db():
+            # 接口的会话加入外层事务，commit 不会真正提交
+            db = Session(bind=connection)
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app = FastAPI()
+        for router, prefix, tag in API_ROUTERS:
+            app.include_router(router, prefix=prefix, tags=[tag])
+        app.dependency_overrides[get_db] = get_test_db
+
+        client = TestClient(app)
+        values = seed(client)
+        run_checks(client, values, capture)
+
+        failures = 0
+        for sql, (parameters, name) in capture["statements"].items():
+            lines, full_scan = explain(connection, sql, parameters)
+            status = "FULL SCAN" if full_scan else "OK"
+            print(f"[{status}] {name}")
+            print("    " + " ".join(sql.split())[:160])
+            for line in lines:
+                print(f"    {line}")
+            failures += full_scan
+        transaction.rollback()
+    finally:
+        connection.close()
+
+    print(f"\n共 {len(capture['statements'])} 条语句")
+    print(f"{failures} 个查询存在全表扫描" if failures else "所有查询均命中索引")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(check())
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""根据 prompts 表重建统计汇总表
+
+    python rebuild_rollups.py              # 全部用户
+    python rebuild_rollups.py --user-id 3  # 指定用户
+
+运行中服务的仪表盘缓存在进程内，本脚本无法清除，最多 DASHBOARD_CACHE_TTL 秒后过期。
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.database import engine, init_db
+from app.utils.cache import DASHBOARD_CACHE_TTL
+from app.utils.rollups import rebuild_rollups
+
+
+def main():
+    parser = argparse.ArgumentParser(description="重建统计汇总表")
+    parser.add_argument("--user-id", type=int, help="只重建指定用户")
+    args = parser.parse_args()
+
+    init_db()
+    with engine.begin() as connection:
+        rebuild_rollups(connection, args.user_id)
+
+    target = f"用户 {args.user_id}" if args.user_id is not None else "全部用户"
+    print(f"已重建{target}的统计汇总，运行中服务的仪表盘缓存将在 {DASHBOARD_CACHE_TTL:g} 秒内过期")
+
+
+if __name__ == "__main__":
+    main()
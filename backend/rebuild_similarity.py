@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""根据 prompts 表重建近似重复（MinHash/LSH）索引
+
+    python rebuild_similarity.py              # 全部用户
+    python rebuild_similarity.py --user-id 3  # 指定用户
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.database import engine, init_db
+from app.utils.similarity import rebuild_similarity_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="重建近似重复索引")
+    parser.add_argument("--user-id", type=int, help="只重建指定用户")
+    args = parser.parse_args()
+
+    init_db()
+    with engine.begin() as connection:
+        rebuild_similarity_index(connection, args.user_id)
+
+    target = f"用户 {args.user_id}" if args.user_id is not None else "全部用户"
+    print(f"已重建{target}的近似重复索引")
+
+
+if __name__ == "__main__":
+    main()
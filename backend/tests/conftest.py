@@ -0,0 +1,63 @@
+"""测试夹具
+
+整个测试会话使用一个临时 SQLite 数据库（在导入 app 之前通过环境变量指定），
+应用只启动一次；每个测试注册独立的用户，数据互不影响。
+"""
+import itertools
+import os
+import shutil
+import tempfile
+
+import pytest
+
+_WORK_DIR = tempfile.mkdtemp(prefix="prompt-manager-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_WORK_DIR, 'test.db')}"
+os.environ["JOB_ARTIFACT_DIR"] = os.path.join(_WORK_DIR, "jobs")
+# bcrypt 允许的最小代价因子，加快注册与登录
+os.environ["BCRYPT_ROUNDS"] = "4"
+# 浏览次数只在测试显式调用 flush 时写回
+os.environ["VIEW_COUNT_FLUSH_INTERVAL"] = "3600"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+
+PASSWORD = "pw123456"
+
+_user_numbers = itertools.count(1)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def application():
+    """执行一次应用的启动与关闭事件（后台线程、令牌同步等）"""
+    with TestClient(app):
+        yield app
+    shutil.rmtree(_WORK_DIR, ignore_errors=True)
+
+
+def register(client: TestClient, username: str = None) -> dict:
+    """注册并登录一个新用户，为 client 设置认证头，返回登录响应"""
+    username = username or f"user{next(_user_numbers)}"
+    account = {"username": username, "email": f"{username}@example.com", "password": PASSWORD}
+    response = client.post("/api/auth/register", json=account)
+    assert response.status_code == 200, response.text
+    response = client.post("/api/auth/login", json={"username": username, "password": PASSWORD})
+    assert response.status_code == 200, response.text
+    tokens = response.json()
+    client.headers["Authorization"] = f"Bearer {tokens['access_token']}"
+    return {"username": username, **tokens}
+
+
+@pytest.fixture
+def client(application):
+    """已登录新用户的客户端"""
+    client = TestClient(application)
+    client.user = register(client)
+    return client
+
+
+def create_prompt(client: TestClient, **fields) -> dict:
+    body = {"title": "提示词", "content": "内容", **fields}
+    response = client.post("/api/prompts/", json=body)
+    assert response.status_code == 200, response.text
+    return response.json()
@@ -0,0 +1,163 @@
+"""认证：当前用户、刷新令牌轮换与吊销、密码哈希背压"""
+import asyncio
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from passlib.context import CryptContext
+
+from app.database import SessionLocal, engine
+from app.models.user import User
+from app.utils import auth
+from app.utils.auth import _PRINCIPAL_KEY, Principal
+from app.utils.cache import principal_cache
+from app.utils.passwords import BCRYPT_ROUNDS, PasswordHasher, PasswordHasherBusy, pwd_context
+from app.utils.revocation import TokenDenylist
+
+from conftest import PASSWORD, register
+
+
+def test_me_is_served_from_principal_snapshot(client):
+    me = client.get("/api/auth/me").json()
+    assert me["username"] == client.user["username"]
+    assert me["email"] == f"{client.user['username']}@example.com"
+
+    # 之后的请求读取缓存的快照，不是 ORM 对象
+    principal = principal_cache.get(me["id"], _PRINCIPAL_KEY)
+    assert isinstance(principal, Principal)
+    assert principal.username == me["username"]
+
+
+def me(client, access_token: str) -> int:
+    return client.get("/api/auth/me", headers={"Authorization": f"Bearer {access_token}"}).status_code
+
+
+def test_refresh_rotates_and_rejects_reuse(client):
+    old = client.user
+    response = client.post("/api/auth/refresh", json={"refresh_token": old["refresh_token"]})
+    assert response.status_code == 200
+    new = response.json()
+    assert new["refresh_token"] != old["refresh_token"]
+    assert me(client, new["access_token"]) == 200
+
+    # 旧刷新令牌只能使用一次
+    response = client.post("/api/auth/refresh", json={"refresh_token": old["refresh_token"]})
+    assert response.status_code == 401
+    assert client.post("/api/auth/refresh", json={"refresh_token": new["refresh_token"]}).status_code == 200
+
+
+def test_token_types_are_not_interchangeable(client):
+    assert me(client, client.user["refresh_token"]) == 401
+    response = client.post("/api/auth/refresh", json={"refresh_token": client.user["access_token"]})
+    assert response.status_code == 401
+
+
+def test_logout_revokes_access_and_refresh_tokens(client):
+    tokens = client.user
+    response = client.post("/api/auth/logout", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 200
+
+    assert me(client, tokens["access_token"]) == 401
+    assert client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+
+
+def test_logout_ignores_refresh_tokens_of_other_users(client, application):
+    other = TestClient(application)
+    other_tokens = register(other)
+    client.post("/api/auth/logout", json={"refresh_token": other_tokens["refresh_token"]})
+
+    assert client.post("/api/auth/refresh", json={"refresh_token": other_tokens["refresh_token"]}).status_code == 200
+
+
+def test_denylist_syncs_between_processes_and_purges_expired(client):
+    user_id = client.get("/api/auth/me").json()["id"]
+    first = TokenDenylist(engine, interval=3600)
+    second = TokenDenylist(engine, interval=3600)
+    second.sync()
+
+    live, expired = str(uuid.uuid4()), str(uuid.uuid4())
+    assert first.revoke(live, user_id, "refresh", datetime.utcnow() + timedelta(hours=1))
+    # 同一个令牌只能被吊销一次
+    assert not first.revoke(live, user_id, "refresh", datetime.utcnow() + timedelta(hours=1))
+    assert first.revoke(expired, user_id, "access", datetime.utcnow() - timedelta(seconds=1))
+    assert not second.is_revoked(live)
+
+    second.sync()
+    assert second.is_revoked(live)
+    assert not second.is_revoked(expired)
+    first.sync()
+    assert not first.is_revoked(expired)
+    # 过期记录已从表中删除，可以再次写入
+    assert first.revoke(expired, user_id, "access", datetime.utcnow() + timedelta(hours=1))
+
+
+class _BlockingContext:
+    """计算在 release 之前一直阻塞的哈希上下文"""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def hash(self, password):
+        self.release.wait(5)
+        return f"hash:{password}"
+
+
+def test_password_hasher_rejects_when_queue_is_full():
+    context = _BlockingContext()
+    hasher = PasswordHasher(context, workers=1, queue_size=2)
+    # 一个执行中，一个排队
+    running = [hasher._submit(context.hash, "a"), hasher._submit(context.hash, "b")]
+    with pytest.raises(PasswordHasherBusy):
+        hasher._submit(context.hash, "c")
+    assert hasher.metrics()["in_flight"] == 2
+    assert hasher.metrics()["rejected"] == 1
+
+    context.release.set()
+    assert [future.result(5) for future in running] == ["hash:a", "hash:b"]
+    # 计算结束后名额释放
+    assert hasher.hash("d") == "hash:d"
+    metrics = hasher.metrics()
+    assert (metrics["in_flight"], metrics["completed"], metrics["rejected"]) == (0, 3, 1)
+
+
+def test_async_hashing_does_not_block_event_loop():
+    context = _BlockingContext()
+    hasher = PasswordHasher(context, workers=1, queue_size=4)
+
+    async def main():
+        pending = asyncio.ensure_future(hasher.hash_async("x"))
+        # 计算阻塞在线程池中，事件循环仍可调度其他协程
+        await asyncio.sleep(0.01)
+        assert not pending.done()
+        context.release.set()
+        return await pending
+
+    assert asyncio.run(main()) == "hash:x"
+
+
+def test_login_returns_503_when_hashing_is_saturated(client, monkeypatch):
+    saturated = PasswordHasher(pwd_context, workers=1, queue_size=1)
+    saturated._slots.acquire()
+    monkeypatch.setattr(auth, "password_hasher", saturated)
+
+    response = client.post("/api/auth/login", json={"username": client.user["username"], "password": PASSWORD})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_login_rehashes_password_with_current_rounds(client):
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.username == client.user["username"]).one()
+        user.password_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=5).hash(PASSWORD)
+        db.commit()
+        assert user.password_hash.startswith("$2b$05$")
+
+        response = client.post("/api/auth/login", json={"username": client.user["username"], "password": PASSWORD})
+        assert response.status_code == 200
+        db.refresh(user)
+        assert user.password_hash.startswith(f"$2b${BCRYPT_ROUNDS:02d}$")
+    finally:
+        db.close()
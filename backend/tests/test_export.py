@@ -0,0 +1,31 @@
+"""导出接口"""
+import json
+
+from fastapi.testclient import TestClient
+
+from conftest import create_prompt, register
+
+
+def export_json(client, **params):
+    response = client.get("/api/export/prompts", params={"format": "json", **params})
+    assert response.status_code == 200, response.text
+    return json.loads(response.content)
+
+
+def test_export_prompt_ids_filter(client):
+    ids = [create_prompt(client, title=f"p{i}", content=f"内容 {i}")["id"] for i in range(4)]
+    assert export_json(client)["export_info"]["total_prompts"] == 4
+
+    data = export_json(client, prompt_ids=ids[1:3])
+    assert data["export_info"]["total_prompts"] == 2
+    assert sorted(prompt["title"] for prompt in data["prompts"]) == ["p1", "p2"]
+
+
+def test_export_prompt_ids_of_other_users_are_ignored(client, application):
+    other = TestClient(application)
+    register(other)
+    foreign = create_prompt(other, title="foreign")["id"]
+    own = create_prompt(client, title="own")["id"]
+
+    data = export_json(client, prompt_ids=[own, foreign])
+    assert [prompt["title"] for prompt in data["prompts"]] == ["own"]
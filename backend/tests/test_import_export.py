@@ -0,0 +1,88 @@
+"""导出文件重新导入（往返）"""
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from conftest import create_prompt, register
+
+FIELDS = ("title", "content", "description", "is_public", "is_favorite")
+
+# 内容中包含围栏、"## " 开头的行和空行，标题中包含 ". "
+SAMPLES = [
+    {
+        "title": "1. 代码审查",
+        "content": "请审查下面的代码：\n\n```python\nprint('hi')\n```\n\n## 输出格式\n- 问题列表",
+        "description": "第一行\n第二行",
+        "is_public": True,
+        "is_favorite": True,
+    },
+    {
+        "title": "翻译",
+        "content": "  保留缩进\n````\n四个反引号",
+        "description": None,
+        "is_public": False,
+        "is_favorite": False,
+    },
+]
+
+
+def _snapshot(client: TestClient) -> dict:
+    """标题 -> (字段, 分类名, 标签名)"""
+    response = client.get("/api/export/prompts", params={"format": "json", "compression": "none"})
+    assert response.status_code == 200, response.text
+    prompts = json.loads(response.content)["prompts"]
+    return {
+        prompt["title"]: (
+            {field: prompt[field] for field in FIELDS},
+            prompt["category"]["name"] if prompt["category"] else None,
+            sorted(tag["name"] for tag in prompt["tags"]),
+        )
+        for prompt in prompts
+    }
+
+
+@pytest.mark.parametrize("format", ["markdown", "json", "ndjson", "csv"])
+def test_export_import_round_trip(client, application, format):
+    category = client.post("/api/categories/", json={"name": "开发"}).json()
+    tags = [client.post("/api/tags/", json={"name": name}).json()["id"] for name in ("代码", "审查")]
+    create_prompt(client, **SAMPLES[0], category_id=category["id"], tag_ids=tags)
+    create_prompt(client, **SAMPLES[1])
+
+    response = client.get("/api/export/prompts", params={"format": format, "compression": "none"})
+    assert response.status_code == 200, response.text
+
+    other = TestClient(application)
+    register(other)
+    response = other.post(
+        "/api/export/import",
+        files={"file": ("prompts", response.content)},
+        data={"format": format},
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["imported_count"] == 2
+
+    assert _snapshot(other) == _snapshot(client)
+
+
+def test_import_markdown_with_three_backtick_fence(client):
+    # 旧版本导出的文件固定使用 ``` 围栏
+    body = (
+        "# 我的Prompt集合\n\n---\n\n"
+        "## 1. 第一个\n\n**内容**:\n```\n第一行\n\n第二行\n```\n\n---\n\n"
+        "## 2. 第二个\n\n**描述**: 说明\n\n**内容**:\n```\n内容二\n```\n\n**统计**: 浏览 0 次\n\n---\n"
+    )
+    response = client.post(
+        "/api/export/import",
+        files={"file": ("prompts.md", body.encode())},
+        data={"format": "markdown"},
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["imported_count"] == 2
+
+    prompts = {prompt["title"]: prompt for prompt in json.loads(
+        client.get("/api/export/prompts", params={"format": "json"}).content
+    )["prompts"]}
+    assert prompts["第一个"]["content"] == "第一行\n\n第二行"
+    assert prompts["第二个"]["description"] == "说明"
+    assert prompts["第二个"]["content"] == "内容二"
@@ -0,0 +1,109 @@
+"""批量导入"""
+import json
+
+import pytest
+from sqlalchemy import event
+
+from app.database import SessionLocal, engine
+from app.utils.importer import BulkImporter
+
+from conftest import create_prompt
+
+
+def record(i, **fields) -> dict:
+    return {
+        "title": f"t{i}",
+        "content": f"内容 {i}",
+        "category": {"name": f"分类{i % 2}"},
+        "tags": [{"name": f"标签{i % 3}"}, {"name": "共同"}, {"name": "共同"}],
+        **fields,
+    }
+
+
+def run_import(user_id: int, records, **options) -> BulkImporter:
+    db = SessionLocal()
+    try:
+        importer = BulkImporter(db, user_id, **options)
+        importer.add_all(records)
+        importer.finish()
+        return importer
+    finally:
+        db.close()
+
+
+def exported(client) -> dict:
+    response = client.get("/api/export/prompts", params={"format": "json"})
+    return {prompt["title"]: prompt for prompt in json.loads(response.content)["prompts"]}
+
+
+@pytest.fixture
+def user_id(client):
+    return client.get("/api/auth/me").json()["id"]
+
+
+def test_chunks_and_name_resolution(client, user_id):
+    client.post("/api/categories/", json={"name": "分类0", "color": "#111111"})
+    records = [record(i) for i in range(5)] + [{"title": "无内容"}, "not a dict"]
+    importer = run_import(user_id, records, chunk_size=2)
+
+    assert importer.imported_count == 5
+    assert [chunk["records"] for chunk in importer.chunks] == [2, 2, 1]
+
+    prompts = exported(client)
+    assert sorted(prompts) == [f"t{i}" for i in range(5)]
+    assert prompts["t3"]["category"]["name"] == "分类1"
+    assert sorted(tag["name"] for tag in prompts["t4"]["tags"]) == ["共同", "标签1"]
+    # 已有的分类被复用，不会重复创建
+    categories = client.get("/api/categories/").json()
+    assert sorted(category["name"] for category in categories) == ["分类0", "分类1"]
+    assert next(c for c in categories if c["name"] == "分类0")["color"] == "#111111"
+
+
+def test_statements_per_chunk_do_not_grow_with_records(user_id):
+    """每块的数据库往返次数与记录数无关"""
+    def statements(count: int, offset: int) -> int:
+        executed = []
+        listener = lambda *args: executed.append(args[2])
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            run_import(user_id, [record(offset + i) for i in range(count)], chunk_size=count)
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+        return len(executed)
+
+    statements(3, 1000)  # 先创建分类与标签
+    assert statements(5, 2000) == statements(50, 3000)
+
+
+def test_keep_mode_maps_tags_to_duplicate_records(client, user_id):
+    """同一块内内容相同的记录也按顺序对应各自的标签与分类"""
+    records = [
+        {"title": f"副本{i}", "content": "同样的内容", "tags": [{"name": f"副本标签{i}"}], "category": {"name": f"副本分类{i}"}}
+        for i in range(3)
+    ]
+    run_import(user_id, records, dedupe="keep")
+    prompts = exported(client)
+    for i in range(3):
+        assert [tag["name"] for tag in prompts[f"副本{i}"]["tags"]] == [f"副本标签{i}"]
+        assert prompts[f"副本{i}"]["category"]["name"] == f"副本分类{i}"
+
+
+def test_dedupe_modes(client, user_id):
+    create_prompt(client, title="已有", content="重复的内容")
+    duplicate = {"title": "新标题", "content": "  重复的内容 ", "tags": [{"name": "x"}], "is_favorite": True}
+
+    importer = run_import(user_id, [duplicate, {"title": "新", "content": "新内容"}, {"title": "新2", "content": "新内容"}])
+    assert (importer.imported_count, importer.updated_count, importer.skipped_count) == (1, 0, 2)
+    assert sorted(exported(client)) == ["已有", "新"]
+
+    importer = run_import(user_id, [duplicate], dedupe="update")
+    assert (importer.imported_count, importer.updated_count, importer.skipped_count) == (0, 1, 0)
+    prompts = exported(client)
+    assert "已有" not in prompts
+    assert prompts["新标题"]["is_favorite"] is True
+    assert [tag["name"] for tag in prompts["新标题"]["tags"]] == ["x"]
+
+    importer = run_import(user_id, [duplicate], dedupe="keep")
+    assert importer.imported_count == 1
+    response = client.get("/api/export/prompts", params={"format": "json"})
+    assert json.loads(response.content)["export_info"]["total_prompts"] == 3
@@ -0,0 +1,104 @@
+"""后台导入导出任务"""
+import json
+import os
+import time
+
+from app.database import SessionLocal
+from app.models.job import Job
+from app.utils.jobs import artifact_path, job_manager
+
+from conftest import create_prompt
+
+
+def wait_for(client, job_id: int, timeout: float = 10) -> dict:
+    """轮询任务直到结束"""
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(f"/api/export/jobs/{job_id}").json()
+        if job["status"] in ("completed", "failed"):
+            return job
+        assert time.monotonic() < deadline, job
+        time.sleep(0.05)
+
+
+def submit_import(client, body: bytes, format: str = "ndjson", **data) -> dict:
+    response = client.post(
+        "/api/export/import/jobs",
+        files={"file": ("prompts", body)},
+        data={"format": format, **data},
+    )
+    assert response.status_code == 202, response.text
+    return response.json()
+
+
+def ndjson(*titles) -> bytes:
+    return "".join(
+        json.dumps({"title": title, "content": f"{title} 的内容"}, ensure_ascii=False) + "\n"
+        for title in titles
+    ).encode()
+
+
+def titles(client) -> list:
+    response = client.get("/api/export/prompts", params={"format": "json"})
+    return sorted(prompt["title"] for prompt in json.loads(response.content)["prompts"])
+
+
+def test_import_job_removes_upload_when_completed(client):
+    job = submit_import(client, ndjson("a", "b", "c"), chunk_size=2)
+    job = wait_for(client, job["id"])
+
+    assert job["status"] == "completed"
+    assert job["result"]["imported_count"] == 3
+    assert titles(client) == ["a", "b", "c"]
+    assert not os.path.exists(artifact_path(job["id"], ".upload"))
+
+
+def test_import_job_removes_upload_when_failed(client):
+    job = submit_import(client, b"not json\n")
+    job = wait_for(client, job["id"])
+
+    assert job["status"] == "failed"
+    assert job["error"]
+    assert not os.path.exists(artifact_path(job["id"], ".upload"))
+
+
+def test_import_job_resumes_from_checkpoint(client):
+    """中断后重新执行的任务跳过断点之前已提交的记录，计数累加"""
+    user_id = client.get("/api/auth/me").json()["id"]
+    db = SessionLocal()
+    try:
+        job = Job(
+            user_id=user_id,
+            kind="import",
+            params=json.dumps({"format": "ndjson", "chunk_size": 2, "dedupe": "skip"}),
+            checkpoint=json.dumps({"records": 2, "imported": 2, "updated": 0, "skipped": 0}),
+        )
+        db.add(job)
+        db.flush()
+        job.artifact_path = artifact_path(job.id, ".upload")
+        with open(job.artifact_path, "wb") as target:
+            target.write(ndjson("a", "b", "c", "d"))
+        db.commit()
+        job_id = job.id
+    finally:
+        db.close()
+
+    job_manager.submit(job_id)
+    job = wait_for(client, job_id)
+
+    assert job["status"] == "completed", job["error"]
+    # 前两条视为中断前已提交
+    assert titles(client) == ["c", "d"]
+    assert job["result"] == {"imported_count": 4, "updated_count": 0, "skipped_count": 0}
+
+
+def test_export_job_keeps_artifact_for_download(client):
+    create_prompt(client, title="导出")
+    response = client.post("/api/export/jobs", json={"format": "json", "compression": "none"})
+    assert response.status_code == 202, response.text
+    job = wait_for(client, response.json()["id"])
+
+    assert job["status"] == "completed", job["error"]
+    response = client.get(job["download_url"])
+    assert response.status_code == 200
+    assert [prompt["title"] for prompt in json.loads(response.content)["prompts"]] == ["导出"]
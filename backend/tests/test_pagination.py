@@ -0,0 +1,81 @@
+"""游标分页"""
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from app.models.prompt import Prompt
+from app.utils.pagination import decode_cursor, encode_cursor
+
+from conftest import create_prompt
+
+
+@pytest.mark.parametrize("sort_key, value", [
+    (Prompt.title, "标题"),
+    (Prompt.view_count, 7),
+])
+def test_cursor_round_trip(sort_key, value):
+    cursor = encode_cursor(sort_key.key, "asc", value, 42)
+    assert "=" not in cursor
+    assert decode_cursor(cursor, sort_key.key, "asc", sort_key, "postgresql") == (value, 42)
+
+
+def test_datetime_cursor_matches_sqlite_text_format():
+    cursor = encode_cursor("created_at", "desc", datetime(2024, 1, 2, 3, 4, 5), 1)
+    value, row_id = decode_cursor(cursor, "created_at", "desc", Prompt.created_at, "sqlite")
+    assert value.value == "2024-01-02 03:04:05"
+    assert row_id == 1
+
+
+@pytest.mark.parametrize("cursor, sort_by, detail", [
+    ("not a cursor!", "title", "无效的分页游标"),
+    (encode_cursor("title", "asc", "a", 1), "view_count", "分页游标与排序参数不匹配"),
+    (encode_cursor("view_count", "asc", "a", 1), "view_count", "无效的分页游标"),
+    (encode_cursor("view_count", "asc", 1, "1"), "view_count", "无效的分页游标"),
+    (encode_cursor("view_count", "asc", True, 1), "view_count", "无效的分页游标"),
+])
+def test_invalid_cursor_is_rejected(cursor, sort_by, detail):
+    sort_key = getattr(Prompt, sort_by)
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, sort_by, "asc", sort_key, "sqlite")
+    assert error.value.status_code == 400
+    assert error.value.detail == detail
+
+
+def walk(client, path: str, **params) -> list:
+    """按 next_cursor 取完所有页，返回 id 列表"""
+    ids, cursor = [], ""
+    while cursor is not None:
+        response = client.get(path, params={**params, "cursor": cursor})
+        assert response.status_code == 200, response.text
+        data = response.json()
+        ids.extend(prompt["id"] for prompt in data["prompts"])
+        cursor = data["next_cursor"]
+    return ids
+
+
+@pytest.mark.parametrize("sort_by", ["created_at", "updated_at", "view_count", "title"])
+@pytest.mark.parametrize("sort_order", ["asc", "desc"])
+def test_cursor_walk_matches_page_order(client, sort_by, sort_order):
+    # 排序值相同（浏览次数均为 0、标题重复）时按 id 继续排序
+    for i in range(7):
+        create_prompt(client, title=f"python {i % 3}", content=f"内容 {i}")
+    params = {"sort_by": sort_by, "sort_order": sort_order}
+
+    expected = client.get("/api/prompts/", params={**params, "per_page": 100}).json()["prompts"]
+    ids = walk(client, "/api/prompts/", per_page=3, **params)
+    assert ids == [prompt["id"] for prompt in expected]
+    assert len(set(ids)) == 7
+
+    assert sorted(walk(client, "/api/search/", q="python", per_page=2, **params)) == sorted(ids)
+
+
+def test_cursor_skips_rows_inserted_before_it(client):
+    """游标之前插入的新数据不会让后续页重复"""
+    for i in range(4):
+        create_prompt(client, title=f"p{i}")
+    first = client.get("/api/prompts/", params={"cursor": "", "per_page": 2}).json()
+    create_prompt(client, title="new")
+    second = client.get("/api/prompts/", params={"cursor": first["next_cursor"], "per_page": 2}).json()
+
+    assert [prompt["title"] for prompt in first["prompts"] + second["prompts"]] == ["p3", "p2", "p1", "p0"]
@@ -0,0 +1,82 @@
+"""统计汇总表的增量维护"""
+from datetime import date
+
+from sqlalchemy import select
+
+from app.database import engine
+from app.models.rollup import UserCategoryStats, UserDailyStats, UserStats, UserTagStats
+from app.utils.rollups import RollupDelta, rebuild_rollups
+from app.utils.view_counter import view_counter
+
+from conftest import create_prompt
+
+TABLES = (UserStats, UserDailyStats, UserTagStats, UserCategoryStats)
+
+
+def rollup_rows(connection, user_id: int) -> dict:
+    """用户在各汇总表中的非零行"""
+    rows = {}
+    for model in TABLES:
+        table = model.__table__
+        rows[table.name] = sorted(
+            tuple(row) for row in connection.execute(select(table).where(table.c.user_id == user_id))
+            if any(row[1 if table.name == "user_stats" else 2:])
+        )
+    return rows
+
+
+def test_incremental_rollups_match_rebuild(client):
+    user_id = client.get("/api/auth/me").json()["id"]
+    category = client.post("/api/categories/", json={"name": "分类"}).json()
+    tags = [client.post("/api/tags/", json={"name": name}).json()["id"] for name in ("a", "b")]
+
+    first = create_prompt(client, category_id=category["id"], tag_ids=tags, is_public=True)
+    second = create_prompt(client, content="二", tag_ids=tags[:1], is_favorite=True)
+    create_prompt(client, content="三")
+    client.put(f"/api/prompts/{first['id']}", json={"tag_ids": tags[1:], "is_public": False, "is_favorite": True})
+    client.put(f"/api/prompts/{second['id']}", json={"category_id": category["id"]})
+    client.delete(f"/api/prompts/{second['id']}")
+    client.post(
+        "/api/export/import",
+        files={"file": ("p.ndjson", '{"title": "导入", "content": "四", "tags": [{"name": "a"}, {"name": "c"}]}\n'.encode())},
+        data={"format": "ndjson"},
+    )
+    for _ in range(2):
+        client.get(f"/api/prompts/{first['id']}")
+    view_counter.flush()
+
+    # 在回滚的事务内重建，与增量维护的结果比较
+    with engine.connect() as connection:
+        incremental = rollup_rows(connection, user_id)
+        rebuild_rollups(connection, user_id)
+        rebuilt = rollup_rows(connection, user_id)
+        connection.rollback()
+
+    assert len(incremental["user_tag_stats"]) == 3
+    assert incremental == rebuilt
+    overview = client.get("/api/analytics/dashboard").json()["overview"]
+    assert overview["total_prompts"] == 3
+    assert overview["total_views"] == 2
+
+
+def test_upsert_accumulates_and_skips_zero_rows(client):
+    user_id = client.get("/api/auth/me").json()["id"]
+    day = date(2020, 1, 1)
+    delta = RollupDelta()
+    delta.add_views(user_id, 2, day)
+    delta.daily[(user_id, date(2020, 1, 2))]["views"] += 0
+
+    table = UserDailyStats.__table__
+    with engine.connect() as connection:
+        delta.apply(connection)
+        delta.apply(connection)
+        rows = connection.execute(
+            select(table.c.day, table.c.views).where(table.c.user_id == user_id, table.c.day < date(2021, 1, 1))
+        ).all()
+        stats = connection.execute(
+            select(UserStats.total_views).where(UserStats.user_id == user_id)
+        ).scalar()
+        connection.rollback()
+
+    assert rows == [(day, 4)]
+    assert stats == 4
@@ -0,0 +1,68 @@
+"""搜索关键词的规范化与回退"""
+from app.utils.search import _to_tsquery, normalize_query
+
+from conftest import create_prompt
+
+
+def search(client, q, **params):
+    response = client.get("/api/search/", params={"q": q, **params})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def titles(data):
+    return sorted(prompt["title"] for prompt in data["prompts"])
+
+
+def test_normalize_query():
+    assert normalize_query(None) == ""
+    assert normalize_query("   ") == ""
+    assert normalize_query("  a  b ") == "a  b"
+
+
+def test_blank_query_returns_unfiltered_list(client):
+    for i in range(3):
+        create_prompt(client, title=f"p{i}", content=f"内容 {i}")
+    for q in ("", "   "):
+        data = search(client, q)
+        assert data["total"] == 3
+        assert titles(data) == ["p0", "p1", "p2"]
+        assert all(prompt["snippet"] is None for prompt in data["prompts"])
+
+
+def test_punctuation_and_short_queries(client):
+    create_prompt(client, title="标点", content='x *** y "quoted"')
+    create_prompt(client, title="春天", content="请帮我写一首关于春天的诗")
+    assert titles(search(client, "***")) == ["标点"]
+    assert titles(search(client, '"')) == ["标点"]
+    assert titles(search(client, "  ***  ")) == ["标点"]
+    # 短于 trigram 的关键词回退到 LIKE
+    assert titles(search(client, "春天")) == ["春天"]
+    assert titles(search(client, "诗")) == ["春天"]
+    assert titles(search(client, "写一首")) == ["春天"]
+    assert search(client, "((")["total"] == 0
+
+
+def test_search_with_category_filter(client):
+    category = client.post("/api/categories/", json={"name": "写作"}).json()
+    create_prompt(client, title="a", content="python code", category_id=category["id"])
+    create_prompt(client, title="b", content="python code")
+    assert titles(search(client, "python", category_id=category["id"])) == ["a"]
+
+
+def test_tsquery_skips_cjk_queries():
+    assert _to_tsquery("python code") == "python:* & code:*"
+    assert _to_tsquery("春天的诗") == ""
+    assert _to_tsquery("hello 世界") == ""
+    assert _to_tsquery("***") == ""
+
+
+def test_blank_query_cursor_walk(client):
+    for i in range(5):
+        create_prompt(client, title=f"p{i}", content=f"内容 {i}")
+    seen, cursor = [], ""
+    while cursor is not None:
+        data = search(client, " ", cursor=cursor, per_page=2)
+        seen += [prompt["id"] for prompt in data["prompts"]]
+        cursor = data["next_cursor"]
+    assert len(seen) == len(set(seen)) == 5
@@ -0,0 +1,65 @@
+"""浏览次数写回缓冲"""
+from app.database import SessionLocal
+from app.models.prompt import Prompt
+from app.utils.view_counter import ViewCounter, view_counter
+
+from conftest import create_prompt
+
+
+def stored(prompt_id: int) -> Prompt:
+    db = SessionLocal()
+    try:
+        return db.get(Prompt, prompt_id)
+    finally:
+        db.close()
+
+
+def test_views_are_buffered_until_flush(client):
+    prompt = create_prompt(client)
+    view_counter.flush()
+
+    counts = [client.get(f"/api/prompts/{prompt['id']}").json()["view_count"] for _ in range(3)]
+    assert counts == [1, 2, 3]
+    # 数据库尚未写入，读取接口叠加内存中的增量
+    assert stored(prompt["id"]).view_count == 0
+    assert client.get("/api/prompts/").json()["prompts"][0]["view_count"] == 3
+    assert client.get("/api/analytics/dashboard").json()["overview"]["total_views"] == 3
+
+    updated_at = stored(prompt["id"]).updated_at
+    assert view_counter.flush() >= 1
+    assert view_counter.pending_for(prompt["id"]) == 0
+    assert stored(prompt["id"]).view_count == 3
+    assert stored(prompt["id"]).updated_at == updated_at
+    # 写回后汇总表已累加，不会重复计数
+    assert client.get("/api/analytics/dashboard").json()["overview"]["total_views"] == 3
+    assert client.get(f"/api/prompts/{prompt['id']}").json()["view_count"] == 4
+
+
+def test_flush_skips_deleted_prompts(client):
+    prompt = create_prompt(client)
+    client.get(f"/api/prompts/{prompt['id']}")
+    assert client.delete(f"/api/prompts/{prompt['id']}").status_code == 200
+
+    view_counter.flush()
+    assert view_counter.pending_for(prompt["id"]) == 0
+    assert client.get("/api/analytics/dashboard").json()["overview"]["total_views"] == 0
+
+
+class _BrokenBind:
+    def begin(self):
+        raise RuntimeError("数据库不可用")
+
+
+def test_failed_flush_keeps_increments():
+    counter = ViewCounter(_BrokenBind(), interval=3600)
+    counter.record(1, 1)
+    counter.record(1, 1)
+    counter.record(2, 1)
+
+    assert counter.flush() == 0
+    assert counter.pending_for_many([1, 2, 3]) == {1: 2, 2: 1}
+    assert counter.pending_for_user(1) == 3
+
+    # 之后的浏览累加到保留的增量上，下次写回时一并提交
+    counter.record(1, 1)
+    assert counter.pending_for(1) == 3
@@ -226,8 +226,17 @@ export const searchApi = {
 }
 
 // Export/Import API
+export type ExportFormat = 'json' | 'markdown' | 'ndjson' | 'csv'
+
+const EXPORT_EXTENSIONS: Record<ExportFormat, string> = {
+  json: 'json',
+  markdown: 'md',
+  ndjson: 'ndjson',
+  csv: 'csv'
+}
+
 export const exportApi = {
-  exportPrompts: async (format: 'json' | 'markdown', promptIds?: number[]) => {
+  exportPrompts: async (format: ExportFormat, promptIds?: number[]) => {
     const params: any = { format }
     if (promptIds?.length) {
       params.prompt_ids = promptIds
@@ -235,6 +244,8 @@ export const exportApi = {
     
     const response = await apiService.client.get('/api/export/prompts', {
       params,
+      // 数组参数按 prompt_ids=1&prompt_ids=2 传递（后端不识别 prompt_ids[]）
+      paramsSerializer: { indexes: null },
       responseType: 'blob'
     })
     
@@ -242,14 +253,14 @@ export const exportApi = {
     const url = window.URL.createObjectURL(new Blob([response.data]))
     const link = document.createElement('a')
     link.href = url
-    link.setAttribute('download', `prompts_export.${format === 'json' ? 'json' : 'md'}`)
+    link.setAttribute('download', `prompts_export.${EXPORT_EXTENSIONS[format]}`)
     document.body.appendChild(link)
     link.click()
     link.remove()
     window.URL.revokeObjectURL(url)
   },
   
-  importPrompts: async (file: File, format: 'json' | 'markdown') => {
+  importPrompts: async (file: File, format: ExportFormat) => {
     const formData = new FormData()
     formData.append('file', file)
     formData.append('format', format)
@@ -28,6 +28,7 @@ export interface Prompt {
   updated_at: string
   category?: Category
   tags: Tag[]
+  snippet?: string
   owner?: {
     id: number
     username: string
@@ -41,6 +42,8 @@ export interface PromptList {
   page: number
   per_page: number
   total_pages: number
+  has_more?: boolean
+  next_cursor?: string | null
 }
 
 export interface User {